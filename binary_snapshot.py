@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+MEMORY-MAPPED BINARY SNAPSHOT OF CURRENT LIVE DATA
+Additional snapshot format next to bet365_live_current.json
+(bet365_live_current.bin) for readers that poll frequently.
+
+File layout (little-endian):
+- Header (64 bytes)    magic 'B365', format version, generation counter,
+                       write time, match/string counts and section offsets
+- Match records        fixed-width (80 bytes) per match: string ids for
+                       key/sport/teams/status/scores, flags, market count,
+                       last_updated, moneyline decimals, content hash and the
+                       offset/lengths of the match's payload
+- String table         (offset, length) entries + UTF-8 blob, deduplicated
+- Payloads             per match, orjson bytes of the match without its
+                       first_seen/last_updated, followed by those two fields
+                       as a small JSON object of their own
+
+Readers mmap the file and compare the generation in the header before
+touching anything else. The content hash covers the payload without the
+timestamps, and full matches are only decoded for records whose content
+hash is new, so an unchanged match is never parsed twice (a new timestamp
+only costs decoding the small timestamp object).
+
+The file is replaced atomically each write; a reader maps it only for the
+duration of a refresh (Windows cannot replace a file that is still mapped).
+"""
+
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import orjson
+
+from current_shards import VOLATILE_MATCH_FIELDS
+from snapshot_publisher import SnapshotPublisher
+
+MAGIC = b'B365'
+FORMAT_VERSION = 2
+BINARY_SNAPSHOT_NAME = "bet365_live_current.bin"
+
+# magic, format version, reserved, generation, written_at, match count, string count,
+# records offset, strings offset, payload offset, file size
+HEADER = struct.Struct('<4sHHQdIIQQQQ4x')
+# key, sport, home, away, status, score home, score away (string ids), is_live, has_odds,
+# market count, last_updated, moneyline home/away decimal, content hash, payload offset/length,
+# timestamps length (the timestamps object follows the payload)
+RECORD = struct.Struct('<7IBBHdddQQII')
+STRING_ENTRY = struct.Struct('<II')
+
+RECORD_FIELDS = ('key', 'sport', 'home', 'away', 'status', 'score_home', 'score_away')
+
+
+def _timestamp(value: Any) -> float:
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _moneyline(match: Dict[str, Any], side: str) -> float:
+    value = (match.get('parsed_odds') or {}).get('moneyline', {}).get(side) or {}
+    decimal = value.get('decimal')
+    return math.nan if decimal is None else float(decimal)
+
+
+class BinarySnapshotWriter:
+    """Builds and atomically replaces the binary snapshot (persistence writer thread only)"""
+
+    def __init__(self, path: str, key_func, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            path: snapshot file
+            key_func: match key function (generate_match_key)
+            logger: logger for write errors
+        """
+        self.path = path
+        self.key_func = key_func
+        self.logger = logger or logging.getLogger(__name__)
+        self.publisher = SnapshotPublisher(logger=self.logger)
+        # Continue the generation counter across restarts so readers never see it go back
+        self.generation = read_generation(path) or 0
+        self.bytes_written = 0
+
+    def write(self, document: Dict[str, Any]):
+        """Encode a current-data document and publish it under the next generation"""
+        strings: Dict[str, int] = {}
+
+        def string_id(value: Any) -> int:
+            text = '' if value is None else str(value)
+            index = strings.get(text)
+            if index is None:
+                index = strings[text] = len(strings)
+            return index
+
+        records = []
+        payloads = []
+        payload_size = 0
+        for match in document.get('matches', []):
+            if not isinstance(match, dict):
+                continue
+            payload = orjson.dumps({key: value for key, value in match.items() if key not in VOLATILE_MATCH_FIELDS},
+                                   default=str, option=orjson.OPT_NON_STR_KEYS)
+            volatile = orjson.dumps({key: match[key] for key in VOLATILE_MATCH_FIELDS if key in match},
+                                    default=str)
+            teams = match.get('teams') or {}
+            scores = match.get('scores') or {}
+            records.append((
+                string_id(self.key_func(match)), string_id(match.get('sport', 'Unknown')),
+                string_id(teams.get('home', '')), string_id(teams.get('away', '')),
+                string_id(match.get('status', '')),
+                string_id(scores.get('home', '')), string_id(scores.get('away', '')),
+                1 if (match.get('live_fields') or {}).get('is_live') else 0,
+                1 if match.get('has_odds') else 0,
+                min(len(match.get('markets') or {}), 0xFFFF),
+                _timestamp(match.get('last_updated')),
+                _moneyline(match, 'home'), _moneyline(match, 'away'),
+                int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), 'little'),
+                payload_size, len(payload), len(volatile)
+            ))
+            payloads.append(payload + volatile)
+            payload_size += len(payload) + len(volatile)
+
+        encoded = [text.encode('utf-8') for text in strings]
+        records_offset = HEADER.size
+        strings_offset = records_offset + RECORD.size * len(records)
+        blob_offset = strings_offset + STRING_ENTRY.size * len(encoded)
+        payload_offset = blob_offset + sum(len(b) for b in encoded)
+        file_size = payload_offset + payload_size
+
+        buffer = bytearray(file_size)
+        self.generation += 1
+        HEADER.pack_into(buffer, 0, MAGIC, FORMAT_VERSION, 0, self.generation, time.time(),
+                         len(records), len(encoded), records_offset, strings_offset,
+                         payload_offset, file_size)
+        for i, record in enumerate(records):
+            RECORD.pack_into(buffer, records_offset + i * RECORD.size, *record)
+
+        position = blob_offset
+        for i, data in enumerate(encoded):
+            STRING_ENTRY.pack_into(buffer, strings_offset + i * STRING_ENTRY.size, position, len(data))
+            buffer[position:position + len(data)] = data
+            position += len(data)
+        buffer[payload_offset:file_size] = b''.join(payloads)
+
+        # The generation lives in the header - no sidecar needed
+        self.publisher.publish_bytes(self.path, bytes(buffer), stamp=False)
+        self.bytes_written += file_size
+
+    def metrics(self) -> Dict[str, Any]:
+        return {'generation': self.generation, 'bytes_written': self.bytes_written}
+
+
+def read_generation(path: str) -> Optional[int]:
+    """Generation number in a snapshot's header, or None if missing/invalid (reads 64 bytes)"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(header) < HEADER.size:
+        return None
+    magic, version, _, generation = HEADER.unpack(header)[:4]
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+    return generation
+
+
+class BinarySnapshotReader:
+    """Maps the binary snapshot and decodes only what changed since the last refresh"""
+
+    def __init__(self, path: str, logger: Optional[logging.Logger] = None):
+        self.path = path
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.generation: Optional[int] = None
+        self.written_at: Optional[float] = None
+        self.records: List[Dict[str, Any]] = []
+        # content hash -> (decoded match, its timestamps object bytes), for the current generation
+        self._matches: Dict[int, Tuple[Dict[str, Any], bytes]] = {}
+        self.payloads_decoded = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def changed(self) -> bool:
+        """True if the file holds a generation this reader has not loaded (header read only)"""
+        generation = read_generation(self.path)
+        return generation is not None and generation != self.generation
+
+    def refresh(self) -> bool:
+        """Load the current generation if it moved. Returns True if anything changed."""
+        with open(self.path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if len(mm) < HEADER.size:
+                    return False
+                (magic, version, _, generation, written_at, match_count, string_count,
+                 records_offset, strings_offset, payload_offset, file_size) = HEADER.unpack_from(mm, 0)
+                if magic != MAGIC or version != FORMAT_VERSION or file_size != len(mm):
+                    raise ValueError(f"Invalid binary snapshot {self.path}")
+                if generation == self.generation:
+                    return False
+
+                strings = []
+                for i in range(string_count):
+                    offset, length = STRING_ENTRY.unpack_from(mm, strings_offset + i * STRING_ENTRY.size)
+                    strings.append(mm[offset:offset + length].decode('utf-8'))
+
+                records = []
+                matches: Dict[int, Dict[str, Any]] = {}
+                for i in range(match_count):
+                    values = RECORD.unpack_from(mm, records_offset + i * RECORD.size)
+                    record = {field: strings[values[j]] for j, field in enumerate(RECORD_FIELDS)}
+                    (record['is_live'], record['has_odds'], record['market_count'], record['last_updated'],
+                     record['moneyline_home'], record['moneyline_away'], record['content_hash'],
+                     payload_start, payload_length, volatile_length) = values[len(RECORD_FIELDS):]
+                    record['is_live'] = bool(record['is_live'])
+                    record['has_odds'] = bool(record['has_odds'])
+                    for field in ('last_updated', 'moneyline_home', 'moneyline_away'):
+                        if math.isnan(record[field]):
+                            record[field] = None
+
+                    content_hash = record['content_hash']
+                    start = payload_offset + payload_start + payload_length
+                    volatile = mm[start:start + volatile_length]
+                    cached = self._matches.get(content_hash)
+                    if cached is None:
+                        start = payload_offset + payload_start
+                        match = orjson.loads(mm[start:start + payload_length])
+                        match.update(orjson.loads(volatile))
+                        self.payloads_decoded += 1
+                    elif cached[1] != volatile:
+                        # Same content, new timestamps - no need to decode the payload again
+                        match = {key: value for key, value in cached[0].items() if key not in VOLATILE_MATCH_FIELDS}
+                        match.update(orjson.loads(volatile))
+                    else:
+                        match = cached[0]
+                    matches[content_hash] = (match, volatile)
+                    records.append(record)
+
+        self.generation = generation
+        self.written_at = written_at
+        self.records = records
+        self._matches = matches
+        return True
+
+    def matches(self) -> List[Dict[str, Any]]:
+        """Full matches of the loaded generation, in record order"""
+        return [self._matches[record['content_hash']][0] for record in self.records]
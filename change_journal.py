@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+WRITE-AHEAD CHANGE JOURNAL FOR LIVE MATCH STATE
+Append-only record of inserts, updates and removes produced by
+detect_data_changes, plus periodic compact snapshots.
+
+Layout (next to bet365_live_current.json):
+- bet365_live_journal.ndjson  - one JSON object per line: {seq, ts, op, key, data}
+- bet365_live_snapshot.json   - {seq, created, matches: {match_key: match}}
+
+Startup loads the snapshot and replays every journal entry with a sequence
+number above the snapshot's. Sequence numbers and snapshot bookkeeping stay
+with the caller (prepare_entries / begin_snapshot); the file I/O
+(append_entries / write_snapshot) can run on a writer thread. Downstream consumers can tail the journal with
+read_since(seq) instead of re-reading the full current data file. A line
+torn by a crash mid-append is cut off during recovery, before anything new
+is appended.
+"""
+
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+OP_INSERT = 'insert'
+OP_UPDATE = 'update'
+OP_REMOVE = 'remove'
+
+
+class ChangeJournal:
+    """Sequence-numbered change log with snapshot compaction"""
+
+    def __init__(self, journal_file: str, snapshot_file: str,
+                 snapshot_every: int = 500, logger: Optional[logging.Logger] = None):
+        self.journal_file = journal_file
+        self.snapshot_file = snapshot_file
+        self.snapshot_every = max(1, snapshot_every)
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.last_seq = 0
+        self.snapshot_seq = 0
+        self.entries_since_snapshot = 0
+
+    # ----------------------------- Writing ----------------------------- #
+
+    def record_changes(self, changes: Dict[str, List], key_func) -> int:
+        """
+        Append one journal entry per change from detect_data_changes.
+
+        Args:
+            changes: {'new': [match], 'updated': [{match_key, new_data, changes}], 'removed': [match]}
+            key_func: callable producing the match key (generate_match_key)
+
+        Returns:
+            Number of entries appended
+        """
+        return self.append_entries(self.prepare_entries(changes, key_func))
+
+    def prepare_entries(self, changes: Dict[str, List], key_func) -> List[Dict[str, Any]]:
+        """Number the changes as journal entries (match data copied, nothing written yet)"""
+        timestamp = datetime.now().isoformat()
+        lines = []
+
+        for match in changes.get('new', []):
+            if isinstance(match, dict):
+                lines.append(self._make_entry(OP_INSERT, key_func(match), dict(match), timestamp))
+
+        for update in changes.get('updated', []):
+            entry = self._make_entry(OP_UPDATE, update['match_key'], dict(update['new_data']), timestamp)
+            entry['fields'] = list(update.get('changes', []))
+            lines.append(entry)
+
+        for match in changes.get('removed', []):
+            if isinstance(match, dict):
+                lines.append(self._make_entry(OP_REMOVE, key_func(match), None, timestamp))
+
+        self.entries_since_snapshot += len(lines)
+        return lines
+
+    def append_entries(self, lines: List[Dict[str, Any]]) -> int:
+        """Append prepared entries to the journal file"""
+        if not lines:
+            return 0
+
+        try:
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(line, ensure_ascii=False) + '\n' for line in lines))
+        except Exception as e:
+            self.logger.error("Failed to append to change journal: %s", e)
+            return 0
+
+        return len(lines)
+
+    def _make_entry(self, op: str, key: str, data: Optional[Dict], timestamp: str) -> Dict[str, Any]:
+        self.last_seq += 1
+        return {'seq': self.last_seq, 'ts': timestamp, 'op': op, 'key': key, 'data': data}
+
+    def should_snapshot(self) -> bool:
+        """Check if enough entries have accumulated to compact the journal"""
+        return self.entries_since_snapshot >= self.snapshot_every
+
+    def begin_snapshot(self) -> int:
+        """Start a compaction at the last prepared entry; returns the sequence number for write_snapshot"""
+        self.snapshot_seq = self.last_seq
+        self.entries_since_snapshot = 0
+        return self.snapshot_seq
+
+    def write_snapshot(self, matches: Dict[str, Dict], seq: Optional[int] = None):
+        """
+        Write a compact snapshot of the current state and truncate the journal.
+        The snapshot is written atomically before the journal is cleared, so a
+        crash in between only leaves already-applied entries to be skipped on replay.
+
+        Args:
+            matches: match state after every entry up to seq
+            seq: sequence number from begin_snapshot (entries prepared later must
+                 be appended after this call); begins a snapshot now if omitted
+        """
+        if seq is None:
+            seq = self.begin_snapshot()
+        snapshot = {
+            'seq': seq,
+            'created': datetime.now().isoformat(),
+            'matches': matches
+        }
+
+        temp_file = self.snapshot_file + '.tmp'
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self.snapshot_file)
+
+            # Truncate journal - everything up to seq is in the snapshot now
+            open(self.journal_file, 'w', encoding='utf-8').close()
+            self.logger.info("Journal snapshot written at seq %d (%d matches)", seq, len(matches))
+        except Exception as e:
+            self.logger.error("Failed to write journal snapshot: %s", e)
+            try:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            except Exception:
+                pass
+
+    # ----------------------------- Reading ----------------------------- #
+
+    def read_since(self, seq: int) -> Iterator[Dict[str, Any]]:
+        """Yield journal entries with a sequence number greater than seq"""
+        for entry, _ in self._scan():
+            if entry.get('seq', 0) > seq:
+                yield entry
+
+    def _scan(self) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """Yield (entry, byte offset just past its line) up to the first unreadable line"""
+        if not os.path.exists(self.journal_file):
+            return
+
+        offset = 0
+        with open(self.journal_file, 'rb') as f:
+            for raw in f:
+                offset += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append - stop replay here
+                    self.logger.warning("Skipping unreadable journal line after byte %d", offset - len(raw))
+                    return
+                yield entry, offset
+
+    def _truncate_torn_tail(self, good_end: int):
+        """
+        Cut everything after the last readable entry, so new appends start on a
+        clean line instead of being glued onto (and lost with) a torn one.
+        """
+        try:
+            size = os.path.getsize(self.journal_file)
+        except OSError:
+            return
+
+        try:
+            with open(self.journal_file, 'r+b') as f:
+                if size > good_end:
+                    f.truncate(good_end)
+                    self.logger.warning("Truncated %d bytes of torn journal tail after seq %d",
+                                        size - good_end, self.last_seq)
+                if good_end:
+                    # The last entry may have been written without its newline
+                    f.seek(good_end - 1)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+        except OSError as e:
+            self.logger.error("Failed to repair change journal tail: %s", e)
+
+    def mtime(self) -> Optional[float]:
+        """Last modification time of the journal or its snapshot (None if neither exists)"""
+        times = []
+        for path in (self.journal_file, self.snapshot_file):
+            try:
+                times.append(os.path.getmtime(path))
+            except OSError:
+                pass
+        return max(times) if times else None
+
+    def recover(self) -> Tuple[Optional[Dict[str, Dict]], int]:
+        """
+        Rebuild match state from the latest snapshot plus the journal tail.
+
+        Returns:
+            (matches keyed by match_key, number of replayed entries), or
+            (None, 0) if neither snapshot nor journal exists.
+        """
+        matches: Dict[str, Dict] = {}
+        have_state = False
+
+        if os.path.exists(self.snapshot_file):
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    snapshot = json.load(f)
+                matches = snapshot.get('matches', {})
+                self.snapshot_seq = snapshot.get('seq', 0)
+                have_state = True
+            except Exception as e:
+                self.logger.warning("Could not load journal snapshot: %s", e)
+                matches = {}
+                self.snapshot_seq = 0
+
+        self.last_seq = self.snapshot_seq
+        replayed = 0
+
+        good_end = 0
+        try:
+            for entry, good_end in self._scan():
+                if entry.get('seq', 0) <= self.snapshot_seq:
+                    continue
+                self._apply(matches, entry)
+                self.last_seq = entry['seq']
+                replayed += 1
+                have_state = True
+        except Exception as e:
+            self.logger.warning("Journal replay stopped early: %s", e)
+        else:
+            self._truncate_torn_tail(good_end)
+
+        self.entries_since_snapshot = replayed
+
+        if not have_state:
+            return None, 0
+
+        self.logger.info("Recovered %d matches from snapshot seq %d + %d journal entries",
+                         len(matches), self.snapshot_seq, replayed)
+        return matches, replayed
+
+    @staticmethod
+    def _apply(matches: Dict[str, Dict], entry: Dict[str, Any]):
+        """Apply a single journal entry to a match dictionary"""
+        op = entry.get('op')
+        key = entry.get('key')
+
+        if op == OP_INSERT:
+            matches[key] = entry.get('data') or {}
+        elif op == OP_UPDATE:
+            if key in matches:
+                matches[key].update(entry.get('data') or {})
+            else:
+                matches[key] = entry.get('data') or {}
+        elif op == OP_REMOVE:
+            matches.pop(key, None)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+SERIALIZATION CODEC BENCHMARK
+Measures encode/decode time and size for each data file codec on real
+payloads (the files the scrapers write), against the old stdlib
+json.dumps(indent=2, ensure_ascii=False) baseline.
+
+Usage:
+    python codec_benchmark.py                          # default data files that exist
+    python codec_benchmark.py bet365_live_current.json outputs/current_pregame_data.json
+    python codec_benchmark.py --repeat 50 --report codec_report.json
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Callable
+
+from metrics import summarize_latencies
+from serialization import CODEC_CHOICES, MSGPACK_AVAILABLE, get_codec, load_file
+
+DEFAULT_PAYLOADS = [
+    "bet365_live_current.json",
+    "bet365_live_history.json",
+    "bet365_statistics.json",
+    "bet365_live_statistics.json",
+    "outputs/current_pregame_data.json",
+    "outputs/pregame_history.json",
+]
+
+
+def _time(func: Callable, repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def benchmark_payload(document: Any, repeat: int) -> Dict[str, Any]:
+    """Encode/decode latency (ms) and encoded size per codec for one document"""
+    codecs = {
+        'stdlib-json-indent': (
+            lambda doc: json.dumps(doc, indent=2, ensure_ascii=False, default=str).encode('utf-8'),
+            lambda payload: json.loads(payload)
+        )
+    }
+    for name in CODEC_CHOICES:
+        if name == 'msgpack' and not MSGPACK_AVAILABLE:
+            continue
+        codec = get_codec(name)
+        codecs[name] = (codec.encode, codec.decode)
+
+    results = {}
+    for name, (encode, decode) in codecs.items():
+        payload = encode(document)
+        results[name] = {
+            'bytes': len(payload),
+            'encode_ms': summarize_latencies(_time(lambda: encode(document), repeat)),
+            'decode_ms': summarize_latencies(_time(lambda: decode(payload), repeat))
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark data file codecs on real payloads')
+    parser.add_argument('files', nargs='*', help='Data files to use as payloads (default: known data files)')
+    parser.add_argument('--repeat', type=int, default=20, help='Encode/decode repetitions per codec (default: 20)')
+    parser.add_argument('--report', default=None, help='Write the JSON report to this file as well')
+    args = parser.parse_args()
+
+    paths = [Path(p) for p in (args.files or DEFAULT_PAYLOADS)]
+    paths = [p for p in paths if p.exists()]
+    if not paths:
+        print("No payload files found - run a scraper first or pass files explicitly")
+        return
+
+    print("SERIALIZATION CODEC BENCHMARK")
+    print("=" * 78)
+    if not MSGPACK_AVAILABLE:
+        print("msgpack not installed - skipping the msgpack codec")
+
+    report = {}
+    for path in paths:
+        document = load_file(path)
+        results = benchmark_payload(document, max(1, args.repeat))
+        report[str(path)] = results
+
+        baseline = results['stdlib-json-indent']
+        print(f"\n{path}")
+        print(f"  {'codec':<20}{'size':>12}{'vs base':>9}{'encode p50':>13}{'decode p50':>13}")
+        for name, result in results.items():
+            ratio = result['bytes'] / baseline['bytes'] if baseline['bytes'] else 0
+            print(f"  {name:<20}{result['bytes']:>12,}{ratio:>8.2f}x"
+                  f"{result['encode_ms']['p50']:>11.2f}ms{result['decode_ms']['p50']:>11.2f}ms")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -87,6 +87,7 @@ def get_comprehensive_extraction_script(sport_code, sport_mappings_js, match_sel
             }},
             debug: {{
                 selectors_tried: [],
+                selector_stats: {{}},
                 extraction_time: new Date().toISOString(),
                 market_debug: [],
                 sport_detection: {{
@@ -98,12 +99,24 @@ def get_comprehensive_extraction_script(sport_code, sport_mappings_js, match_sel
             }}
         }};
         
+        // Per-selector attempts/hits/elements/time, fed back into the selector learning store
+        const recordSelector = (type, selector, elements, hit, started) => {{
+            const byType = results.debug.selector_stats[type] = results.debug.selector_stats[type] || {{}};
+            const stat = byType[selector] = byType[selector] || {{ attempts: 0, hits: 0, elements: 0, ms: 0 }};
+            stat.attempts += 1;
+            stat.hits += hit ? 1 : 0;
+            stat.elements += elements;
+            stat.ms += performance.now() - started;
+        }};
+        
         // Find all fixtures
         const fixtureSelectors = JSON.parse('{match_selectors_js}');
         let fixtures = [];
 
         for (const selector of fixtureSelectors) {{
+            const started = performance.now();
             fixtures = document.querySelectorAll(selector);
+            recordSelector('match_containers', selector, fixtures.length, fixtures.length > 0, started);
             if (fixtures.length > 0) {{
                 console.log(`Found ${{fixtures.length}} fixtures using: ${{selector}}`);
                 results.debug.selectors_tried.push(`FIXTURES:${{selector}}:${{fixtures.length}}`);
@@ -146,18 +159,21 @@ def get_comprehensive_extraction_script(sport_code, sport_mappings_js, match_sel
             try {{
                 console.log('[TEAMS] Starting extraction...');
                 
-                // Try multiple team selector patterns
-                const teamSelectors = [
+                // Try multiple team selector patterns: learned order first, known patterns as fallback
+                const teamSelectors = [...new Set([
+                    ...{team_selectors_js},
                     '.ovm-FixtureDetailsTwoWay_TeamName',
                     '.ovm-FixtureDetailsWithIndicators_Team',
                     '.ovm-FixtureDetailsTwoWayAmericanFootball_TeamName',
                     '.ovm-FixtureDetailsBaseball_Teams',
                     '[class*="TeamName"]'
-                ];
+                ])];
                 
                 let teamElements = [];
                 for (const selector of teamSelectors) {{
+                    const started = performance.now();
                     teamElements = fixture.querySelectorAll(selector);
+                    recordSelector('team_names', selector, teamElements.length, teamElements.length >= 2, started);
                     if (teamElements.length >= 2) {{
                         console.log(`[TEAMS] Using selector: ${{selector}}`);
                         break;
@@ -327,7 +343,9 @@ def get_comprehensive_extraction_script(sport_code, sport_mappings_js, match_sel
                 let timerEl = null;
                 
                 for (const selector of statusSelectors) {{
+                    const started = performance.now();
                     timerEl = fixture.querySelector(selector);
+                    recordSelector('status', selector, timerEl ? 1 : 0, !!timerEl, started);
                     if (timerEl) {{
                         console.log(`[TIME] Using selector: ${{selector}}`);
                         break;
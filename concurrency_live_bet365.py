@@ -21,6 +21,15 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 from live_parser_bet365 import UltimateLiveScraper
+from pipeline_replay import ExtractionRecorder
+from odds_analytics import OddsAnalytics
+from odds_values import attach_parsed_odds, parse_cache_info
+from sqlite_store import STORAGE_CHOICES
+from current_shards import CURRENT_LAYOUTS, VOLATILE_MATCH_FIELDS, match_digest
+from serialization import CODEC_CHOICES, load_file
+from live_statistics import LiveStatisticsAggregator
+from event_bus import EventBusPublisher, default_address
+from metrics import REGISTRY
 
 class TabState:
     """Represents the state of a persistent browser tab"""
@@ -45,6 +54,17 @@ class TabState:
         return f"<Tab {self.sport_name} ({self.sport_code}): {status}, empty_checks={self.consecutive_empty_checks}>"
 
 
+# Pipeline metrics (sent to the dashboard with event bus updates, rendered at its /metrics)
+EXTRACTION_SECONDS = REGISTRY.histogram('bet365_live_extraction_seconds', 'Per-sport tab extraction time',
+                                        ['sport'])
+EXTRACTION_ERRORS = REGISTRY.counter('bet365_live_extraction_errors', 'Failed tab extractions', ['sport'])
+CYCLE_SECONDS = REGISTRY.histogram('bet365_live_cycle_seconds',
+                                   'Extraction cycle duration, from the first tab to processed changes')
+LIVE_MATCHES = REGISTRY.gauge('bet365_live_matches', 'Live matches found in the last cycle')
+MATCH_CHANGES = REGISTRY.counter('bet365_live_match_changes', 'Matches new, updated or removed per cycle',
+                                 ['change'])
+
+
 class ConcurrentLiveScraper(UltimateLiveScraper):
     """
     Enhanced live scraper with persistent tab pool and comprehensive extraction.
@@ -63,9 +83,24 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
                  disable_broadcasting=False,
                  recheck_interval_minutes=5,
                  cleanup_threshold_checks=10,
-                 broadcast_callback=None):
+                 broadcast_callback=None,
+                 output_dir=None,
+                 record_path=None,
+                 removal_grace=None,
+                 write_latency=None,
+                 write_staleness=None,
+                 storage='json',
+                 current_layout='single',
+                 binary_snapshot=False,
+                 codec=None,
+                 config_dir=None,
+                 save_selectors=True):
         """Initialize concurrent scraper with persistent tab pool"""
-        super().__init__(disable_broadcasting=disable_broadcasting)
+        super().__init__(disable_broadcasting=disable_broadcasting, output_dir=output_dir,
+                         removal_grace=removal_grace, write_latency=write_latency,
+                         write_staleness=write_staleness, storage=storage,
+                         current_layout=current_layout, binary_snapshot=binary_snapshot,
+                         codec=codec, config_dir=config_dir, save_selectors=save_selectors)
         
         from typing import Any, Optional
         self.tab_pool: Dict[str, TabState] = {}
@@ -79,6 +114,18 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
         # CRITICAL FIX: Use asyncio.Lock for proper async synchronization
         # threading.Lock() doesn't work with async code - causes race conditions!
         self._file_lock = asyncio.Lock()
+
+        # Optional capture of raw per-tab results for offline replay
+        self.recorder: Optional[ExtractionRecorder] = None
+        if record_path:
+            self.recorder = ExtractionRecorder(record_path)
+            self.logger.info(f"  - Recording extraction results to {record_path}")
+
+        # Resident URL/match counters behind bet365_live_statistics.json (loaded on first cycle)
+        self.live_stats = LiveStatisticsAggregator()
+
+        # Vectorized implied probability / margin / movement stage, run once per cycle
+        self.odds_analytics = OddsAnalytics()
         
         self.logger.info(f"Persistent tab pool scraper initialized")
         self.logger.info(f"  - Recheck interval: {recheck_interval_minutes} minutes")
@@ -270,6 +317,7 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
             matches = await self.extract_matches_from_page(tab_state.page, tab_state.sport_code)
 
             elapsed = asyncio.get_event_loop().time() - start_time
+            EXTRACTION_SECONDS.labels(sport=tab_state.sport_name).observe(elapsed)
             self.logger.debug(f"[TAB] {tab_state.sport_code} extracted {len(matches)} matches, elapsed={elapsed:.3f}s")
 
             tab_state.last_check_time = datetime.now()
@@ -297,6 +345,7 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
         except Exception as e:
             self.logger.error(f"  {tab_state.sport_name} extraction error: {e}")
             tab_state.error_count += 1
+            EXTRACTION_ERRORS.labels(sport=tab_state.sport_name).inc()
 
             return {
                 'sport': tab_state.sport_name,
@@ -486,6 +535,9 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
         all_matches = []
         valid_results = []
 
+        if self.recorder:
+            self.recorder.begin_cycle()
+
         # Process results as they complete
         for completed_task in asyncio.as_completed(task_list):
             try:
@@ -497,6 +549,12 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
 
                 valid_results.append(result)
 
+                if self.recorder:
+                    self.recorder.record_result(result)
+
+                # Raw result is recorded above; everything downstream reads the parsed odds
+                self.ingest_result(result)
+
                 # Process this result - collect matches but DON'T save yet
                 if result.get('matches'):
                     sport_matches = result['matches']
@@ -516,12 +574,25 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
             except Exception as e:
                 self.logger.error(f"Error processing completed task: {e}")
 
+        if self.recorder:
+            self.recorder.end_cycle()
+
         # SAVE ALL COLLECTED DATA ONCE AT THE END OF THE EXTRACTION CYCLE
-        if all_matches:
-            await self._save_all_collected_data(valid_results)
+        await self.persist_cycle_results(valid_results)
 
         return valid_results
 
+    def ingest_result(self, result: Dict[str, Any]):
+        """Parse every match's odds once as the tab result enters Python"""
+        for match in result.get('matches') or []:
+            if isinstance(match, dict):
+                attach_parsed_odds(match)
+
+    async def persist_cycle_results(self, results: List[Dict[str, Any]]):
+        """Persist one cycle's per-tab results if any tab produced matches"""
+        if any(result.get('matches') for result in results):
+            await self._save_all_collected_data(results)
+
     async def _save_incremental_data(self, result: Dict[str, Any]):
         """
         Save data incrementally with proper sport-specific replacement.
@@ -590,9 +661,7 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
                     if not isinstance(new_match, dict):
                         continue
 
-                    new_match['last_updated'] = datetime.now().isoformat()
-                    if 'first_seen' not in new_match:
-                        new_match['first_seen'] = datetime.now().isoformat()
+                    self._stamp_match_times(new_match, datetime.now().isoformat())
 
                     merged_matches.append(new_match)
 
@@ -618,14 +687,31 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
                     f"Total: {len(merged_matches)} matches ({sports_list})"
                 )
 
-                # Also save statistics snapshot
-                self._save_statistics_snapshot(current_data)
-
         except Exception as e:
             self.logger.error(f"Error saving incremental data: {e}")
             import traceback
             self.logger.error(traceback.format_exc())
 
+    def _stamp_match_times(self, match: Dict[str, Any], timestamp: str):
+        """
+        Set first_seen/last_updated on a freshly extracted match. A tracked match keeps
+        its times unless its content digest changed, so an unchanged match serializes
+        identically from cycle to cycle and its shard is not rewritten.
+        """
+        previous = self.current_matches.get(self.generate_match_key(match))
+        if previous is None:
+            match.setdefault('first_seen', timestamp)
+            match['last_updated'] = timestamp
+            return
+
+        match['first_seen'] = previous.get('first_seen', timestamp)
+        # Analytics are attached after the save, so they are not part of the extracted content
+        ignored = VOLATILE_MATCH_FIELDS + ('analytics',)
+        if match_digest(previous, ignored) != match_digest(match, ignored):
+            match['last_updated'] = timestamp
+        else:
+            match['last_updated'] = previous.get('last_updated', timestamp)
+
     async def _save_all_collected_data(self, all_results: List[Dict[str, Any]]):
         """
         Save all collected data from all sports in a single atomic operation.
@@ -650,12 +736,11 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
                 for result in all_results:
                     if result.get('matches'):
                         sport_matches = result['matches']
-                        # Add timestamps to matches
+                        # Add timestamps to matches (unchanged matches keep theirs)
+                        timestamp = datetime.now().isoformat()
                         for match in sport_matches:
                             if isinstance(match, dict):
-                                match['last_updated'] = datetime.now().isoformat()
-                                if 'first_seen' not in match:
-                                    match['first_seen'] = datetime.now().isoformat()
+                                self._stamp_match_times(match, timestamp)
                         all_matches.extend(sport_matches)
 
                 # Deduplicate matches across all sports
@@ -682,9 +767,6 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
                     f"✓ Saved complete extraction cycle: {len(all_matches)} matches ({sports_list})"
                 )
 
-                # Also save statistics snapshot
-                self._save_statistics_snapshot(current_data)
-
         except Exception as e:
             self.logger.error(f"Error saving all collected data: {e}")
             import traceback
@@ -711,14 +793,9 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
             'summary': results.get('summary', {})
         }
 
-        import os
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        statistics_filename = os.path.join(script_dir, "bet365_statistics.json")
-
         try:
-            with open(statistics_filename, 'w', encoding='utf-8') as f:
-                json.dump(output, f, indent=2, ensure_ascii=False)
-            self.logger.info("Statistics saved successfully (no match details)")
+            self.persist_document('statistics', self.statistics_file, output)
+            self.logger.info("Statistics queued for writing (no match details)")
         except Exception as e:
             self.logger.error(f"Failed to save statistics: {e}")
 
@@ -731,157 +808,144 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
             'sports_breakdown': sports_count
         }
 
-        # ATOMIC FILE WRITE: Write to temp file first, then rename
-        temp_file = self.current_data_file + '.tmp'
+        # Serialized off the loop and written atomically (temp file + rename) by the writer thread
         try:
-            # Write to temporary file
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(dashboard_data, f, indent=2, ensure_ascii=False)
-
-            # Atomic rename (this is atomic on most filesystems)
-            os.replace(temp_file, self.current_data_file)
-
-            self.logger.info(f"Dashboard data saved atomically to {self.current_data_file}")
-
+            self.persist_document('current', self.current_data_file, dashboard_data)
+            self.logger.info(f"Dashboard data queued for atomic write to {self.current_data_file}")
         except Exception as e:
             self.logger.error(f"Failed to save dashboard data: {e}")
-            # Clean up temp file if it exists
-            try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
-            except Exception:
-                pass
 
-    def _save_statistics_snapshot(self, data: Dict[str, Any]):
-        """Save a separate statistics snapshot for monitoring - URL and update tracking (no match details)"""
+    def _update_live_statistics(self, changes: Dict[str, List]):
+        """Feed one cycle's changes to the resident statistics aggregator and flush when due"""
         try:
-            stats_file = Path('bet365_live_statistics.json')
+            if not self.live_stats.loaded:
+                # Read the previous statistics once per session
+                document = None
+                if self.storage == 'sqlite':
+                    document = self.sqlite_store.get_document('live_statistics')
+                elif Path(self.live_statistics_file).exists():
+                    try:
+                        document = load_file(self.live_statistics_file)
+                    except Exception:
+                        document = None
+                # current_matches already includes this cycle's changes - seed with the state before them
+                new_keys = {self.generate_match_key(m) for m in changes.get('new', [])}
+                previous = [m for key, m in self.current_matches.items() if key not in new_keys]
+                previous.extend(changes.get('removed', []))
+                self.live_stats.load(document, previous)
 
-            # Load existing stats to maintain historical data
-            existing_stats = {}
-            if stats_file.exists():
-                try:
-                    with open(stats_file, 'r', encoding='utf-8') as f:
-                        existing_stats = json.load(f)
-                except Exception:
-                    existing_stats = {}
-
-            # Initialize stats structure
-            if 'url_tracking' not in existing_stats:
-                existing_stats['url_tracking'] = {}
-            if 'match_updates' not in existing_stats:
-                existing_stats['match_updates'] = {}
-            if 'extraction_cycles' not in existing_stats:
-                existing_stats['extraction_cycles'] = 0
-
-            # Update extraction cycle count
-            existing_stats['extraction_cycles'] += 1
-            existing_stats['last_updated'] = datetime.now().isoformat()
-
-            # Track URL statistics (no match details)
-            matches = data.get('matches', [])
-            url_match_counts = {}
-
-            # Count matches per URL/sport
-            for match in matches:
-                if not isinstance(match, dict):
-                    continue
+            self.live_stats.record_cycle(changes)
 
-                sport_code = match.get('sport_code', match.get('code', 'unknown'))
-                sport_name = match.get('sport', 'unknown')
-                url_key = f"{sport_code}_{sport_name}"
+            if self.live_stats.should_flush():
+                self.persist_document('live_statistics', self.live_statistics_file, self.live_stats.to_document())
 
-                if url_key not in url_match_counts:
-                    url_match_counts[url_key] = {
-                        'sport_code': sport_code,
-                        'sport_name': sport_name,
-                        'count': 0
-                    }
-                url_match_counts[url_key]['count'] += 1
-
-            # Update URL tracking
-            for url_key, count_info in url_match_counts.items():
-                if url_key not in existing_stats['url_tracking']:
-                    existing_stats['url_tracking'][url_key] = {
-                        'sport_code': count_info['sport_code'],
-                        'sport_name': count_info['sport_name'],
-                        'total_matches_ever': 0,
-                        'current_matches': 0,
-                        'update_cycles': 0,
-                        'last_seen': None,
-                        'first_seen': datetime.now().isoformat()
-                    }
+        except Exception as e:
+            self.logger.error(f"Error updating live statistics: {e}")
+
+    def flush_live_statistics(self):
+        """Write pending statistics regardless of the flush interval (shutdown)"""
+        if self.live_stats.dirty:
+            self.persist_document('live_statistics', self.live_statistics_file, self.live_stats.to_document())
+    
+    async def process_cycle_results(self, results: List[Dict[str, Any]], extraction_count: int,
+                                    start_time: float) -> Dict[str, List]:
+        """
+        Run one cycle's per-tab results through deduplication, change detection,
+        history persistence and dashboard broadcast. Shared by live monitoring and
+        the offline replay driver (pipeline_replay.py).
+        """
+        all_matches = []
+        active_sports = 0
+        redirected_sports = 0
+
+        for result in results:
+            if result.get('matches'):
+                active_sports += 1
+                all_matches.extend(result['matches'])
+                self.logger.info(f"  {result['sport']}: {result['matches_found']} matches")
+            elif result.get('redirected'):
+                redirected_sports += 1
+                if extraction_count % 5 == 0:
+                    self.logger.info(f"  - {result['sport']}: Redirected (no matches)")
+            else:
+                self.logger.info(f"  - {result['sport']}: No matches")
 
-                url_stats = existing_stats['url_tracking'][url_key]
-                url_stats['current_matches'] = count_info['count']
-                url_stats['total_matches_ever'] = max(url_stats['total_matches_ever'], count_info['count'])
-                url_stats['update_cycles'] += 1
-                url_stats['last_seen'] = datetime.now().isoformat()
+        all_matches = self.deduplicate_matches(all_matches)
+        analytics_summary = self.odds_analytics.run_cycle(all_matches, self.generate_match_key)
 
-            # Track individual match updates (no match details, just counts)
-            for match in matches:
-                if not isinstance(match, dict):
-                    continue
+        changes = self.detect_data_changes(all_matches)
+        self.odds_analytics.forget(self.generate_match_key(m) for m in changes.get('removed', []))
+        self.process_data_changes(changes)
+        self._update_live_statistics(changes)
 
-                teams = match.get('teams', {})
-                home_team = teams.get('home', '').strip()
-                away_team = teams.get('away', '').strip()
-                sport_code = match.get('sport_code', match.get('code', 'unknown'))
-
-                if home_team and away_team:
-                    match_key = f"{sport_code}|{home_team} vs {away_team}"
-
-                    if match_key not in existing_stats['match_updates']:
-                        existing_stats['match_updates'][match_key] = {
-                            'sport_code': sport_code,
-                            'home_team': home_team,
-                            'away_team': away_team,
-                            'update_count': 0,
-                            'first_seen': datetime.now().isoformat(),
-                            'last_updated': datetime.now().isoformat(),
-                            'has_odds': False,
-                            'is_live': False
-                        }
-
-                    match_stats = existing_stats['match_updates'][match_key]
-                    match_stats['update_count'] += 1
-                    match_stats['last_updated'] = datetime.now().isoformat()
-                    match_stats['has_odds'] = match.get('has_odds', False)
-                    match_stats['is_live'] = match.get('live_fields', {}).get('is_live', False)
-
-            # Calculate summary statistics
-            existing_stats['summary'] = {
-                'total_urls_tracked': len(existing_stats['url_tracking']),
-                'total_matches_tracked': len(existing_stats['match_updates']),
-                'extraction_cycles': existing_stats['extraction_cycles'],
-                'most_active_url': max(existing_stats['url_tracking'].items(),
-                                     key=lambda x: x[1]['update_cycles'])[0] if existing_stats['url_tracking'] else None,
-                'most_updated_match': max(existing_stats['match_updates'].items(),
-                                        key=lambda x: x[1]['update_count'])[0] if existing_stats['match_updates'] else None,
-                'urls_with_matches': sum(1 for u in existing_stats['url_tracking'].values() if u['current_matches'] > 0),
-                'total_current_matches': sum(u['current_matches'] for u in existing_stats['url_tracking'].values())
-            }
+        elapsed = asyncio.get_event_loop().time() - start_time
+        CYCLE_SECONDS.observe(elapsed)
+        LIVE_MATCHES.set(len(all_matches))
+        for change in ('new', 'updated', 'removed'):
+            MATCH_CHANGES.labels(change=change).inc(len(changes.get(change, [])))
 
-            # Clean up old match tracking (keep only recent ones)
-            cutoff_date = datetime.now() - timedelta(hours=24)
-            to_remove = []
-            for match_key, match_data in existing_stats['match_updates'].items():
-                try:
-                    last_updated = datetime.fromisoformat(match_data['last_updated'])
-                    if last_updated < cutoff_date:
-                        to_remove.append(match_key)
-                except Exception:
-                    to_remove.append(match_key)
+        if self.broadcast_callback:
+            try:
+                # Tracked matches after the removal grace window, so a match that is only
+                # briefly missing stays on the dashboard (and out of event bus removals)
+                published = list(self.current_matches.values())
+                dashboard_data = {
+                    "type": "data_update",
+                    "matches": published,
+                    "total_matches": len(published),
+                    "live_matches": len([m for m in published if m.get('status', '').lower() == 'live']),
+                    "extraction_count": extraction_count,
+                    "timestamp": datetime.now().isoformat(),
+                    "last_update": datetime.now().isoformat(),
+                    "concurrent_mode": True,
+                    "persistent_tabs": True,
+                    "stats": {
+                        "active_sports": active_sports,
+                        "redirected_sports": redirected_sports,
+                        "new_matches": len(changes.get('new', [])),
+                        "updated_matches": len(changes.get('updated', [])),
+                        "removed_matches": len(changes.get('removed', [])),
+                        "pending_removals": len(self.removal_candidates),
+                        "churn": dict(self.churn_stats),
+                        "odds_analytics": analytics_summary,
+                        "odds_parse_cache": parse_cache_info(),
+                        "persistence": self.write_behind.metrics(),
+                        "active_tabs": sum(1 for t in self.tab_pool.values() if t.is_active),
+                        "inactive_tabs": sum(1 for t in self.tab_pool.values() if not t.is_active),
+                        "extraction_time": elapsed
+                    }
+                }
+                await self.broadcast_callback(dashboard_data)
+            except Exception as e:
+                self.logger.error(f"Dashboard broadcast error: {e}")
+
+        self.logger.info(f"\n{'='*60}")
+        self.logger.info(f"Extraction #{extraction_count} completed in {elapsed:.2f}s")
+        self.logger.info(f"Stats:")
+        self.logger.info(f"   - Total matches: {len(all_matches)}")
+        self.logger.info(f"   - Active sports: {active_sports}")
+        self.logger.info(f"   - Redirected sports: {redirected_sports}")
+        self.logger.info(f"   - New matches: {len(changes.get('new', []))}")
+        self.logger.info(f"   - Updated matches: {len(changes.get('updated', []))}")
+        self.logger.info(f"   - Removed matches: {len(changes.get('removed', []))}")
+        self.logger.info(f"   - Pending removals (in grace window): {len(self.removal_candidates)}")
+        self.logger.info(f"   - Flicker removals suppressed (total): {self.churn_stats['suppressed_removals']}")
+        self.logger.info(f"   - Prices analysed: {analytics_summary['prices']} "
+                         f"({analytics_summary['moved']} moved, avg margin {analytics_summary['avg_margin_pct']}%)")
+        persistence_metrics = self.write_behind.metrics()
+        self.logger.info(f"   - Writes: {persistence_metrics['writes']} of {persistence_metrics['puts']} "
+                         f"({persistence_metrics['coalesced']} coalesced), "
+                         f"writer queue {persistence_metrics['writer']['queue_depth']}, "
+                         f"write p95 {persistence_metrics['writer']['write_ms']['p95']}ms")
 
-            for match_key in to_remove:
-                del existing_stats['match_updates'][match_key]
+        active_tabs = sum(1 for t in self.tab_pool.values() if t.is_active)
+        inactive_tabs = sum(1 for t in self.tab_pool.values() if not t.is_active)
+        self.logger.info(f"   - Active tabs: {active_tabs}")
+        self.logger.info(f"   - Inactive tabs: {inactive_tabs}")
+        self.logger.info(f"{'='*60}\n")
 
-            with open(stats_file, 'w', encoding='utf-8') as f:
-                json.dump(existing_stats, f, indent=2, ensure_ascii=False)
+        return changes
 
-        except Exception as e:
-            self.logger.error(f"Error saving statistics snapshot: {e}")
-    
     async def run_concurrent_monitoring(self, sport_codes=None, interval_seconds=10, duration_seconds: Optional[int]=None):
         """Run real-time monitoring with persistent tab pool"""
         self.logger.info(f"Starting PERSISTENT TAB POOL MONITORING (interval: {interval_seconds}s)")
@@ -955,71 +1019,7 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
                     self.logger.info("Extracting from all active tabs...")
                     results = await self.extract_all_tabs_incremental()
                     
-                    all_matches = []
-                    active_sports = 0
-                    redirected_sports = 0
-
-                    for result in results:
-                        if result.get('matches'):
-                            active_sports += 1
-                            all_matches.extend(result['matches'])
-                            self.logger.info(f"  {result['sport']}: {result['matches_found']} matches")
-                        elif result.get('redirected'):
-                            redirected_sports += 1
-                            if extraction_count % 5 == 0:
-                                self.logger.info(f"  - {result['sport']}: Redirected (no matches)")
-                        else:
-                            self.logger.info(f"  - {result['sport']}: No matches")
-
-                    all_matches = self.deduplicate_matches(all_matches)
-                    
-                    changes = self.detect_data_changes(all_matches)
-                    self.process_data_changes(changes)
-                    
-                    elapsed = asyncio.get_event_loop().time() - start_time
-                    
-                    if self.broadcast_callback:
-                        try:
-                            dashboard_data = {
-                                "type": "data_update",
-                                "matches": all_matches,
-                                "total_matches": len(all_matches),
-                                "live_matches": len([m for m in all_matches if m.get('status', '').lower() == 'live']),
-                                "extraction_count": extraction_count,
-                                "timestamp": datetime.now().isoformat(),
-                                "last_update": datetime.now().isoformat(),
-                                "concurrent_mode": True,
-                                "persistent_tabs": True,
-                                "stats": {
-                                    "active_sports": active_sports,
-                                    "redirected_sports": redirected_sports,
-                                    "new_matches": len(changes.get('new', [])),
-                                    "updated_matches": len(changes.get('updated', [])),
-                                    "removed_matches": len(changes.get('removed', [])),
-                                    "active_tabs": sum(1 for t in self.tab_pool.values() if t.is_active),
-                                    "inactive_tabs": sum(1 for t in self.tab_pool.values() if not t.is_active),
-                                    "extraction_time": elapsed
-                                }
-                            }
-                            await self.broadcast_callback(dashboard_data)
-                        except Exception as e:
-                            self.logger.error(f"Dashboard broadcast error: {e}")
-                    
-                    self.logger.info(f"\n{'='*60}")
-                    self.logger.info(f"Extraction #{extraction_count} completed in {elapsed:.2f}s")
-                    self.logger.info(f"Stats:")
-                    self.logger.info(f"   - Total matches: {len(all_matches)}")
-                    self.logger.info(f"   - Active sports: {active_sports}")
-                    self.logger.info(f"   - Redirected sports: {redirected_sports}")
-                    self.logger.info(f"   - New matches: {len(changes.get('new', []))}")
-                    self.logger.info(f"   - Updated matches: {len(changes.get('updated', []))}")
-                    self.logger.info(f"   - Removed matches: {len(changes.get('removed', []))}")
-                    
-                    active_tabs = sum(1 for t in self.tab_pool.values() if t.is_active)
-                    inactive_tabs = sum(1 for t in self.tab_pool.values() if not t.is_active)
-                    self.logger.info(f"   - Active tabs: {active_tabs}")
-                    self.logger.info(f"   - Inactive tabs: {inactive_tabs}")
-                    self.logger.info(f"{'='*60}\n")
+                    await self.process_cycle_results(results, extraction_count, start_time)
                     
                 except Exception as e:
                     self.logger.error(f"Extraction #{extraction_count} error: {e}")
@@ -1095,6 +1095,7 @@ class ConcurrentLiveScraper(UltimateLiveScraper):
             
             changes = self.detect_data_changes(all_matches)
             self.process_data_changes(changes)
+            self._update_live_statistics(changes)
             
             extraction_results = {
                 'timestamp': datetime.now().isoformat(),
@@ -1221,13 +1222,61 @@ async def main():
                        help='Specific sport codes to monitor (e.g., B1 B12 B18)')
     parser.add_argument('--duration', type=int, default=None,
                        help='Total duration in seconds to run the monitor (optional)')
+    parser.add_argument('--removal-grace-cycles', type=int, default=None,
+                       help='Cycles a match may be missing before it is finalized as removed, for every sport '
+                            '(default: per sport, 3)')
+    parser.add_argument('--removal-grace-seconds', type=int, default=None,
+                       help='Seconds a match may be missing before it is finalized as removed, for every sport '
+                            '(default: per sport, 30)')
+    parser.add_argument('--write-latency', type=float, default=None,
+                       help='Seconds of quiet before a dirty data file is written (default: 0.25)')
+    parser.add_argument('--write-staleness', type=float, default=None,
+                       help='Maximum seconds a data file may lag behind while updates keep arriving (default: 2.0)')
+    parser.add_argument('--storage', choices=list(STORAGE_CHOICES), default='json',
+                       help='Where to persist live data: json files, a sqlite database (bet365_data.db), or both')
+    parser.add_argument('--current-layout', choices=list(CURRENT_LAYOUTS), default='single',
+                       help='Current data as one file, per-sport shards + manifest (bet365_live_shards/), or both')
+    parser.add_argument('--binary-snapshot', action='store_true',
+                       help='Also publish current data as an mmap-able binary snapshot (bet365_live_current.bin)')
+    parser.add_argument('--codec', choices=list(CODEC_CHOICES), default='json-indent',
+                       help='Data file encoding: indented JSON (default), compact JSON, or msgpack')
+    parser.add_argument('--record', default=None,
+                       help='Record raw per-tab extraction results to this .ndjson.gz file for replay')
+    parser.add_argument('--event-bus', nargs='?', const=default_address(), default=None, metavar='ADDRESS',
+                       help='Push cycle deltas to the dashboard over a Unix socket path or host:port '
+                            f'(default when given without a value: {default_address()})')
     
     args = parser.parse_args()
     
+    # The grace flags apply to every sport, including those with their own REMOVAL_GRACE entry
+    removal_grace = None
+    if args.removal_grace_cycles is not None or args.removal_grace_seconds is not None:
+        removal_grace = {}
+        for sport, grace in ConcurrentLiveScraper.REMOVAL_GRACE.items():
+            grace = dict(grace)
+            if args.removal_grace_cycles is not None:
+                grace['cycles'] = max(1, args.removal_grace_cycles)
+            if args.removal_grace_seconds is not None:
+                grace['seconds'] = max(0, args.removal_grace_seconds)
+            removal_grace[sport] = grace
+
     scraper = ConcurrentLiveScraper(
         recheck_interval_minutes=args.recheck,
-        cleanup_threshold_checks=args.cleanup
+        cleanup_threshold_checks=args.cleanup,
+        record_path=args.record,
+        removal_grace=removal_grace,
+        write_latency=args.write_latency,
+        write_staleness=args.write_staleness,
+        storage=args.storage,
+        current_layout=args.current_layout,
+        binary_snapshot=args.binary_snapshot,
+        codec=args.codec
     )
+
+    event_bus = None
+    if args.event_bus:
+        event_bus = EventBusPublisher(args.event_bus, scraper.generate_match_key, logger=scraper.logger)
+        scraper.broadcast_callback = event_bus.publish
     
     sport_codes = None
     if args.sports:
@@ -1246,16 +1295,32 @@ async def main():
     print(f"Update interval: {args.interval}s")
     print(f"Re-check interval: {args.recheck} minutes")
     print(f"Cleanup threshold: {args.cleanup} empty checks")
+    print(f"Storage: {args.storage}")
+    print(f"Current data layout: {args.current_layout}")
+    print(f"Codec: {args.codec}")
+    if args.record:
+        print(f"Recording to: {args.record}")
+    if args.event_bus:
+        print(f"Event bus: {args.event_bus}")
     print("=" * 60)
     
     if args.interval < 1:
         print("Interval too small, using minimum of 1 second")
         args.interval = 1
 
-    if args.mode == 'single':
-        await scraper.run_concurrent_extraction(sport_codes)
-    else:
-        await scraper.run_concurrent_monitoring(sport_codes, args.interval, duration_seconds=args.duration)
+    try:
+        if args.mode == 'single':
+            await scraper.run_concurrent_extraction(sport_codes)
+        else:
+            await scraper.run_concurrent_monitoring(sport_codes, args.interval, duration_seconds=args.duration)
+    finally:
+        if scraper.recorder:
+            scraper.recorder.close()
+        if event_bus:
+            event_bus.close()
+        scraper.flush_live_statistics()
+        scraper.save_selector_performance(force=True)
+        scraper.write_behind.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+PER-SPORT SHARDED CURRENT DATA
+Sharded alternative to the single bet365_live_current.json file.
+
+Layout (in bet365_live_shards/ next to bet365_live_current.json):
+- <sport>.json      One shard per sport: {'sport': ..., 'matches': [...]}
+- manifest.json     Document metadata (last_updated, totals, sports_breakdown, ...)
+                    plus per-shard file, version, checksum and match count
+
+The writer serializes every shard on the persistence thread, but only
+rewrites shards whose content changed (first_seen/last_updated are left out
+of that comparison); the manifest is replaced last, so it is the commit
+point for a cycle. Readers poll the small manifest and only
+re-read and parse shards whose version moved, verifying the checksum of the
+bytes they read (a shard rewritten after the manifest was read is picked up
+on the next poll).
+"""
+
+import hashlib
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import orjson
+
+from snapshot_publisher import SnapshotPublisher
+
+SHARD_DIR_NAME = "bet365_live_shards"
+MANIFEST_FILE = "manifest.json"
+CURRENT_LAYOUTS = ('single', 'sharded', 'both')
+# Per-match timestamps that do not count as a content change
+VOLATILE_MATCH_FIELDS = ('last_updated', 'first_seen')
+
+
+def shard_file_name(sport: str) -> str:
+    """File name for a sport's shard ('Table Tennis' -> 'table_tennis.json')"""
+    slug = re.sub(r'[^a-z0-9]+', '_', str(sport).lower()).strip('_')
+    return f"{slug or 'unknown'}.json"
+
+
+def shard_checksum(payload: bytes) -> str:
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def content_checksum(sport: str, matches: List[Dict[str, Any]]) -> str:
+    """Checksum of a shard's matches without their volatile timestamps"""
+    stable = [{key: value for key, value in match.items() if key not in VOLATILE_MATCH_FIELDS}
+              for match in matches]
+    return shard_checksum(orjson.dumps({'sport': sport, 'matches': stable}, default=str,
+                                       option=orjson.OPT_NON_STR_KEYS))
+
+
+def match_digest(match: Dict[str, Any], exclude=VOLATILE_MATCH_FIELDS) -> str:
+    """Checksum of one match's content, skipping the given (by default volatile) fields"""
+    stable = {key: value for key, value in match.items() if key not in exclude}
+    return shard_checksum(orjson.dumps(stable, default=str,
+                                       option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS))
+
+
+class ShardedCurrentWriter:
+    """Writes the current-data document as per-sport shards plus a manifest (writer thread only)"""
+
+    def __init__(self, shard_dir: str, logger: Optional[logging.Logger] = None):
+        self.shard_dir = shard_dir
+        self.manifest_file = os.path.join(shard_dir, MANIFEST_FILE)
+        self.logger = logger or logging.getLogger(__name__)
+        self.publisher = SnapshotPublisher(logger=self.logger)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        # Continue shard versions across restarts so readers never see a version go back
+        self.manifest = self._load_manifest()
+        self.shards_written = 0
+        self.shards_skipped = 0
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_file, 'rb') as f:
+                manifest = orjson.loads(f.read())
+            if isinstance(manifest.get('shards'), dict):
+                return manifest
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable shard manifest {self.manifest_file}: {e}")
+        return {'generation': 0, 'shards': {}}
+
+    def write(self, document: Dict[str, Any]):
+        """Split a current-data document by sport and rewrite only the shards that changed"""
+        by_sport: Dict[str, List[Dict[str, Any]]] = {}
+        for match in document.get('matches', []):
+            if isinstance(match, dict):
+                by_sport.setdefault(match.get('sport', 'Unknown'), []).append(match)
+
+        previous = self.manifest.get('shards', {})
+        shards: Dict[str, Dict[str, Any]] = {}
+        changed = False
+        timestamp = datetime.now().isoformat()
+
+        for sport, matches in by_sport.items():
+            content = content_checksum(sport, matches)
+            entry = previous.get(sport)
+
+            if entry and entry.get('content') == content:
+                shards[sport] = entry
+                self.shards_skipped += 1
+                continue
+
+            payload = orjson.dumps({'sport': sport, 'matches': matches}, default=str,
+                                   option=orjson.OPT_NON_STR_KEYS)
+            file_name = shard_file_name(sport)
+            self.publisher.publish_bytes(os.path.join(self.shard_dir, file_name), payload, stamp=False)
+            shards[sport] = {
+                'file': file_name,
+                'version': (entry or {}).get('version', 0) + 1,
+                'checksum': shard_checksum(payload),  # of the file's bytes, verified by readers
+                'content': content,
+                'matches': len(matches),
+                'updated': timestamp
+            }
+            self.shards_written += 1
+            changed = True
+
+        # Sports with no live matches left lose their shard
+        for sport, entry in previous.items():
+            if sport not in shards:
+                changed = True
+                try:
+                    os.remove(os.path.join(self.shard_dir, entry['file']))
+                except FileNotFoundError:
+                    pass
+
+        if not changed:
+            return
+
+        manifest = {key: value for key, value in document.items() if key != 'matches'}
+        manifest['generation'] = self.manifest.get('generation', 0) + 1
+        manifest['shards'] = shards
+        self.publisher.publish_bytes(self.manifest_file, self.publisher.serialize(manifest), stamp=False)
+        self.manifest = manifest
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'generation': self.manifest.get('generation', 0),
+            'shards': len(self.manifest.get('shards', {})),
+            'shards_written': self.shards_written,
+            'shards_skipped': self.shards_skipped
+        }
+
+
+class ShardedCurrentReader:
+    """Loads sharded current data, re-reading only shards whose version changed"""
+
+    def __init__(self, shard_dir: str, logger: Optional[logging.Logger] = None):
+        self.shard_dir = shard_dir
+        self.manifest_file = os.path.join(shard_dir, MANIFEST_FILE)
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.generation: Optional[int] = None
+        self.metadata: Dict[str, Any] = {}
+        # sport -> (version, matches)
+        self._shards: Dict[str, Tuple[int, List[Dict[str, Any]]]] = {}
+        self.shards_loaded = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.manifest_file)
+
+    def manifest_mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.manifest_file).st_mtime
+        except OSError:
+            return None
+
+    def refresh(self) -> bool:
+        """Re-read the manifest and any shards that moved. Returns True if anything changed."""
+        with open(self.manifest_file, 'rb') as f:
+            manifest = orjson.loads(f.read())
+        if manifest.get('generation') == self.generation:
+            return False
+
+        shards = manifest.get('shards', {})
+        complete = True
+        for sport, entry in shards.items():
+            cached = self._shards.get(sport)
+            if cached and cached[0] == entry.get('version'):
+                continue
+            try:
+                with open(os.path.join(self.shard_dir, entry['file']), 'rb') as f:
+                    payload = f.read()
+            except FileNotFoundError:
+                complete = False
+                continue
+            if shard_checksum(payload) != entry.get('checksum'):
+                # Shard already rewritten for the next generation - retry on the next poll
+                complete = False
+                continue
+            self._shards[sport] = (entry.get('version'), orjson.loads(payload).get('matches', []))
+            self.shards_loaded += 1
+
+        for sport in [s for s in self._shards if s not in shards]:
+            del self._shards[sport]
+
+        self.metadata = {key: value for key, value in manifest.items() if key != 'shards'}
+        if complete:
+            self.generation = manifest.get('generation')
+        return True
+
+    def load(self) -> Dict[str, Any]:
+        """Current-data document in the single-file layout, assembled from cached shards"""
+        self.refresh()
+        document = dict(self.metadata)
+        document['matches'] = [match for _, matches in self._shards.values() for match in matches]
+        document['total_matches'] = len(document['matches'])
+        return document
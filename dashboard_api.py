@@ -4,21 +4,37 @@ Real-time API Server for Live Betting Dashboard
 Serves data from the concurrent scraper to the React dashboard
 """
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-import json
 import asyncio
+import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
+import os
+import time
 import subprocess
+import sys
 import threading
 
+import orjson
+
 # Import the real-time monitoring system
 from realtime_monitor import RealTimeMonitor
+from odds_values import attach_parsed_odds
+from sqlite_store import SQLiteStore
+from current_shards import ShardedCurrentReader, SHARD_DIR_NAME, MANIFEST_FILE
+from binary_snapshot import BinarySnapshotReader, BINARY_SNAPSHOT_NAME, read_generation
+from snapshot_publisher import SnapshotReader
+from data_hub import DataHub, PatchStream
+from event_bus import EventBusServer, LiveMatchMirror, default_address
+from fanout import FanoutBroadcaster
+from http_cache import HTTPResponseCache
+from match_index import project
+from metrics import REGISTRY, CONTENT_TYPE
+from transform_cache import TransformCache
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -28,33 +44,28 @@ from contextlib import asynccontextmanager
 
 # Background task to monitor file changes and broadcast
 async def monitor_data_changes():
-    """Monitor data file for changes and broadcast to connected clients"""
-    last_modified = None
-
+    """Broadcast a sequenced patch to connected clients whenever the data hub's matches change"""
+    global data_changed
+    data_changed = asyncio.Event()
     while True:
+        data_changed.clear()
         try:
-            if CURRENT_DATA_FILE.exists():
-                current_modified = CURRENT_DATA_FILE.stat().st_mtime
-
-                if last_modified is None or current_modified > last_modified:
-                    last_modified = current_modified
-
-                    # Load and broadcast new data
-                    data = load_current_data()
-                    transformed_matches = transform_match_data(data.get('matches', []))
-
-                    await manager.broadcast({
-                        'type': 'update',
-                        'data': {
-                            'timestamp': data.get('timestamp'),
-                            'matches': transformed_matches,
-                            'summary': data.get('summary', {})
-                        }
-                    })
-
-                    logger.info(f"Broadcasted update to {len(manager.active_connections)} clients")
-
-            await asyncio.sleep(1)  # Check every second
+            message = patch_stream.advance()
+            if message:
+                await manager.broadcast(message)
+                if live_mirror.active():
+                    UPDATE_LATENCY_SECONDS.observe(time.monotonic() - live_mirror.last_event)
+
+                patch = message['data']
+                logger.info(f"Broadcasted patch {message['seq']} (+{len(patch['inserted'])} "
+                            f"~{len(patch['updated'])} -{len(patch['removed'])}) "
+                            f"to {len(manager.active_connections)} clients")
+
+            # Event bus updates wake the loop at once; file changes are picked up within a second
+            try:
+                await asyncio.wait_for(data_changed.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
 
         except Exception as e:
             logger.error(f"Error in monitor loop: {e}")
@@ -69,12 +80,20 @@ async def lifespan(app: FastAPI):
     # Startup
     live_task = asyncio.create_task(monitor_data_changes())
 
+    # The scraper pushes its cycle deltas here; files are only the fallback
+    event_bus_args = []
+    try:
+        await event_bus_server.start()
+        event_bus_args = ["--event-bus", EVENT_BUS_ADDRESS]
+    except OSError as e:
+        logger.warning(f"Event bus unavailable ({e}), live data will be read from files")
+
     # Start concurrent live scraper in a separate thread
     def start_concurrent_scraper():
         try:
             logger.info("Starting concurrent live scraper...")
-            python_path = r"C:\Users\User\Desktop\thesis\data\joy\python.exe"
-            subprocess.run([python_path, "concurrency_live_bet365.py", "--mode", "monitor", "--interval", "10"])
+            subprocess.run([sys.executable, "concurrency_live_bet365.py", "--mode", "monitor", "--interval", "10",
+                            *event_bus_args])
         except Exception as e:
             logger.error(f"Failed to start concurrent scraper: {e}")
 
@@ -82,34 +101,42 @@ async def lifespan(app: FastAPI):
     async def start_pregame_realtime_monitor():
         try:
             logger.info("Starting integrated pregame real-time monitor...")
-            monitor = RealTimeMonitor(update_interval=1.0)
+            monitor = RealTimeMonitor(update_interval=1.0,
+                                      storage='both' if STORAGE_DB_FILE.exists() else 'json')
             await monitor.start_monitoring()
         except Exception as e:
             logger.error(f"Failed to start pregame monitor: {e}")
     
-    scraper_thread = threading.Thread(target=start_concurrent_scraper, daemon=True)
-    scraper_thread.start()
-    
-    # Start pregame monitor as async task
-    pregame_task = asyncio.create_task(start_pregame_realtime_monitor())
-    
-    logger.info("API Server started - Live scraper and integrated pregame real-time monitor active")
+    pregame_task = None
+    if RUN_PRODUCERS:
+        scraper_thread = threading.Thread(target=start_concurrent_scraper, daemon=True)
+        scraper_thread.start()
+
+        # Start pregame monitor as async task
+        pregame_task = asyncio.create_task(start_pregame_realtime_monitor())
+
+        logger.info("API Server started - Live scraper and integrated pregame real-time monitor active")
+    else:
+        logger.info("API Server started - serving existing data only (BET365_DASHBOARD_PRODUCERS=0)")
     
     yield
     
     # Shutdown
+    await event_bus_server.stop()
     live_task.cancel()
-    pregame_task.cancel()
+    if pregame_task:
+        pregame_task.cancel()
     
     try:
         await live_task
     except asyncio.CancelledError:
         pass
         
-    try:
-        await pregame_task
-    except asyncio.CancelledError:
-        pass
+    if pregame_task:
+        try:
+            await pregame_task
+        except asyncio.CancelledError:
+            pass
 
 # Initialize FastAPI app with lifespan
 app = FastAPI(title="Live Betting Dashboard API", version="1.0.0", lifespan=lifespan)
@@ -129,58 +156,181 @@ HISTORY_DATA_FILE = Path("bet365_live_history.json")
 PREGAME_DATA_FILE = Path("outputs/current_pregame_data.json")  # Real-time pregame data from monitor
 PREGAME_HISTORY_FILE = Path("outputs/pregame_history.json")  # Pregame history from monitor
 LEGACY_PREGAME_DATA_FILE = Path("ultimate_revised_sport_bet365_data_latest.json")  # Consistent legacy format
+STORAGE_DB_FILE = Path("bet365_data.db")  # SQLite backend (scrapers run with --storage sqlite/both)
+CURRENT_SHARD_DIR = Path(SHARD_DIR_NAME)  # Per-sport live shards (scraper run with --current-layout sharded/both)
+BINARY_SNAPSHOT_FILE = Path(BINARY_SNAPSHOT_NAME)  # mmap-able live snapshot (scraper run with --binary-snapshot)
+EVENT_BUS_ADDRESS = os.environ.get("BET365_EVENT_BUS", default_address())  # Unix socket path or host:port
+# "0" starts the API without the live scraper and pregame monitor (e.g. for ws_load_test.py)
+RUN_PRODUCERS = os.environ.get("BET365_DASHBOARD_PRODUCERS", "1") != "0"
+
+# Keep decoded data between polls so only shards/matches that moved are re-read
+current_shard_reader = ShardedCurrentReader(str(CURRENT_SHARD_DIR), logger=logger)
+binary_snapshot_reader = BinarySnapshotReader(str(BINARY_SNAPSHOT_FILE), logger=logger)
+# Published JSON files: re-parsed only when their generation sidecar (<file>.gen) moves
+current_data_reader = SnapshotReader(CURRENT_DATA_FILE, logger=logger)
+pregame_data_reader = SnapshotReader(PREGAME_DATA_FILE, logger=logger)
+legacy_pregame_reader = SnapshotReader(LEGACY_PREGAME_DATA_FILE, logger=logger)
+pregame_history_reader = SnapshotReader(PREGAME_HISTORY_FILE, logger=logger)
+
+_sqlite_store = None
+
+# Live matches pushed by the scraper over the event bus (used instead of the live files while fresh)
+live_mirror = LiveMatchMirror()
+data_changed: Optional[asyncio.Event] = None  # created by monitor_data_changes on the server loop
+
+UPDATE_LATENCY_SECONDS = REGISTRY.histogram('bet365_dashboard_update_latency_seconds',
+                                            'Time from receiving a scraper event to queueing its patch for clients')
+REGISTRY.gauge('bet365_dashboard_event_bus_active', 'Whether live data comes from the event bus (1) or files (0)',
+               func=lambda: live_mirror.active())
+
+async def handle_bus_event(event: Dict[str, Any]) -> bool:
+    """Apply a scraper event and wake the broadcaster (False asks the publisher to resync)"""
+    if event.get('metrics'):
+        REGISTRY.set_remote('live_scraper', event['metrics'])
+    if live_mirror.apply(event):
+        data_hub.invalidate()
+        if data_changed is not None:
+            data_changed.set()
+    return live_mirror.synced
+
+event_bus_server = EventBusServer(EVENT_BUS_ADDRESS, handle_bus_event, logger=logger)
+
+
+def get_sqlite_store():
+    """SQLite store when the database exists, else None (JSON files are used)"""
+    global _sqlite_store
+    if _sqlite_store is None and STORAGE_DB_FILE.exists():
+        _sqlite_store = SQLiteStore(str(STORAGE_DB_FILE), logger=logger)
+    return _sqlite_store
+
+
+def live_current_source() -> Optional[str]:
+    """Freshest live current-data source on disk: 'binary', 'shards', 'file', or None"""
+    candidates = []
+    for priority, (source, path) in enumerate((('file', CURRENT_DATA_FILE),
+                                               ('shards', CURRENT_SHARD_DIR / MANIFEST_FILE),
+                                               ('binary', BINARY_SNAPSHOT_FILE))):
+        try:
+            candidates.append((path.stat().st_mtime, priority, source))
+        except OSError:
+            continue
+    return max(candidates)[2] if candidates else None
+
+
+def data_change_token():
+    """Cheap value that changes whenever any dashboard data source was republished"""
+    bus_token = live_mirror.token()
+    store = get_sqlite_store()
+    if store is not None:
+        # data_version changes on every commit by another connection
+        return (bus_token, 'sqlite', store.data_version())
+
+    # Binary snapshot: generation in its header; shards: manifest replaced per written cycle;
+    # JSON files (live and pregame): generation sidecar, or mtime for unpublished files
+    source = live_current_source()
+    if bus_token is not None:
+        live_token = bus_token
+    elif source == 'binary':
+        live_token = (source, read_generation(str(BINARY_SNAPSHOT_FILE)))
+    elif source == 'shards':
+        live_token = (source, current_shard_reader.manifest_mtime())
+    elif source == 'file':
+        live_token = (source, current_data_reader.current_token())
+    else:
+        live_token = None
+    return (live_token, pregame_data_reader.current_token(), legacy_pregame_reader.current_token())
+
+# Markets shown in the dashboard odds columns: (parsed market, label, (parsed sides), (display sides))
+DISPLAY_MARKETS = (
+    ('spread', 'Point Spread', ('home', 'away'), ('Home', 'Away')),
+    ('total', 'Total Points', ('over', 'under'), ('Over', 'Under')),
+    ('moneyline', 'Moneyline', ('home', 'away'), ('Home', 'Away')),
+)
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"Client connected. Total connections: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        logger.info(f"Client disconnected. Total connections: {len(self.active_connections)}")
-
-    async def broadcast(self, message: dict):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending to client: {e}")
-                disconnected.append(connection)
-        
-        # Remove disconnected clients
-        for connection in disconnected:
-            self.active_connections.remove(connection)
+# WebSocket clients: each update is serialized once and queued per client, with a writer
+# task per socket, so a slow client only falls behind (and gets coalesced) on its own
+manager = FanoutBroadcaster(queue_size=16, policy='coalesce',
+                            snapshot_func=lambda: patch_stream.snapshot_message(), logger=logger)
+# REST bodies (and index.html) serialized and compressed once per data generation, with ETags
+http_cache = HTTPResponseCache()
+
+def encode_json(document: Any) -> bytes:
+    return orjson.dumps(document, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+def load_current_data_from_store(store: SQLiteStore) -> Dict[str, Any]:
+    """Load current live and pregame matches with indexed SQLite queries"""
+    live_matches = live_mirror.live_matches() if live_mirror.active() else store.get_live_matches()
+    pregame_matches = []
+    for game in store.get_pregame_games():
+        pregame_matches.append({
+            'id': game.get('game_id', f"pregame_{len(pregame_matches)}"),
+            'sport': game.get('sport', 'Unknown'),
+            'player1_team1': game.get('team1', ''),
+            'player2_team2': game.get('team2', ''),
+            'date': game.get('date', ''),
+            'time': game.get('time', ''),
+            'odds': game.get('odds', {}),
+            'parsed_odds': game.get('parsed_odds'),
+            'confidence_score': game.get('confidence_score', 0),
+            'fixture_id': game.get('fixture_id', ''),
+            'league': game.get('sport', ''),
+            'timestamp': datetime.now().isoformat()
+        })
 
-manager = ConnectionManager()
+    all_matches = live_matches + pregame_matches
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'matches': all_matches,
+        'summary': {
+            'total_matches': len(all_matches),
+            'live_matches': len(live_matches),
+            'pregame_matches': len(pregame_matches),
+            'sports_processed': len(set(m.get('sport', 'Unknown') for m in all_matches))
+        }
+    }
 
-# Data cache
-data_cache = {
-    'matches': [],
-    'timestamp': None,
-    'summary': {}
-}
 
 def load_current_data() -> Dict[str, Any]:
-    """Load current match data from both live and pregame JSON files"""
+    """Load current match data from the SQLite store, or both live and pregame JSON files"""
+    store = get_sqlite_store()
+    if store is not None:
+        try:
+            return load_current_data_from_store(store)
+        except Exception as e:
+            logger.warning(f"SQLite load failed, falling back to JSON files: {e}")
+
     try:
         all_matches = []
         live_matches = []
         pregame_matches = []
 
         # Load live data with error handling
-        if CURRENT_DATA_FILE.exists():
+        source = 'bus' if live_mirror.active() else live_current_source()
+        if source == 'bus':
+            live_matches = live_mirror.live_matches()
+            logger.info(f"Using {len(live_matches)} live matches from the event bus (seq {live_mirror.seq})")
+        elif source == 'binary':
+            try:
+                binary_snapshot_reader.refresh()
+                live_matches = binary_snapshot_reader.matches()
+                logger.info(f"Loaded {len(live_matches)} live matches from binary snapshot "
+                            f"(generation {binary_snapshot_reader.generation})")
+            except (ValueError, OSError) as e:
+                logger.warning(f"Failed to load binary snapshot: {e}")
+                live_matches = []
+        elif source == 'shards':
+            try:
+                live_matches = current_shard_reader.load().get('matches', [])
+                logger.info(f"Loaded {len(live_matches)} live matches from shards")
+            except (ValueError, IOError) as e:
+                logger.warning(f"Failed to load live shards: {e}")
+                live_matches = []
+        elif source == 'file':
             try:
-                with open(CURRENT_DATA_FILE, 'r', encoding='utf-8') as f:
-                    live_data = json.load(f)
-                    live_matches = live_data.get('matches', [])
-                    logger.info(f"Loaded {len(live_matches)} live matches")
-            except (json.JSONDecodeError, IOError) as e:
+                live_data = current_data_reader.load() or {}
+                live_matches = live_data.get('matches', [])
+                logger.info(f"Loaded {len(live_matches)} live matches")
+            except (ValueError, IOError) as e:
                 logger.warning(f"Failed to load live data: {e}")
                 live_matches = []
 
@@ -188,67 +338,67 @@ def load_current_data() -> Dict[str, Any]:
         if PREGAME_DATA_FILE.exists():
             try:
                 # Load from real-time pregame data file (realtime_monitor format)
-                with open(PREGAME_DATA_FILE, 'r', encoding='utf-8') as f:
-                    pregame_data = json.load(f)
-                    
-                    # Handle different data structures in current_pregame_data.json
-                    if 'sports_data' in pregame_data:
-                        # New format: sports_data -> sport -> games[]
-                        for sport_name, sport_data in pregame_data.get('sports_data', {}).items():
-                            if isinstance(sport_data, dict) and 'games' in sport_data:
-                                games = sport_data['games']
-                            elif isinstance(sport_data, list):
-                                games = sport_data
-                            else:
-                                continue
-                                
-                            # Convert each game to match format
-                            for game in games:
-                                pregame_matches.append({
-                                    'id': game.get('game_id', f"pregame_{sport_name}_{len(pregame_matches)}"),
-                                    'sport': game.get('sport', sport_name),
-                                    'player1_team1': game.get('team1', ''),
-                                    'player2_team2': game.get('team2', ''),
-                                    'date': game.get('date', ''),
-                                    'time': game.get('time', ''),
-                                    'odds': game.get('odds', {}),
-                                    'confidence_score': game.get('confidence_score', 0),
-                                    'fixture_id': game.get('fixture_id', ''),
-                                    'league': sport_name,  # Use sport name as league
-                                    'timestamp': pregame_data.get('extraction_info', {}).get('timestamp', datetime.now().isoformat())
-                                })
-                    elif 'games' in pregame_data:
-                        # Fallback: direct games array
-                        pregame_games = pregame_data.get('games', [])
-                        
-                        # Convert from Game object dict format to match format
-                        for game in pregame_games:
+                pregame_data = pregame_data_reader.load() or {}
+                
+                # Handle different data structures in current_pregame_data.json
+                if 'sports_data' in pregame_data:
+                    # New format: sports_data -> sport -> games[]
+                    for sport_name, sport_data in pregame_data.get('sports_data', {}).items():
+                        if isinstance(sport_data, dict) and 'games' in sport_data:
+                            games = sport_data['games']
+                        elif isinstance(sport_data, list):
+                            games = sport_data
+                        else:
+                            continue
+                            
+                        # Convert each game to match format
+                        for game in games:
                             pregame_matches.append({
-                                'id': game.get('fixture_id', f"pregame_{len(pregame_matches)}"),
-                                'sport': game.get('sport', 'Unknown'),
+                                'id': game.get('game_id', f"pregame_{sport_name}_{len(pregame_matches)}"),
+                                'sport': game.get('sport', sport_name),
                                 'player1_team1': game.get('team1', ''),
                                 'player2_team2': game.get('team2', ''),
                                 'date': game.get('date', ''),
                                 'time': game.get('time', ''),
                                 'odds': game.get('odds', {}),
+                                'parsed_odds': game.get('parsed_odds'),
                                 'confidence_score': game.get('confidence_score', 0),
                                 'fixture_id': game.get('fixture_id', ''),
-                                'timestamp': pregame_data.get('timestamp', datetime.now().isoformat())
+                                'league': sport_name,  # Use sport name as league
+                                'timestamp': pregame_data.get('extraction_info', {}).get('timestamp', datetime.now().isoformat())
                             })
+                elif 'games' in pregame_data:
+                    # Fallback: direct games array
+                    pregame_games = pregame_data.get('games', [])
                     
-                    logger.info(f"Loaded {len(pregame_matches)} pregame matches from real-time monitor file")
-            except (json.JSONDecodeError, IOError) as e:
+                    # Convert from Game object dict format to match format
+                    for game in pregame_games:
+                        pregame_matches.append({
+                            'id': game.get('fixture_id', f"pregame_{len(pregame_matches)}"),
+                            'sport': game.get('sport', 'Unknown'),
+                            'player1_team1': game.get('team1', ''),
+                            'player2_team2': game.get('team2', ''),
+                            'date': game.get('date', ''),
+                            'time': game.get('time', ''),
+                            'odds': game.get('odds', {}),
+                            'parsed_odds': game.get('parsed_odds'),
+                            'confidence_score': game.get('confidence_score', 0),
+                            'fixture_id': game.get('fixture_id', ''),
+                            'timestamp': pregame_data.get('timestamp', datetime.now().isoformat())
+                        })
+                
+                logger.info(f"Loaded {len(pregame_matches)} pregame matches from real-time monitor file")
+            except (ValueError, IOError) as e:
                 logger.warning(f"Failed to load real-time pregame data: {e}")
                 pregame_matches = []
         else:
             # Fall back to legacy format
             if LEGACY_PREGAME_DATA_FILE.exists():
-                with open(LEGACY_PREGAME_DATA_FILE, 'r', encoding='utf-8') as f:
-                    pregame_data = json.load(f)
-                    # Extract matches from the sports_data structure
-                    for sport_data in pregame_data.get('sports_data', {}).values():
-                        pregame_matches.extend(sport_data)
-                    logger.info(f"Loaded {len(pregame_matches)} pregame matches from legacy file {LEGACY_PREGAME_DATA_FILE}")
+                pregame_data = legacy_pregame_reader.load() or {}
+                # Extract matches from the sports_data structure
+                for sport_data in pregame_data.get('sports_data', {}).values():
+                    pregame_matches.extend(sport_data)
+                logger.info(f"Loaded {len(pregame_matches)} pregame matches from legacy file {LEGACY_PREGAME_DATA_FILE}")
 
         # Combine all matches
         all_matches = live_matches + pregame_matches
@@ -280,281 +430,221 @@ def load_current_data() -> Dict[str, Any]:
             }
         }
 
-def transform_match_data(matches: List[Dict]) -> List[Dict]:
-    """Transform match data for frontend consumption with improved error handling"""
-    transformed = []
-    
-    if not matches:
-        return transformed
+def get_parsed_odds(match: Dict) -> Dict[str, Dict[str, Dict]]:
+    """Parsed odds stored at ingestion; files written before parse-once get parsed (cached) here"""
+    parsed_odds = match.get('parsed_odds')
+    if parsed_odds is None:
+        parsed_odds = attach_parsed_odds(match)
+    return parsed_odds
 
-    for i, match in enumerate(matches):
-        try:
-            # Skip invalid match data
-            if not match or not isinstance(match, dict):
-                logger.warning(f"Skipping invalid match at index {i}: {type(match)}")
-                continue
-            # Handle different data formats (live vs pregame)
-            if 'player1_team1' in match and 'player2_team2' in match:
-                # This is pregame data format - transform odds to markets format
-                odds = match.get('odds', {})
-                markets = []
-
-                # Transform odds to markets format for frontend with proper odds formatting
-                if odds:
-                    if 'spread' in odds and odds['spread']:
-                        # Handle spread odds - ensure they're properly formatted
-                        home_odds = odds['spread'][0] if len(odds['spread']) > 0 else 'N/A'
-                        away_odds = odds['spread'][1] if len(odds['spread']) > 1 else 'N/A'
-                        
-                        markets.append({
-                            'name': 'Point Spread',
-                            'selections': [
-                                {'name': 'Home', 'odds': str(home_odds).strip()},
-                                {'name': 'Away', 'odds': str(away_odds).strip()}
-                            ]
-                        })
-                        
-                    if 'total' in odds and odds['total']:
-                        # Handle total odds - ensure they're properly formatted
-                        over_odds = odds['total'][0] if len(odds['total']) > 0 else 'N/A'
-                        under_odds = odds['total'][1] if len(odds['total']) > 1 else 'N/A'
-                        
-                        markets.append({
-                            'name': 'Total Points',
-                            'selections': [
-                                {'name': 'Over', 'odds': str(over_odds).strip()},
-                                {'name': 'Under', 'odds': str(under_odds).strip()}
-                            ]
-                        })
-                        
-                    if 'moneyline' in odds and odds['moneyline']:
-                        # Handle moneyline odds - ensure they're properly formatted
-                        home_odds = odds['moneyline'][0] if len(odds['moneyline']) > 0 else 'N/A'
-                        away_odds = odds['moneyline'][1] if len(odds['moneyline']) > 1 else 'N/A'
-                        
-                        markets.append({
-                            'name': 'Moneyline',
-                            'selections': [
-                                {'name': 'Home', 'odds': str(home_odds).strip()},
-                                {'name': 'Away', 'odds': str(away_odds).strip()}
-                            ]
-                        })
 
-                # Also create a direct odds object for easier access in UI
-                formatted_odds = {}
-                if odds:
-                    # Format odds for direct display
-                    if 'spread' in odds and odds['spread'] and len(odds['spread']) >= 2:
-                        formatted_odds['spread'] = [
-                            str(odds['spread'][0]).strip(),
-                            str(odds['spread'][1]).strip()
-                        ]
-                    if 'total' in odds and odds['total'] and len(odds['total']) >= 2:
-                        formatted_odds['total'] = [
-                            str(odds['total'][0]).strip(), 
-                            str(odds['total'][1]).strip()
-                        ]
-                    if 'moneyline' in odds and odds['moneyline'] and len(odds['moneyline']) >= 2:
-                        formatted_odds['moneyline'] = [
-                            str(odds['moneyline'][0]).strip(),
-                            str(odds['moneyline'][1]).strip()
-                        ]
-
-                transformed_match = {
-                    'id': match.get('id') or match.get('game_id') or f"{match.get('sport', 'UNK')}_{hash(str(match))}",
-                    'sport': match.get('sport', 'Unknown'),
-                    'sport_code': match.get('sport', ''),
-                    'league': match.get('league', match.get('date', '')),
-                    'teams': {
-                        'home': match.get('player1_team1') or match.get('team1', 'TBD'),
-                        'away': match.get('player2_team2') or match.get('team2', 'TBD')
-                    },
-                    'scores': {
-                        'home': '0',  # Pregame matches don't have scores
-                        'away': '0'
-                    },
-                    'live_fields': {
-                        'is_live': False,  # Pregame matches are not live
-                        'status': 'Scheduled',
-                        'time': match.get('time', 'TBD'),
-                        'date': match.get('date', '')
-                    },
-                    'date': match.get('date', ''),  # Add date field directly for UI access
-                    'time': match.get('time', 'TBD'),  # Add time field directly for UI access
-                    'odds': formatted_odds,  # Use formatted odds for better display
-                    'raw_odds': match.get('odds', {}),  # Keep raw odds for reference
-                    'markets': markets,  # Now includes transformed markets
-                    'timestamp': match.get('timestamp', datetime.now().isoformat())
-                }
+def format_parsed_odds(parsed_odds: Dict[str, Dict[str, Dict]]) -> Dict[str, List[str]]:
+    """Display strings per market ([home, away] / [over, under]) from the parsed odds"""
+    formatted = {}
+    for market_name, _, sides, _ in DISPLAY_MARKETS:
+        market = parsed_odds.get(market_name)
+        if not market:
+            continue
+        displays = [market.get(side, {}).get('display') for side in sides]
+        if all(displays):
+            formatted[market_name] = displays
+    return formatted
+
+
+def build_display_markets(parsed_odds: Dict[str, Dict[str, Dict]]) -> List[Dict]:
+    """Frontend 'markets' list (name + selections) from the parsed odds"""
+    markets = []
+    for market_name, label, sides, side_labels in DISPLAY_MARKETS:
+        market = parsed_odds.get(market_name)
+        if not market:
+            continue
+        markets.append({
+            'name': label,
+            'selections': [
+                {'name': side_label, 'odds': market.get(side, {}).get('display') or 'N/A'}
+                for side, side_label in zip(sides, side_labels)
+            ]
+        })
+    return markets
+
+
+def stable_id(*parts: Any) -> str:
+    """Deterministic short id for matches without one (same across processes, unlike hash())"""
+    return hashlib.blake2b('\x1f'.join(str(part) for part in parts).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def transform_match(match: Dict, i: int = 0) -> Optional[Dict]:
+    """Frontend representation of one source match (None if it cannot be displayed)"""
+    try:
+        # Handle different data formats (live vs pregame)
+        if 'player1_team1' in match and 'player2_team2' in match:
+            # This is pregame data format - odds were parsed once at ingestion
+            parsed_odds = get_parsed_odds(match)
+            markets = build_display_markets(parsed_odds)
+            formatted_odds = format_parsed_odds(parsed_odds)
+
+            transformed_match = {
+                'id': match.get('id') or match.get('game_id') or f"{match.get('sport', 'UNK')}_" + stable_id(
+                    match.get('player1_team1'), match.get('player2_team2'), match.get('date'), match.get('time')),
+                'sport': match.get('sport', 'Unknown'),
+                'sport_code': match.get('sport', ''),
+                'league': match.get('league', match.get('date', '')),
+                'teams': {
+                    'home': match.get('player1_team1') or match.get('team1', 'TBD'),
+                    'away': match.get('player2_team2') or match.get('team2', 'TBD')
+                },
+                'scores': {
+                    'home': '0',  # Pregame matches don't have scores
+                    'away': '0'
+                },
+                'live_fields': {
+                    'is_live': False,  # Pregame matches are not live
+                    'status': 'Scheduled',
+                    'time': match.get('time', 'TBD'),
+                    'date': match.get('date', '')
+                },
+                'date': match.get('date', ''),  # Add date field directly for UI access
+                'time': match.get('time', 'TBD'),  # Add time field directly for UI access
+                'odds': formatted_odds,  # Use formatted odds for better display
+                'parsed_odds': parsed_odds,  # Typed prices (price/line/decimal) for the UI
+                'raw_odds': match.get('odds', {}),  # Keep raw odds for reference
+                'markets': markets,  # Now includes transformed markets
+                'timestamp': match.get('timestamp', datetime.now().isoformat())
+            }
+        else:
+            # This is live data format - 'markets' or legacy 'odds', parsed once at ingestion
+            live_odds = match.get('odds', {})
+            live_markets = match.get('markets', {})
+            parsed_odds = get_parsed_odds(match)
+            formatted_live_odds = format_parsed_odds(parsed_odds)
+
+            transformed_match = {
+                'id': match.get('id') or match.get('game_id') or f"{match.get('sport_code', 'UNK')}_{stable_id(match.get('sport'), match.get('teams', {}))}",
+                'sport': match.get('sport', 'Unknown'),
+                'sport_code': match.get('sport_code', match.get('code', '')),
+                'league': match.get('league', match.get('competition', '')),
+                'teams': {
+                    'home': match.get('teams', {}).get('home', 'TBD'),
+                    'away': match.get('teams', {}).get('away', 'TBD')
+                },
+                'scores': {
+                    'home': str(match.get('scores', {}).get('home', '0')),
+                    'away': str(match.get('scores', {}).get('away', '0'))
+                },
+                'live_fields': {
+                    'is_live': match.get('live_fields', {}).get('is_live', False),
+                    'status': match.get('live_fields', {}).get('status', match.get('status', 'Scheduled')),
+                    'time': match.get('live_fields', {}).get('time', match.get('time', '')),
+                    'date': match.get('live_fields', {}).get('date', match.get('date', ''))
+                },
+                'date': match.get('date', match.get('live_fields', {}).get('date', '')),  # Add date field directly for UI access
+                'time': match.get('time', match.get('live_fields', {}).get('time', '')),  # Add time field directly for UI access
+                'odds': formatted_live_odds,  # Use normalized odds format
+                'parsed_odds': parsed_odds,  # Typed prices (price/line/decimal) for the UI
+                'raw_odds': {'odds': live_odds, 'markets': live_markets},  # Keep both original sources for reference
+                'markets': match.get('markets', []),
+                'analytics': match.get('analytics', {}),  # Implied probability / margin / movement from the scraper
+                'timestamp': match.get('timestamp', datetime.now().isoformat())
+            }
+
+        # Validate transformed match before adding with detailed field checking
+        missing_fields = []
+        
+        # Check ID
+        if not transformed_match.get('id'):
+            missing_fields.append('id')
+        
+        # Check teams with fallbacks
+        home_team = transformed_match.get('teams', {}).get('home')
+        away_team = transformed_match.get('teams', {}).get('away')
+        
+        if not home_team or home_team == 'TBD':
+            # Try alternative team fields
+            if 'player1_team1' in match:
+                transformed_match['teams']['home'] = match['player1_team1']
+            elif 'team1' in match:
+                transformed_match['teams']['home'] = match['team1']
             else:
-                # This is live data format - check both 'odds' and 'markets' fields
-                live_odds = match.get('odds', {})
-                live_markets = match.get('markets', {})
-                
-                # Normalize live odds format to match pregame format
-                formatted_live_odds = {}
-                
-                # Try to extract from 'markets' field first (newer live format)
-                if live_markets and isinstance(live_markets, dict):
-                    # Extract moneyline from markets
-                    if 'moneyline' in live_markets and live_markets['moneyline']:
-                        moneyline_data = live_markets['moneyline']
-                        if isinstance(moneyline_data, dict):
-                            home_odds = moneyline_data.get('home', {}).get('odds', 'TBD')
-                            away_odds = moneyline_data.get('away', {}).get('odds', 'TBD')
-                            formatted_live_odds['moneyline'] = [str(home_odds).strip(), str(away_odds).strip()]
-                    
-                    # Extract spread from markets
-                    if 'spread' in live_markets and live_markets['spread']:
-                        spread_data = live_markets['spread']
-                        if isinstance(spread_data, dict):
-                            home_spread = spread_data.get('home', {})
-                            away_spread = spread_data.get('away', {})
-                            home_line = home_spread.get('line', '')
-                            home_odds = home_spread.get('odds', '')
-                            away_line = away_spread.get('line', '')
-                            away_odds = away_spread.get('odds', '')
-                            
-                            if home_line and home_odds:
-                                formatted_live_odds['spread'] = [
-                                    f"{home_line} {home_odds}".strip(),
-                                    f"{away_line} {away_odds}".strip()
-                                ]
-                    
-                    # Extract total from markets
-                    if 'total' in live_markets and live_markets['total']:
-                        total_data = live_markets['total']
-                        if isinstance(total_data, dict):
-                            over_data = total_data.get('over', {})
-                            under_data = total_data.get('under', {})
-                            over_line = over_data.get('line', '')
-                            over_odds = over_data.get('odds', '')
-                            under_line = under_data.get('line', '')
-                            under_odds = under_data.get('odds', '')
-                            
-                            if over_line and over_odds:
-                                formatted_live_odds['total'] = [
-                                    f"O {over_line} {over_odds}".strip(),
-                                    f"U {under_line} {under_odds}".strip()
-                                ]
+                missing_fields.append('teams.home')
                 
-                # Fall back to legacy 'odds' field format if markets is empty
-                elif live_odds:
-                    # Extract moneyline from various possible formats
-                    if 'moneyline' in live_odds and live_odds['moneyline']:
-                        if isinstance(live_odds['moneyline'], list) and len(live_odds['moneyline']) >= 2:
-                            formatted_live_odds['moneyline'] = [
-                                str(live_odds['moneyline'][0]).strip(),
-                                str(live_odds['moneyline'][1]).strip()
-                            ]
-                        elif isinstance(live_odds['moneyline'], dict):
-                            formatted_live_odds['moneyline'] = [
-                                str(live_odds['moneyline'].get('home', 'TBD')).strip(),
-                                str(live_odds['moneyline'].get('away', 'TBD')).strip()
-                            ]
-                    
-                    # Extract spread odds
-                    if 'spread' in live_odds and live_odds['spread']:
-                        if isinstance(live_odds['spread'], list) and len(live_odds['spread']) >= 2:
-                            formatted_live_odds['spread'] = [
-                                str(live_odds['spread'][0]).strip(),
-                                str(live_odds['spread'][1]).strip()
-                            ]
-                        elif isinstance(live_odds['spread'], dict):
-                            formatted_live_odds['spread'] = [
-                                str(live_odds['spread'].get('home', 'TBD')).strip(),
-                                str(live_odds['spread'].get('away', 'TBD')).strip()
-                            ]
-                    
-                    # Extract total odds
-                    if 'total' in live_odds and live_odds['total']:
-                        if isinstance(live_odds['total'], list) and len(live_odds['total']) >= 2:
-                            formatted_live_odds['total'] = [
-                                str(live_odds['total'][0]).strip(),
-                                str(live_odds['total'][1]).strip()
-                            ]
-                        elif isinstance(live_odds['total'], dict):
-                            formatted_live_odds['total'] = [
-                                str(live_odds['total'].get('over', 'TBD')).strip(),
-                                str(live_odds['total'].get('under', 'TBD')).strip()
-                            ]
-                
-                transformed_match = {
-                    'id': match.get('id') or match.get('game_id') or f"{match.get('sport_code', 'UNK')}_{hash(str(match.get('teams', {})))}",
-                    'sport': match.get('sport', 'Unknown'),
-                    'sport_code': match.get('sport_code', match.get('code', '')),
-                    'league': match.get('league', match.get('competition', '')),
-                    'teams': {
-                        'home': match.get('teams', {}).get('home', 'TBD'),
-                        'away': match.get('teams', {}).get('away', 'TBD')
-                    },
-                    'scores': {
-                        'home': str(match.get('scores', {}).get('home', '0')),
-                        'away': str(match.get('scores', {}).get('away', '0'))
-                    },
-                    'live_fields': {
-                        'is_live': match.get('live_fields', {}).get('is_live', False),
-                        'status': match.get('live_fields', {}).get('status', match.get('status', 'Scheduled')),
-                        'time': match.get('live_fields', {}).get('time', match.get('time', '')),
-                        'date': match.get('live_fields', {}).get('date', match.get('date', ''))
-                    },
-                    'date': match.get('date', match.get('live_fields', {}).get('date', '')),  # Add date field directly for UI access
-                    'time': match.get('time', match.get('live_fields', {}).get('time', '')),  # Add time field directly for UI access
-                    'odds': formatted_live_odds,  # Use normalized odds format
-                    'raw_odds': {'odds': live_odds, 'markets': live_markets},  # Keep both original sources for reference
-                    'markets': match.get('markets', []),
-                    'timestamp': match.get('timestamp', datetime.now().isoformat())
-                }
-
-            # Validate transformed match before adding with detailed field checking
-            missing_fields = []
-            
-            # Check ID
-            if not transformed_match.get('id'):
-                missing_fields.append('id')
-            
-            # Check teams with fallbacks
-            home_team = transformed_match.get('teams', {}).get('home')
-            away_team = transformed_match.get('teams', {}).get('away')
-            
-            if not home_team or home_team == 'TBD':
-                # Try alternative team fields
-                if 'player1_team1' in match:
-                    transformed_match['teams']['home'] = match['player1_team1']
-                elif 'team1' in match:
-                    transformed_match['teams']['home'] = match['team1']
-                else:
-                    missing_fields.append('teams.home')
-                    
-            if not away_team or away_team == 'TBD':
-                # Try alternative team fields
-                if 'player2_team2' in match:
-                    transformed_match['teams']['away'] = match['player2_team2']
-                elif 'team2' in match:
-                    transformed_match['teams']['away'] = match['team2']
-                else:
-                    missing_fields.append('teams.away')
-            
-            if not missing_fields:
-                transformed.append(transformed_match)
+        if not away_team or away_team == 'TBD':
+            # Try alternative team fields
+            if 'player2_team2' in match:
+                transformed_match['teams']['away'] = match['player2_team2']
+            elif 'team2' in match:
+                transformed_match['teams']['away'] = match['team2']
             else:
-                logger.warning(f"Skipping invalid transformed match: missing required fields: {missing_fields}")
-                logger.debug(f"Match data was: {match}")
-                
-        except Exception as e:
-            logger.error(f"Error transforming match at index {i}: {e}")
-            logger.error(f"Match data: {match}")
+                missing_fields.append('teams.away')
+        
+        if not missing_fields:
+            return transformed_match
+        logger.warning(f"Skipping invalid transformed match: missing required fields: {missing_fields}")
+        logger.debug(f"Match data was: {match}")
+
+    except Exception as e:
+        logger.error(f"Error transforming match at index {i}: {e}")
+        logger.error(f"Match data: {match}")
+    return None
+
+
+def transform_match_data(matches: List[Dict]) -> List[Dict]:
+    """Transform match data for frontend consumption with improved error handling"""
+    transformed = []
+
+    for i, match in enumerate(matches or []):
+        # Skip invalid match data
+        if not match or not isinstance(match, dict):
+            logger.warning(f"Skipping invalid match at index {i}: {type(match)}")
             continue
+        transformed_match = transform_match(match, i)
+        if transformed_match is not None:
+            transformed.append(transformed_match)
 
-    logger.info(f"Successfully transformed {len(transformed)}/{len(matches)} matches")
+    logger.info(f"Successfully transformed {len(transformed)}/{len(matches or [])} matches")
     return transformed
 
-@app.get("/", response_class=FileResponse)
-async def root():
+# Process-wide copy of the merged, transformed data: sources are re-read only when they
+# change, and every endpoint and WebSocket is served from it
+# Transformed matches are cached by source content, so a reload only transforms what changed
+transform_cache = TransformCache(transform_match, logger=logger)
+data_hub = DataHub(data_change_token, load_current_data, transform_cache.transform, logger=logger)
+REGISTRY.gauge('bet365_dashboard_matches', 'Matches in the current data hub snapshot',
+               func=lambda: len(data_hub.current.transformed))
+# Snapshot + sequenced patches over the hub versions broadcast to WebSocket clients
+patch_stream = PatchStream(data_hub)
+
+
+def build_sports_list(snapshot) -> List[Dict[str, Any]]:
+    """Per-sport match and live counts of a hub snapshot"""
+    sports = {}
+    for match in snapshot.matches:
+        sport = match.get('sport', 'Unknown')
+        sport_code = match.get('sport_code', match.get('code', ''))
+        
+        if sport not in sports:
+            sports[sport] = {
+                'name': sport,
+                'code': sport_code,
+                'count': 0,
+                'live_count': 0
+            }
+        
+        sports[sport]['count'] += 1
+        if match.get('live_fields', {}).get('is_live'):
+            sports[sport]['live_count'] += 1
+    return list(sports.values())
+
+@app.get("/")
+async def root(request: Request):
     """Serve the dashboard HTML"""
     html_path = Path("index.html")
-    if html_path.exists():
-        return FileResponse(html_path)
+    try:
+        stat = html_path.stat()
+    except OSError:
+        stat = None
+    if stat is not None:
+        return http_cache.respond(request, (stat.st_mtime_ns, stat.st_size), html_path.read_bytes,
+                                  media_type='text/html; charset=utf-8')
     else:
         # Return info if HTML not found
         return {
@@ -576,112 +666,108 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "connections": len(manager.active_connections),
-        "cached_matches": len(data_cache['matches'])
+        "cached_matches": len(data_hub.current.transformed),
+        "data_hub": data_hub.metrics(),
+        "transform_cache": transform_cache.metrics(),
+        "http_cache": http_cache.metrics(),
+        "event_bus": dict(event_bus_server.metrics(), mirror=live_mirror.metrics()),
+        "patch_stream": patch_stream.metrics(),
+        "broadcaster": manager.metrics()
     }
 
+def split_param(value: Optional[str]) -> List[str]:
+    """Comma-separated query parameter as a list of non-empty values"""
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of the dashboard, pregame monitor and (via the event bus) live scraper"""
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/api/live-matches")
-async def get_live_matches():
-    """Get current live matches"""
-    data = load_current_data()
-    
-    # Transform matches for frontend
-    transformed_matches = transform_match_data(data.get('matches', []))
-    
+async def get_live_matches(
+    request: Request,
+    sport: Optional[str] = Query(None, description="Sport name(s), comma-separated"),
+    sport_code: Optional[str] = Query(None, description="bet365 sport code(s), comma-separated"),
+    league: Optional[str] = Query(None, description="League name(s), comma-separated"),
+    is_live: Optional[bool] = Query(None, description="Only live (true) or only pregame (false) matches"),
+    has_odds: Optional[bool] = Query(None, description="Only matches with (true) or without (false) odds"),
+    fields: Optional[str] = Query(None, description="Top-level fields to return, comma-separated (id is always included)"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Page size (default: all matches)"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page")
+):
+    """Get current live matches, optionally filtered, projected and paginated"""
+    snapshot = data_hub.snapshot()
+    return http_cache.respond(request, snapshot.generation, lambda: encode_json(
+        query_live_matches(snapshot, sport, sport_code, league, is_live, has_odds, fields, limit, cursor)))
+
+def query_live_matches(snapshot, sport: Optional[str], sport_code: Optional[str], league: Optional[str],
+                       is_live: Optional[bool], has_odds: Optional[bool], fields: Optional[str],
+                       limit: Optional[int], cursor: Optional[str]) -> Dict[str, Any]:
+    """/api/live-matches response document for one hub snapshot"""
+    transformed_matches = snapshot.transformed
+    summary = snapshot.summary or {
+        'total_matches': len(transformed_matches),
+        'live_matches': sum(1 for m in transformed_matches if m['live_fields']['is_live']),
+        'sports_processed': len(set(m['sport'] for m in transformed_matches))
+    }
+
+    filters = {name: split_param(value) for name, value in
+               (('sport', sport), ('sport_code', sport_code), ('league', league)) if split_param(value)}
+    for name, value in (('is_live', is_live), ('has_odds', has_odds)):
+        if value is not None:
+            filters[name] = [value]
+    projection = split_param(fields)
+
+    if not filters and not projection and limit is None and cursor is None:
+        # Unfiltered request - same response as before query parameters existed
+        return {
+            'timestamp': snapshot.timestamp or datetime.now().isoformat(),
+            'matches': transformed_matches,
+            'summary': summary
+        }
+
+    try:
+        match_ids, next_cursor, total = data_hub.index.query(filters, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     return {
-        'timestamp': data.get('timestamp', datetime.now().isoformat()),
-        'matches': transformed_matches,
-        'summary': data.get('summary', {
-            'total_matches': len(transformed_matches),
-            'live_matches': sum(1 for m in transformed_matches if m['live_fields']['is_live']),
-            'sports_processed': len(set(m['sport'] for m in transformed_matches))
-        })
+        'timestamp': snapshot.timestamp or datetime.now().isoformat(),
+        'matches': [project(snapshot.by_id[match_id], projection) for match_id in match_ids],
+        'summary': summary,
+        'total_matching': total,
+        'next_cursor': next_cursor
     }
 
 @app.get("/api/sports")
-async def get_available_sports():
+async def get_available_sports(request: Request):
     """Get list of available sports"""
-    data = load_current_data()
-    matches = data.get('matches', [])
+    snapshot = data_hub.snapshot()
+    sports = data_hub.derived('sports', build_sports_list)
     
-    sports = {}
-    for match in matches:
-        sport = match.get('sport', 'Unknown')
-        sport_code = match.get('sport_code', match.get('code', ''))
-        
-        if sport not in sports:
-            sports[sport] = {
-                'name': sport,
-                'code': sport_code,
-                'count': 0,
-                'live_count': 0
-            }
-        
-        sports[sport]['count'] += 1
-        if match.get('live_fields', {}).get('is_live'):
-            sports[sport]['live_count'] += 1
-    
-    return {
-        'sports': list(sports.values()),
+    return http_cache.respond(request, snapshot.generation, lambda: encode_json({
+        'sports': sports,
         'total': len(sports)
-    }
+    }))
 
 @app.get("/api/match/{match_id}")
-async def get_match_detail(match_id: str):
-    """Get detailed information for a specific match"""
-    data = load_current_data()
-    matches = data.get('matches', [])
-    
-    for match in matches:
-        if str(match.get('id', '')) == match_id:
-            return transform_match_data([match])[0]
+async def get_match_detail(match_id: str, request: Request):
+    """Get detailed information for a specific match (by the id the frontend sees)"""
+    snapshot = data_hub.snapshot()
+    encoded = snapshot.encoded.get(match_id)
+    if encoded is None:
+        raise HTTPException(status_code=404, detail="Match not found")
     
-    return {"error": "Match not found"}, 404
+    # Served from the bytes serialized when the match was transformed
+    return http_cache.respond(request, snapshot.fingerprints[match_id].hex(), lambda: encoded)
 
 @app.get("/api/historical-matches")
-async def get_historical_matches():
+async def get_historical_matches(request: Request):
     """Get recently removed/completed matches from history"""
     try:
-        historical_matches = []
-        
-        # Load pregame history if it exists
-        if PREGAME_HISTORY_FILE.exists():
-            with open(PREGAME_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                history_data = json.load(f)
-                
-                # Handle different history formats
-                if isinstance(history_data, list):
-                    recent_games = history_data[-20:]  # Last 20 entries
-                elif isinstance(history_data, dict):
-                    if 'removed_games' in history_data:
-                        recent_games = history_data['removed_games'][-20:]
-                    elif 'games' in history_data:
-                        recent_games = history_data['games'][-20:]
-                    else:
-                        recent_games = []
-                else:
-                    recent_games = []
-                
-                # Convert to match format
-                for game in recent_games:
-                    historical_matches.append({
-                        'id': game.get('game_id', f"hist_{len(historical_matches)}"),
-                        'sport': game.get('sport', 'Unknown'),
-                        'teams': {
-                            'home': game.get('team1', 'Unknown'),
-                            'away': game.get('team2', 'Unknown')
-                        },
-                        'time': game.get('time', ''),
-                        'date': game.get('date', ''),
-                        'status': 'Removed',
-                        'removal_time': game.get('removal_time', game.get('timestamp', ''))
-                    })
-        
-        return {
-            'historical_matches': historical_matches,
-            'count': len(historical_matches),
-            'last_update': datetime.now().isoformat()
-        }
-        
+        generation = pregame_history_reader.current_token()
+        return http_cache.respond(request, generation, lambda: encode_json(load_historical_matches()))
     except Exception as e:
         logger.error(f"Error loading historical matches: {e}")
         return {
@@ -690,47 +776,69 @@ async def get_historical_matches():
             'error': str(e)
         }
 
+def load_historical_matches() -> Dict[str, Any]:
+    """/api/historical-matches response document from the pregame history file"""
+    historical_matches = []
+    
+    # Load pregame history if it exists
+    if PREGAME_HISTORY_FILE.exists():
+        history_data = pregame_history_reader.load()
+        
+        # Handle different history formats
+        if isinstance(history_data, list):
+            recent_games = history_data[-20:]  # Last 20 entries
+        elif isinstance(history_data, dict):
+            if 'removed_games' in history_data:
+                recent_games = history_data['removed_games'][-20:]
+            elif 'games' in history_data:
+                recent_games = history_data['games'][-20:]
+            else:
+                recent_games = []
+        else:
+            recent_games = []
+        
+        # Convert to match format
+        for game in recent_games:
+            historical_matches.append({
+                'id': game.get('game_id', f"hist_{len(historical_matches)}"),
+                'sport': game.get('sport', 'Unknown'),
+                'teams': {
+                    'home': game.get('team1', 'Unknown'),
+                    'away': game.get('team2', 'Unknown')
+                },
+                'time': game.get('time', ''),
+                'date': game.get('date', ''),
+                'status': 'Removed',
+                'removal_time': game.get('removal_time', game.get('timestamp', ''))
+            })
+    
+    return {
+        'historical_matches': historical_matches,
+        'count': len(historical_matches),
+        'last_update': datetime.now().isoformat()
+    }
+
+def is_resync_request(message: str) -> bool:
+    """True for a client's {"type": "resync"} message (plain pings are ignored)"""
+    try:
+        request = orjson.loads(message)
+    except orjson.JSONDecodeError:
+        return False
+    return isinstance(request, dict) and request.get('type') == 'resync'
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time updates"""
-    await manager.connect(websocket)
-    
+    """WebSocket endpoint: an 'initial' snapshot, then sequenced 'patch' messages (see data_hub.py)"""
     try:
-        # Send initial data
-        initial_data = load_current_data()
-        await websocket.send_json({
-            'type': 'initial',
-            'data': {
-                'timestamp': initial_data.get('timestamp'),
-                'matches': transform_match_data(initial_data.get('matches', [])),
-                'summary': initial_data.get('summary', {})
-            }
-        })
+        await manager.connect(websocket, patch_stream.snapshot_message)
         
-        # Keep connection alive and send updates
+        # Patches are broadcast by monitor_data_changes; the client only sends pings
+        # and, after detecting a sequence gap, resync requests
         while True:
-            try:
-                # Wait for ping from client or timeout
-                await asyncio.wait_for(websocket.receive_text(), timeout=1.0)
-            except asyncio.TimeoutError:
-                # Send updated data every second
-                current_data = load_current_data()
-                
-                # Only send if data has changed
-                if current_data.get('timestamp') != data_cache.get('timestamp'):
-                    data_cache['timestamp'] = current_data.get('timestamp')
-                    data_cache['matches'] = transform_match_data(current_data.get('matches', []))
-                    data_cache['summary'] = current_data.get('summary', {})
-                    
-                    await websocket.send_json({
-                        'type': 'update',
-                        'data': {
-                            'timestamp': data_cache['timestamp'],
-                            'matches': data_cache['matches'],
-                            'summary': data_cache['summary']
-                        }
-                    })
-                    
+            message = await websocket.receive_text()
+            if is_resync_request(message):
+                manager.send(websocket, patch_stream.snapshot_message())
+
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+SHARED DASHBOARD DATA HUB
+One process-wide copy of the dashboard's merged live + pregame data.
+
+- A cheap change token (SQLite data_version, binary snapshot generation,
+  shard manifest, generation sidecars / mtimes of the JSON files) is polled
+  at most once per check interval, however many requests and sockets ask
+- Sources are only re-loaded when that token moves; each reload bumps the
+  hub version, and only matches whose content changed are re-transformed
+  (transform_cache.py)
+- Every REST endpoint and WebSocket serves the same HubSnapshot; values
+  derived from it (sports list, lookups) are computed once per version
+- Secondary indexes for filtered queries (match_index.py) are updated from
+  each reload's diff, not rebuilt
+- PatchStream turns consecutive broadcast snapshots into sequenced patches
+  (inserted / updated / removed matches), so sockets only receive what moved
+
+WebSocket protocol:
+    {'type': 'initial', 'seq': 7, 'data': {'timestamp', 'matches', 'summary'}}
+    {'type': 'patch', 'seq': 8, 'data': {'timestamp', 'inserted', 'updated', 'removed', 'summary'}}
+A client applies patches whose seq is exactly one past its own; on a gap it
+sends {"type": "resync"} and receives a fresh 'initial' message.
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from fanout import PreEncoded
+from metrics import REGISTRY
+from match_index import MatchIndex
+from transform_cache import TransformedMatch
+
+RELOAD_SECONDS = REGISTRY.histogram('bet365_dashboard_reload_seconds',
+                                    'Data hub reload time (load sources, transform changed matches, index)')
+
+
+@dataclass
+class HubSnapshot:
+    """Merged data of one version, shared read-only by all consumers"""
+    version: int = 0
+    token: Any = None
+    timestamp: Optional[str] = None
+    matches: List[Dict[str, Any]] = field(default_factory=list)      # merged source matches
+    transformed: List[Dict[str, Any]] = field(default_factory=list)  # frontend format
+    summary: Dict[str, Any] = field(default_factory=dict)
+    loaded_at: float = 0.0
+    derived: Dict[str, Any] = field(default_factory=dict)
+    by_id: Dict[str, Dict[str, Any]] = field(default_factory=dict)    # transformed match per id
+    fingerprints: Dict[str, bytes] = field(default_factory=dict)     # display hash per id
+    encoded: Dict[str, bytes] = field(default_factory=dict)          # serialized match per id
+
+    @property
+    def generation(self) -> str:
+        """Identifies this version's data, also across restarts (HTTP validators)"""
+        return f"{self.version}.{int(self.loaded_at * 1000000)}"
+
+    def encoded_matches(self, match_ids: Optional[List[str]] = None) -> PreEncoded:
+        """Serialized matches (all, or the given ids) for splicing into a message"""
+        if match_ids is None:
+            return PreEncoded(list(self.encoded.values()))
+        return PreEncoded([self.encoded[match_id] for match_id in match_ids])
+
+
+def diff_snapshots(old: HubSnapshot, new: HubSnapshot) -> Dict[str, Any]:
+    """Ids of the matches inserted, updated (displayed content changed) and removed from old to new"""
+    inserted, updated = [], []
+    for match_id, fingerprint in new.fingerprints.items():
+        previous = old.fingerprints.get(match_id)
+        if previous is None:
+            inserted.append(match_id)
+        elif previous != fingerprint:
+            updated.append(match_id)
+    removed = [match_id for match_id in old.fingerprints if match_id not in new.fingerprints]
+    return {'inserted': inserted, 'updated': updated, 'removed': removed}
+
+
+class DataHub:
+    """Change-driven cache of the loaded and transformed dashboard data"""
+
+    def __init__(self, token_func: Callable[[], Any], load_func: Callable[[], Dict[str, Any]],
+                 transform_func: Callable[[List[Dict]], List[TransformedMatch]], check_interval: float = 0.25,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            token_func: returns a value that changes whenever any source changed
+            load_func: loads the merged {'timestamp', 'matches', 'summary'} document
+            transform_func: converts merged matches to the frontend format (TransformCache.transform)
+            check_interval: minimum seconds between change token polls
+            logger: logger for reload errors
+        """
+        self.token_func = token_func
+        self.load_func = load_func
+        self.transform_func = transform_func
+        self.check_interval = check_interval
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.current = HubSnapshot()
+        self.index = MatchIndex()
+        self._loaded = False
+        self._last_check = 0.0
+        self.reloads = 0
+        self.token_checks = 0
+
+    def snapshot(self) -> HubSnapshot:
+        """Current data, reloaded first if a source changed since the last check"""
+        now = time.monotonic()
+        if self._loaded and now - self._last_check < self.check_interval:
+            return self.current
+        self._last_check = now
+
+        self.token_checks += 1
+        try:
+            token = self.token_func()
+        except Exception as e:
+            self.logger.warning(f"Data hub change check failed: {e}")
+            token = None
+        if self._loaded and token is not None and token == self.current.token:
+            return self.current
+
+        self._reload(token)
+        return self.current
+
+    def invalidate(self):
+        """Force a reload on the next snapshot()"""
+        self._loaded = False
+
+    def _reload(self, token: Any):
+        started = time.perf_counter()
+        data = self.load_func()
+        matches = data.get('matches', [])
+        # Dedupe by id once (last occurrence wins) so every view holds the same matches
+        unique = {}
+        for entry in self.transform_func(matches):
+            unique[entry.match_id] = entry
+        entries = list(unique.values())
+        by_id, fingerprints, encoded = {}, {}, {}
+        for entry in entries:
+            match_id = entry.match_id
+            by_id[match_id] = entry.match
+            fingerprints[match_id] = entry.fingerprint
+            encoded[match_id] = entry.encoded
+        previous = self.current
+        self.current = HubSnapshot(
+            version=previous.version + 1,
+            token=token,
+            timestamp=data.get('timestamp'),
+            matches=matches,
+            transformed=[entry.match for entry in entries],
+            summary=data.get('summary', {}),
+            loaded_at=time.time(),
+            by_id=by_id,
+            fingerprints=fingerprints,
+            encoded=encoded
+        )
+        changes = diff_snapshots(previous, self.current)
+        self.index.apply(by_id, changes['inserted'], changes['updated'], changes['removed'])
+        self._loaded = True
+        self.reloads += 1
+        RELOAD_SECONDS.observe(time.perf_counter() - started)
+        self.logger.info(f"Data hub reloaded: version {self.current.version}, {len(matches)} matches")
+
+    def derived(self, name: str, build: Callable[[HubSnapshot], Any]) -> Any:
+        """Value computed from the current snapshot, built once per version"""
+        snapshot = self.snapshot()
+        if name not in snapshot.derived:
+            snapshot.derived[name] = build(snapshot)
+        return snapshot.derived[name]
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'version': self.current.version,
+            'matches': len(self.current.matches),
+            'reloads': self.reloads,
+            'token_checks': self.token_checks,
+            'indexed_matches': len(self.index),
+            'loaded_at': self.current.loaded_at
+        }
+
+
+class PatchStream:
+    """Sequenced snapshot/patch messages over the hub versions that were broadcast"""
+
+    def __init__(self, hub: DataHub):
+        self.hub = hub
+        self.seq = 0
+        # Snapshot the latest seq describes - new clients start from it, not from a newer
+        # hub version, so the next patch always applies to what they hold
+        self.base: Optional[HubSnapshot] = None
+        self.patches_sent = 0
+        self.matches_sent = 0
+
+    def advance(self) -> Optional[Dict[str, Any]]:
+        """Patch message for the hub's changes since the last call, or None if nothing changed"""
+        snapshot = self.hub.snapshot()
+        if self.base is not None and snapshot.version == self.base.version:
+            return None
+
+        previous, self.base = self.base, snapshot
+        if previous is None:
+            # Nobody can hold an earlier state - clients get this as their initial snapshot
+            self.seq += 1
+            return None
+
+        patch = diff_snapshots(previous, snapshot)
+        if not any(patch.values()) and snapshot.summary == previous.summary:
+            # Reloaded without visible changes - clients already hold equal contents
+            return None
+
+        self.seq += 1
+
+        self.patches_sent += 1
+        self.matches_sent += len(patch['inserted']) + len(patch['updated'])
+        return {
+            'type': 'patch',
+            'seq': self.seq,
+            'data': {
+                'timestamp': snapshot.timestamp,
+                'inserted': snapshot.encoded_matches(patch['inserted']),
+                'updated': snapshot.encoded_matches(patch['updated']),
+                'removed': patch['removed'],
+                'summary': snapshot.summary
+            }
+        }
+
+    def snapshot_message(self) -> Dict[str, Any]:
+        """Full 'initial' message at the current sequence number (connect and resync)"""
+        if self.base is None:
+            self.advance()
+        return {
+            'type': 'initial',
+            'seq': self.seq,
+            'data': {
+                'timestamp': self.base.timestamp,
+                'matches': self.base.encoded_matches(),
+                'summary': self.base.summary
+            }
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {'seq': self.seq, 'patches_sent': self.patches_sent, 'matches_sent': self.matches_sent}
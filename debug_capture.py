@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+SAMPLED, RING-BUFFERED DEBUG CAPTURE FOR PREGAME GRID HTML
+Replaces the unconditional write of every selected grid's inner_html to
+outputs/html/{sport}_{session}.html.
+
+- Modes: 'off', 'anomaly' (default - only when a grid yields zero games),
+  'sample' (every Nth grid per sport, plus anomalies) and 'always'
+- inner_html is only fetched from the page when a capture is wanted, so
+  normal cycles never pay for it
+- Captures are gzip-compressed and written by a single background thread;
+  at most MAX_PENDING captures wait in memory, extra ones are dropped
+- Each sport keeps a bounded ring of its newest captures on disk:
+  outputs/html/{sport}/{timestamp}_{reason}.html.gz
+"""
+
+import gzip
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+CAPTURE_MODES = ('off', 'anomaly', 'sample', 'always')
+
+
+class DebugCapture:
+    """Decides when to capture grid HTML and writes compressed captures off the event loop"""
+
+    MAX_PENDING = 8
+
+    def __init__(self, root_dir: Path, mode: str = 'anomaly', every: int = 10, ring_size: int = 5,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            root_dir: base directory for captures (outputs/html)
+            mode: one of CAPTURE_MODES
+            every: in 'sample' mode, capture every Nth selected grid per sport
+            ring_size: captures kept per sport (oldest deleted first)
+        """
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"Unknown debug capture mode: {mode}")
+        self.root_dir = Path(root_dir)
+        self.mode = mode
+        self.every = max(1, every)
+        self.ring_size = max(1, ring_size)
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._calls: Dict[str, int] = {}
+
+        self.captured = 0
+        self.dropped = 0
+        self.bytes_written = 0
+
+    @property
+    def on_anomaly(self) -> bool:
+        return self.mode != 'off'
+
+    def should_sample(self, sport: str) -> bool:
+        """Count a selected grid for sport and say whether it should be captured"""
+        if self.mode == 'always':
+            return True
+        if self.mode != 'sample':
+            return False
+        calls = self._calls.get(sport, 0) + 1
+        self._calls[sport] = calls
+        return (calls - 1) % self.every == 0
+
+    async def capture_element(self, sport: str, element, reason: str):
+        """Fetch an element's inner HTML and queue it for a compressed write"""
+        try:
+            html = await element.inner_html()
+        except Exception as e:
+            self.logger.debug(f"Debug capture for {sport} skipped: {e}")
+            return
+        self.capture(sport, html, reason)
+
+    def capture(self, sport: str, html: str, reason: str):
+        """Queue HTML for a compressed ring write (returns immediately)"""
+        with self._lock:
+            if self._pending >= self.MAX_PENDING:
+                self.dropped += 1
+                return
+            self._pending += 1
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='debug-capture')
+        self._executor.submit(self._write, sport, html, reason, datetime.now())
+
+    def _write(self, sport: str, html: str, reason: str, captured_at: datetime):
+        try:
+            sport_dir = self.root_dir / re.sub(r'[^A-Za-z0-9_-]+', '_', sport)
+            sport_dir.mkdir(parents=True, exist_ok=True)
+            payload = gzip.compress(html.encode('utf-8'), compresslevel=6)
+            (sport_dir / f"{captured_at.strftime('%Y%m%d_%H%M%S_%f')}_{reason}.html.gz").write_bytes(payload)
+            self.captured += 1
+            self.bytes_written += len(payload)
+
+            # Names start with the timestamp, so sorting them orders the ring oldest first
+            captures = sorted(sport_dir.glob('*.html.gz'))
+            for stale in captures[:-self.ring_size]:
+                stale.unlink(missing_ok=True)
+        except Exception as e:
+            self.logger.warning(f"Debug capture write failed for {sport}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def close(self):
+        """Wait for queued captures to be written"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'captured': self.captured,
+            'dropped': self.dropped,
+            'pending': self._pending,
+            'bytes_written': self.bytes_written
+        }
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+LOCAL EVENT BUS: LIVE SCRAPER -> DASHBOARD
+Carries each extraction cycle's live matches from ConcurrentLiveScraper to
+the dashboard over a local socket, so the dashboard no longer has to poll
+and re-parse bet365_live_current.json to see a cycle. The files are still
+written and remain the fallback (and the source after a restart).
+
+- Transport: Unix domain socket (a path) or TCP on localhost ('host:port',
+  used on Windows); one orjson document per line
+- EventBusPublisher (scraper side) is the scraper's broadcast_callback. It
+  sends a 'live_snapshot' with every match after (re)connecting, then one
+  'live_delta' per cycle with the matches whose content changed and the
+  keys that disappeared. It never blocks a cycle: if the dashboard is not
+  listening, the cycle is skipped and a reconnect is tried later
+- LiveMatchMirror (dashboard side) applies the events. Deltas must arrive
+  in sequence; on a gap the server drops the connection and the publisher
+  reconnects with a snapshot. The mirror only counts as active while events
+  keep coming, otherwise the dashboard reads the files again
+
+Events:
+    {'type': 'live_snapshot', 'seq': 1, 'timestamp', 'matches': {key: match}, 'stats'}
+    {'type': 'live_delta', 'seq': 2, 'timestamp', 'upserts': {key: match}, 'removed': [key], 'stats'}
+Every few seconds an event also carries the scraper's metrics (metrics.py) under 'metrics'.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import socket
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+
+from metrics import REGISTRY
+
+MAX_EVENT_BYTES = 64 * 1024 * 1024  # StreamReader line limit (a full snapshot is one line)
+DEFAULT_SOCKET_PATH = 'bet365_events.sock'
+DEFAULT_TCP_ADDRESS = '127.0.0.1:8765'
+
+
+def default_address() -> str:
+    """Unix socket next to the data files where supported, localhost TCP otherwise"""
+    if hasattr(socket, 'AF_UNIX') and os.name != 'nt':
+        return DEFAULT_SOCKET_PATH
+    return DEFAULT_TCP_ADDRESS
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """('tcp', (host, port)) for 'host:port', ('unix', path) otherwise"""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address and '\\' not in address:
+        return 'tcp', (host or '127.0.0.1', int(port))
+    return 'unix', address
+
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    return orjson.dumps(event, default=str, option=orjson.OPT_NON_STR_KEYS) + b'\n'
+
+
+def match_digest(match: Dict[str, Any]) -> bytes:
+    """Content hash of a match, ignoring the per-cycle last_updated stamp"""
+    content = {key: value for key, value in match.items() if key != 'last_updated'}
+    payload = orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+# ----------------------------- Scraper side ----------------------------- #
+
+class EventBusPublisher:
+    """Sends cycle deltas to the dashboard; usable as ConcurrentLiveScraper.broadcast_callback"""
+
+    def __init__(self, address: str, key_func: Callable[[Dict[str, Any]], str],
+                 send_timeout: float = 2.0, reconnect_interval: float = 5.0, metrics_interval: float = 5.0,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            address: Unix socket path or 'host:port'
+            key_func: stable key of a match (the scraper's generate_match_key)
+            send_timeout: seconds a send may take before the connection is dropped
+            reconnect_interval: minimum seconds between connection attempts
+            metrics_interval: minimum seconds between attaching this process's metrics to an event
+            logger: logger for connection events
+        """
+        self.address = address
+        self.key_func = key_func
+        self.send_timeout = send_timeout
+        self.reconnect_interval = reconnect_interval
+        self.metrics_interval = metrics_interval
+        self._last_metrics = 0.0
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.seq = 0
+        self.digests: Dict[str, bytes] = {}
+        self._last_attempt = 0.0
+
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.skipped_cycles = 0
+        self.connects = 0
+
+    async def _connect(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_attempt < self.reconnect_interval:
+            return False
+        self._last_attempt = now
+
+        kind, target = parse_address(self.address)
+        try:
+            if kind == 'tcp':
+                connection = asyncio.open_connection(*target, limit=MAX_EVENT_BYTES)
+            else:
+                connection = asyncio.open_unix_connection(target, limit=MAX_EVENT_BYTES)
+            _, self.writer = await asyncio.wait_for(connection, timeout=self.send_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            self.logger.debug(f"Event bus not available at {self.address}: {e}")
+            return False
+
+        # A new connection starts from a full snapshot
+        self.seq = 0
+        self.digests = {}
+        self.connects += 1
+        self.logger.info(f"Connected to dashboard event bus at {self.address}")
+        return True
+
+    def _disconnect(self):
+        if self.writer is not None:
+            try:
+                self.writer.close()
+            except Exception:
+                pass
+        self.writer = None
+
+    def build_event(self, matches: List[Dict[str, Any]], timestamp: Optional[str],
+                    stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Snapshot (first event of a connection) or delta against the last sent cycle"""
+        current, digests = {}, {}
+        for match in matches:
+            if not isinstance(match, dict):
+                continue
+            key = self.key_func(match)
+            current[key] = match
+            digests[key] = match_digest(match)
+
+        self.seq += 1
+        if self.seq == 1:
+            event = {'type': 'live_snapshot', 'matches': current}
+        else:
+            event = {
+                'type': 'live_delta',
+                'upserts': {key: match for key, match in current.items()
+                            if self.digests.get(key) != digests[key]},
+                'removed': [key for key in self.digests if key not in current]
+            }
+        self.digests = digests
+        event.update(seq=self.seq, timestamp=timestamp, stats=stats or {})
+        return event
+
+    async def publish(self, dashboard_data: Dict[str, Any]):
+        """broadcast_callback: send one cycle ({'matches', 'timestamp', 'stats', ...})"""
+        if self.writer is None and not await self._connect():
+            self.skipped_cycles += 1
+            return
+
+        event = self.build_event(dashboard_data.get('matches', []), dashboard_data.get('timestamp'),
+                                 dashboard_data.get('stats'))
+        if time.monotonic() - self._last_metrics >= self.metrics_interval:
+            # Rendered by the dashboard's /metrics with process="live_scraper"
+            event['metrics'] = REGISTRY.collect()
+            self._last_metrics = time.monotonic()
+        payload = encode_event(event)
+        try:
+            self.writer.write(payload)
+            await asyncio.wait_for(self.writer.drain(), timeout=self.send_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            # The dashboard missed this event - the next connection starts with a snapshot
+            self.logger.warning(f"Event bus send failed, reconnecting later: {e}")
+            self._disconnect()
+            self.skipped_cycles += 1
+            return
+
+        self.events_sent += 1
+        self.bytes_sent += len(payload)
+
+    def close(self):
+        self._disconnect()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'address': self.address,
+            'connected': self.writer is not None,
+            'seq': self.seq,
+            'events_sent': self.events_sent,
+            'bytes_sent': self.bytes_sent,
+            'skipped_cycles': self.skipped_cycles,
+            'connects': self.connects
+        }
+
+
+# ----------------------------- Dashboard side ----------------------------- #
+
+class LiveMatchMirror:
+    """Dashboard copy of the scraper's current live matches, kept up to date from bus events"""
+
+    def __init__(self, stale_after: float = 30.0):
+        """
+        Args:
+            stale_after: seconds without events before the mirror stops being used
+        """
+        self.stale_after = stale_after
+        self.matches: Dict[str, Dict[str, Any]] = {}
+        self.seq = 0
+        self.synced = False
+        self.version = 0
+        self.timestamp: Optional[str] = None
+        self.stats: Dict[str, Any] = {}
+        self.last_event = 0.0
+
+        self.snapshots = 0
+        self.deltas = 0
+        self.gaps = 0
+
+    def apply(self, event: Dict[str, Any]) -> bool:
+        """Apply one event. Returns True if the live matches changed."""
+        kind = event.get('type')
+        seq = event.get('seq', 0)
+        if kind == 'live_snapshot':
+            self.matches = dict(event.get('matches') or {})
+            self.synced = True
+            self.snapshots += 1
+        elif kind == 'live_delta':
+            if not self.synced or seq != self.seq + 1:
+                # Missed an event - unusable until the publisher's next snapshot
+                self.synced = False
+                self.gaps += 1
+                return False
+            for key in event.get('removed') or []:
+                self.matches.pop(key, None)
+            self.matches.update(event.get('upserts') or {})
+            self.deltas += 1
+        else:
+            return False
+
+        self.seq = seq
+        self.timestamp = event.get('timestamp')
+        self.stats = event.get('stats') or {}
+        self.last_event = time.monotonic()
+        self.version += 1
+        return True
+
+    def active(self) -> bool:
+        """True while the mirror is in sync and recent enough to replace the live files"""
+        return self.synced and time.monotonic() - self.last_event < self.stale_after
+
+    def token(self) -> Optional[Tuple[str, int]]:
+        """Change token part for the dashboard data hub (None when the files are authoritative)"""
+        return ('bus', self.version) if self.active() else None
+
+    def live_matches(self) -> List[Dict[str, Any]]:
+        return list(self.matches.values())
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'active': self.active(),
+            'seq': self.seq,
+            'matches': len(self.matches),
+            'snapshots': self.snapshots,
+            'deltas': self.deltas,
+            'gaps': self.gaps,
+            'last_event_age': round(time.monotonic() - self.last_event, 3) if self.last_event else None
+        }
+
+
+class EventBusServer:
+    """Accepts publisher connections and hands every decoded event to a callback"""
+
+    def __init__(self, address: str, on_event: Callable[[Dict[str, Any]], Awaitable[bool]],
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            address: Unix socket path or 'host:port' to listen on
+            on_event: coroutine called with each event, in arrival order; returning False
+                closes the connection, so the publisher reconnects with a fresh snapshot
+            logger: logger for connection events
+        """
+        self.address = address
+        self.on_event = on_event
+        self.logger = logger or logging.getLogger(__name__)
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections: Set[asyncio.StreamWriter] = set()
+        self.events = 0
+        self.errors = 0
+
+    async def start(self):
+        kind, target = parse_address(self.address)
+        if kind == 'tcp':
+            self.server = await asyncio.start_server(self._handle, *target, limit=MAX_EVENT_BYTES)
+        else:
+            if os.path.exists(target):
+                os.unlink(target)  # Left behind by a previous run
+            self.server = await asyncio.start_unix_server(self._handle, target, limit=MAX_EVENT_BYTES)
+        self.logger.info(f"Event bus listening on {self.address}")
+
+    async def stop(self):
+        # Server.close() leaves accepted connections open - end them so their handlers finish
+        for writer in list(self.connections):
+            writer.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        kind, target = parse_address(self.address)
+        if kind == 'unix' and os.path.exists(target):
+            os.unlink(target)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.logger.info("Event bus publisher connected")
+        self.connections.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    event = orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    self.errors += 1
+                    self.logger.warning(f"Discarding malformed event bus message: {e}")
+                    continue
+                self.events += 1
+                if await self.on_event(event) is False:
+                    self.logger.warning("Event bus consumer out of sync, dropping publisher connection")
+                    break
+        except (ValueError, ConnectionError) as e:
+            # ValueError: a line longer than MAX_EVENT_BYTES
+            self.errors += 1
+            self.logger.warning(f"Event bus connection error: {e}")
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+            self.logger.info("Event bus publisher disconnected")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {'address': self.address, 'listening': self.server is not None,
+                'events': self.events, 'errors': self.errors}
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+SINGLE-PRODUCER WEBSOCKET FAN-OUT
+Replaces awaiting send_json to each dashboard client in turn.
+
+- broadcast() serializes a message once (orjson, splicing in matches that
+  were serialized when they were transformed) and offers the same text to
+  every client's bounded queue without awaiting any socket, so its cost does
+  not depend on how fast clients read
+- Each client has one writer task, the only code that sends on its socket,
+  so snapshots, patches and resync replies stay in order
+- A client whose queue is full is handled by policy:
+    'coalesce'  pending messages are replaced by one full snapshot at the
+                current sequence (the client stays consistent, skipping the
+                intermediate patches)
+    'drop'      the new message is dropped; the client sees the sequence gap
+                and asks for a resync
+- A send that takes longer than send_timeout disconnects the client
+- metrics(): clients, queue depth, queue lag (enqueue -> sent) percentiles,
+  fan-out time, sent/dropped/coalesced counts
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+
+from metrics import REGISTRY, SIZE_BUCKETS
+
+FANOUT_POLICIES = ('coalesce', 'drop')
+
+BROADCAST_SECONDS = REGISTRY.histogram('bet365_dashboard_broadcast_seconds',
+                                       'Time to serialize a WebSocket message and queue it for every client')
+QUEUE_LAG_SECONDS = REGISTRY.histogram('bet365_dashboard_queue_lag_seconds',
+                                       'Time from queueing a WebSocket message to sending it')
+MESSAGE_BYTES = REGISTRY.histogram('bet365_dashboard_message_bytes', 'Serialized WebSocket broadcast size',
+                                   buckets=SIZE_BUCKETS)
+SLOW_CLIENT_EVENTS = REGISTRY.counter('bet365_dashboard_slow_client_events',
+                                      'Messages coalesced or dropped for clients with a full queue', ['action'])
+
+# Every broadcaster in the process; the gauges sum them at scrape time
+_BROADCASTERS = weakref.WeakSet()
+REGISTRY.gauge('bet365_dashboard_clients', 'Connected WebSocket clients',
+               func=lambda: sum(len(b.channels) for b in list(_BROADCASTERS)))
+REGISTRY.gauge('bet365_dashboard_queue_depth', 'Messages queued across all WebSocket clients',
+               func=lambda: sum(channel.queue.qsize() for b in list(_BROADCASTERS)
+                                for channel in list(b.channels.values())))
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class PreEncoded:
+    """List of already-serialized JSON values, spliced verbatim into a message by encode_message"""
+
+    __slots__ = ('items',)
+
+    def __init__(self, items: List[bytes]):
+        self.items = items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def to_json(self) -> bytes:
+        return b'[' + b','.join(self.items) + b']'
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """Serialize a message; PreEncoded values in message['data'] are spliced in as-is"""
+    data = message.get('data')
+    spliced = {}
+    if isinstance(data, dict) and any(isinstance(value, PreEncoded) for value in data.values()):
+        data = dict(data)
+        for key, value in data.items():
+            if isinstance(value, PreEncoded):
+                placeholder = f"__pre_encoded_{len(spliced)}_{id(value)}__"
+                spliced[placeholder] = value
+                data[key] = placeholder
+        message = dict(message, data=data)
+
+    payload = orjson.dumps(message, default=str, option=orjson.OPT_NON_STR_KEYS)
+    for placeholder, value in spliced.items():
+        payload = payload.replace(b'"' + placeholder.encode('ascii') + b'"', value.to_json(), 1)
+    return payload.decode('utf-8')
+
+
+class ClientChannel:
+    """Bounded outgoing queue and writer task for one WebSocket"""
+
+    def __init__(self, websocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: "asyncio.Queue" = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+
+    def offer(self, payload: str, enqueued_at: float) -> bool:
+        """Queue a payload without waiting. Returns False if the queue is full."""
+        try:
+            self.queue.put_nowait((payload, enqueued_at))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def replace_pending(self, payload: str, enqueued_at: float):
+        """Discard everything queued and queue payload instead"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait((payload, enqueued_at))
+
+
+class FanoutBroadcaster:
+    """Connection registry that fans each serialized message out through per-client queues"""
+
+    def __init__(self, queue_size: int = 16, policy: str = 'coalesce',
+                 snapshot_func: Optional[Callable[[], Dict[str, Any]]] = None,
+                 send_timeout: float = 10.0, lag_samples: int = 2000,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            queue_size: messages buffered per client before the slow-consumer policy applies
+            policy: 'coalesce' (replace the backlog with a fresh snapshot) or 'drop'
+            snapshot_func: builds the full snapshot message used when coalescing
+            send_timeout: seconds a single send may take before the client is disconnected
+            lag_samples: recent queue lag samples kept for the percentiles
+            logger: logger for connection events
+        """
+        if policy not in FANOUT_POLICIES:
+            raise ValueError(f"Unknown fan-out policy: {policy}")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.snapshot_func = snapshot_func
+        self.send_timeout = send_timeout
+        self.logger = logger or logging.getLogger(__name__)
+
+        self.channels: Dict[Any, ClientChannel] = {}
+        self.lag_ms = deque(maxlen=lag_samples)
+        self.fanout_ms = deque(maxlen=lag_samples)
+        self.broadcasts = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.disconnects = 0
+
+        _BROADCASTERS.add(self)
+
+    @property
+    def active_connections(self) -> List[Any]:
+        return list(self.channels)
+
+    # ----------------------------- Connections ----------------------------- #
+
+    async def connect(self, websocket, initial_message: Optional[Callable[[], Dict[str, Any]]] = None):
+        """
+        Accept a socket, queue its initial message and start its writer.
+
+        initial_message is called after the accept, and the channel is registered with
+        no await in between, so no broadcast can fall between the snapshot and the
+        client's first patch.
+        """
+        await websocket.accept()
+        channel = ClientChannel(websocket, self.queue_size)
+        if initial_message is not None:
+            channel.offer(encode_message(initial_message()), time.monotonic())
+        self.channels[websocket] = channel
+        channel.task = asyncio.create_task(self._writer(channel))
+        self.logger.info(f"Client connected. Total connections: {len(self.channels)}")
+
+    def disconnect(self, websocket):
+        channel = self.channels.pop(websocket, None)
+        if channel is None:
+            return
+        channel.closed = True
+        if channel.task and channel.task is not asyncio.current_task():
+            channel.task.cancel()
+        self.disconnects += 1
+        self.logger.info(f"Client disconnected. Total connections: {len(self.channels)}")
+
+    # ----------------------------- Sending ----------------------------- #
+
+    async def broadcast(self, message: Dict[str, Any]):
+        """Serialize once and queue for every client (never waits on a socket)"""
+        started = time.perf_counter()
+        payload = encode_message(message)
+        enqueued_at = time.monotonic()
+        snapshot_payload = None
+
+        for channel in list(self.channels.values()):
+            if channel.offer(payload, enqueued_at):
+                continue
+            if self.policy == 'coalesce' and self.snapshot_func is not None:
+                if snapshot_payload is None:
+                    snapshot_payload = encode_message(self.snapshot_func())
+                channel.replace_pending(snapshot_payload, enqueued_at)
+                channel.coalesced += 1
+                self.coalesced += 1
+                SLOW_CLIENT_EVENTS.labels(action='coalesced').inc()
+            else:
+                channel.dropped += 1
+                self.dropped += 1
+                SLOW_CLIENT_EVENTS.labels(action='dropped').inc()
+
+        elapsed = time.perf_counter() - started
+        self.broadcasts += 1
+        self.fanout_ms.append(elapsed * 1000)
+        BROADCAST_SECONDS.observe(elapsed)
+        MESSAGE_BYTES.observe(len(payload))
+
+    def send(self, websocket, message: Dict[str, Any]):
+        """Queue a message for one client (e.g. a resync snapshot), through its writer"""
+        channel = self.channels.get(websocket)
+        if channel is None:
+            return
+        payload = encode_message(message)
+        if not channel.offer(payload, time.monotonic()):
+            # A full snapshot supersedes whatever is still queued
+            channel.replace_pending(payload, time.monotonic())
+            channel.coalesced += 1
+            self.coalesced += 1
+
+    async def _writer(self, channel: ClientChannel):
+        try:
+            while not channel.closed:
+                payload, enqueued_at = await channel.queue.get()
+                await asyncio.wait_for(channel.websocket.send_text(payload), timeout=self.send_timeout)
+                lag = time.monotonic() - enqueued_at
+                self.lag_ms.append(lag * 1000)
+                QUEUE_LAG_SECONDS.observe(lag)
+                channel.sent += 1
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Disconnecting client: send took longer than {self.send_timeout}s")
+            self.disconnect(channel.websocket)
+            try:
+                await channel.websocket.close()
+            except Exception:
+                pass
+        except Exception as e:
+            self.logger.error(f"Error sending to client: {e}")
+            self.disconnect(channel.websocket)
+
+    # ----------------------------- Metrics ----------------------------- #
+
+    def metrics(self) -> Dict[str, Any]:
+        lags = sorted(self.lag_ms)
+        fanout = sorted(self.fanout_ms)
+        depths = [channel.queue.qsize() for channel in self.channels.values()]
+        return {
+            'clients': len(self.channels),
+            'policy': self.policy,
+            'queue_size': self.queue_size,
+            'queue_depth_max': max(depths, default=0),
+            'queue_depth_total': sum(depths),
+            'queue_lag_ms': {
+                'p50': round(_percentile(lags, 0.50), 3),
+                'p95': round(_percentile(lags, 0.95), 3),
+                'max': round(lags[-1], 3) if lags else 0.0
+            },
+            'fanout_ms': {
+                'p50': round(_percentile(fanout, 0.50), 3),
+                'p95': round(_percentile(fanout, 0.95), 3),
+                'max': round(fanout[-1], 3) if fanout else 0.0
+            },
+            'broadcasts': self.broadcasts,
+            'sent': self.sent,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'disconnects': self.disconnects
+        }
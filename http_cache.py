@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+GENERATION-KEYED HTTP RESPONSE CACHE
+Validators and compression for the dashboard's REST endpoints and index.html.
+
+- Each cached resource (path + query) remembers the generation of the data
+  its body was built from; the body is built, serialized and compressed at
+  most once per generation, however many clients poll it
+- Strong ETags are derived from the resource key and generation (not from
+  the body), with one tag per content coding; If-None-Match naming the tag of
+  the negotiated coding -> 304 without touching the body
+- Content negotiation: br (if the optional brotli package is installed),
+  then gzip, then identity, honouring q-values; compressed bodies are kept
+  next to the identity body until the generation moves
+- Responses carry Cache-Control: no-cache, so browsers (including the
+  dashboard's 5s polling fallback) revalidate every time and get a 304
+  while the data is unchanged
+"""
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q}"""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    """Best content coding we can produce for an Accept-Encoding header (None = identity)"""
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for coding in ENCODINGS:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    # mtime=0 keeps the output (and so the representation) identical across rebuilds
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+
+class CachedBody:
+    """Identity body of one resource generation plus its compressed variants"""
+
+    __slots__ = ('generation', 'etag', 'media_type', 'identity', 'encoded')
+
+    def __init__(self, generation: str, etag: str, media_type: str, identity: bytes):
+        self.generation = generation
+        self.etag = etag
+        self.media_type = media_type
+        self.identity = identity
+        self.encoded: Dict[str, bytes] = {}
+
+    def tag(self, encoding: Optional[str]) -> str:
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+    def matches(self, if_none_match: Optional[str], encoding: Optional[str]) -> bool:
+        """
+        True if If-None-Match names the representation negotiated for this request. A W/
+        prefix is ignored (weak comparison), but a tag for another encoding never matches:
+        the client would be revalidating bytes it does not hold.
+        """
+        if not if_none_match:
+            return False
+        tag = self.tag(encoding)
+        for candidate in if_none_match.split(','):
+            candidate = candidate.strip()
+            if candidate.startswith('W/'):
+                candidate = candidate[2:]
+            if candidate == '*' or candidate == tag:
+                return True
+        return False
+
+
+class HTTPResponseCache:
+    """LRU of resource key -> CachedBody, rebuilt when the resource's generation changes"""
+
+    def __init__(self, max_entries: int = 256, min_compress_size: int = 1024):
+        """
+        Args:
+            max_entries: cached resources (distinct path + query) before LRU eviction
+            min_compress_size: bodies smaller than this are always sent as identity
+        """
+        self.max_entries = max_entries
+        self.min_compress_size = min_compress_size
+
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self.requests = 0
+        self.not_modified = 0
+        self.builds = 0
+        self.compressions = 0
+        self.bytes_sent = 0
+        self.bytes_identity = 0
+
+    @staticmethod
+    def resource_key(request: Request) -> str:
+        query = '&'.join(sorted(request.url.query.split('&'))) if request.url.query else ''
+        return f"{request.url.path}?{query}"
+
+    def respond(self, request: Request, generation: Any, build: Callable[[], bytes],
+                media_type: str = 'application/json') -> Response:
+        """
+        Response for a request, reusing the cached body while the generation is unchanged.
+
+        Args:
+            request: incoming request (path, query, If-None-Match, Accept-Encoding)
+            generation: value that changes whenever the data behind the body changes
+            build: serialized identity body for the current generation
+            media_type: Content-Type of the body
+        """
+        self.requests += 1
+        key = self.resource_key(request)
+        generation = str(generation)
+        entry = self._entries.get(key)
+        if entry is None or entry.generation != generation:
+            etag = hashlib.blake2b(f"{key}\0{generation}".encode('utf-8'), digest_size=12).hexdigest()
+            entry = CachedBody(generation, etag, media_type, build())
+            self._entries[key] = entry
+            self.builds += 1
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+
+        encoding = None
+        if len(entry.identity) >= self.min_compress_size:
+            encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+        headers = {
+            'ETag': entry.tag(encoding),
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding'
+        }
+
+        if entry.matches(request.headers.get('if-none-match'), encoding):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        body = entry.identity
+        if encoding is not None:
+            if encoding not in entry.encoded:
+                entry.encoded[encoding] = compress(entry.identity, encoding)
+                self.compressions += 1
+            body = entry.encoded[encoding]
+            headers['Content-Encoding'] = encoding
+
+        self.bytes_sent += len(body)
+        self.bytes_identity += len(entry.identity)
+        return Response(content=body, media_type=entry.media_type, headers=headers)
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'requests': self.requests,
+            'not_modified': self.not_modified,
+            'builds': self.builds,
+            'compressions': self.compressions,
+            'encodings': list(ENCODINGS),
+            'bytes_sent': self.bytes_sent,
+            'bytes_identity': self.bytes_identity
+        }
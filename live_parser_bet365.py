@@ -22,6 +22,23 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional, Set
 from patchright.async_api import async_playwright
 import hashlib
+import orjson
+
+from change_journal import ChangeJournal
+from persistence import PersistenceService, WriteBehindScheduler, freeze_document
+from sqlite_store import SQLiteStore
+from current_shards import ShardedCurrentWriter, ShardedCurrentReader, SHARD_DIR_NAME
+from binary_snapshot import BinarySnapshotWriter, BINARY_SNAPSHOT_NAME
+from serialization import load_file
+from selector_learning import SelectorPerformanceStore
+from metrics import REGISTRY, SIZE_BUCKETS
+
+EVALUATE_PAYLOAD_BYTES = REGISTRY.histogram('bet365_live_evaluate_payload_bytes',
+                                            'Size of the extraction script result returned by page.evaluate '
+                                            '(sampled every PAYLOAD_SAMPLE_EVERY extractions per sport)',
+                                            ['sport'], buckets=SIZE_BUCKETS)
+EVALUATE_SECONDS = REGISTRY.histogram('bet365_live_evaluate_seconds',
+                                      'page.evaluate time of the extraction script', ['sport'])
 
 # Import dashboard broadcasting functions
 try:
@@ -74,18 +91,71 @@ class UltimateLiveScraper:
         'B1002': {'columns': ['spread', 'total', 'tie_no_bet'], 'sport': 'Futsal'},
     }
 
-    def __init__(self, disable_broadcasting=False):
+    # Removal hysteresis: a match is only finalized as removed after it has been
+    # missing for `cycles` consecutive extractions or `seconds`, whichever comes first
+    REMOVAL_GRACE = {
+        'default': {'cycles': 3, 'seconds': 30},
+
+        # Short matches that genuinely end quickly - finalize sooner
+        'Table Tennis': {'cycles': 2, 'seconds': 15},
+        'Esports': {'cycles': 2, 'seconds': 20},
+
+        # Long-running events with slow-rendering lists - tolerate more misses
+        'Cricket': {'cycles': 5, 'seconds': 90},
+        'Golf': {'cycles': 5, 'seconds': 120},
+    }
+
+    # Write-behind coalescing for the live JSON files (seconds): a dirty document is
+    # written after WRITE_LATENCY of quiet, and never later than WRITE_STALENESS
+    WRITE_LATENCY = 0.25
+    WRITE_STALENESS = 2.0
+
+    # Selectors that indicate live betting content has rendered (tried in learned order)
+    FIXTURE_WAIT_SELECTORS = [
+        '.ovm-Fixture',
+        '.gl-Market',
+        '.ovm-FixtureDetailsTwoWay_TeamName',
+        '[class*="Fixture"]',
+        '[class*="Market"]',
+        '.ovm-InPlayTimer',
+        '.ovm-StandardScores_TeamOne'
+    ]
+    FIXTURE_WAIT_TIMEOUT = 8000
+
+    # Measuring an evaluate result's size means serializing it again - only every Nth per sport
+    PAYLOAD_SAMPLE_EVERY = 20
+
+    # Whole documents mirrored into the SQLite documents table (live matches and
+    # history are stored incrementally from detected changes instead)
+    SQLITE_DOCUMENTS = {'statistics', 'live_statistics'}
+
+    def __init__(self, disable_broadcasting=False, output_dir=None, removal_grace=None,
+                 write_latency=None, write_staleness=None, storage='json', current_layout='single',
+                 binary_snapshot=False, codec=None, config_dir=None, save_selectors=True):
         """Initialize the Ultimate Live Scraper"""
         self.disable_broadcasting = disable_broadcasting
+        # False leaves the selector database untouched (replays learn nothing worth keeping)
+        self.save_selectors = save_selectors
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-        # File paths
+        # File paths - data files go to output_dir, the log and selector database to
+        # config_dir (both default to the script directory)
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.current_data_file = os.path.join(self.script_dir, "bet365_live_current.json")
-        self.history_data_file = os.path.join(self.script_dir, "bet365_live_history.json")
-        self.standardized_data_file = os.path.join(self.script_dir, "bet365_live_standardized.json")
-        self.selector_db_file = os.path.join(self.script_dir, "bet365_selectors_detailed.json")
-        self.log_file = os.path.join(self.script_dir, f"bet365_scraper_{self.session_id}.log")
+        self.output_dir = output_dir or self.script_dir
+        self.config_dir = config_dir or self.script_dir
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.current_data_file = os.path.join(self.output_dir, "bet365_live_current.json")
+        self.history_data_file = os.path.join(self.output_dir, "bet365_live_history.json")
+        self.standardized_data_file = os.path.join(self.output_dir, "bet365_live_standardized.json")
+        self.statistics_file = os.path.join(self.output_dir, "bet365_statistics.json")
+        self.live_statistics_file = os.path.join(self.output_dir, "bet365_live_statistics.json")
+        self.selector_db_file = os.path.join(self.config_dir, "bet365_selectors_detailed.json")
+        self.journal_file = os.path.join(self.output_dir, "bet365_live_journal.ndjson")
+        self.snapshot_file = os.path.join(self.output_dir, "bet365_live_snapshot.json")
+        self.db_file = os.path.join(self.output_dir, "bet365_data.db")
+        self.shard_dir = os.path.join(self.output_dir, SHARD_DIR_NAME)
+        self.binary_snapshot_file = os.path.join(self.output_dir, BINARY_SNAPSHOT_NAME)
+        self.log_file = os.path.join(self.config_dir, f"bet365_scraper_{self.session_id}.log")
 
         self.setup_logging()
 
@@ -98,14 +168,59 @@ class UltimateLiveScraper:
         self.browser_instance = None
 
         # Tracking systems
+        # Learned selector order (hits, elements matched, wait times), saved into the selector file
+        self.selector_store = SelectorPerformanceStore()
         self.selector_database = self.load_selector_database()
         self.current_matches = {}
-        self.match_history = self.load_match_history()
         self.data_changes_log = []
+
+        # Removal hysteresis state: match_key -> {'misses', 'first_missed'}
+        self.removal_grace = dict(self.REMOVAL_GRACE)
+        if removal_grace:
+            self.removal_grace.update(removal_grace)
+        self.removal_candidates = {}
+        self.churn_stats = {
+            'missed_observations': 0,   # match absent from an extraction while tracked
+            'suppressed_removals': 0,   # reappeared within the grace window (flicker avoided)
+            'finalized_removals': 0     # removed after the grace window expired
+        }
+
+        # Write-ahead change journal (snapshot + replay on startup)
+        self.change_journal = ChangeJournal(self.journal_file, self.snapshot_file, logger=self.logger)
+
+        # Off-loop writer for the live JSON files (orjson, atomic replace), fronted by a
+        # write-behind scheduler so each file is written once per flush window
+        self.persistence = PersistenceService(logger=self.logger, codec=codec)
+        self.write_behind = WriteBehindScheduler(
+            self.persistence,
+            max_latency=self.WRITE_LATENCY if write_latency is None else write_latency,
+            max_staleness=self.WRITE_STALENESS if write_staleness is None else write_staleness,
+            logger=self.logger
+        )
+
+        # Storage sinks: 'json' files (default), 'sqlite' database, or 'both'
+        self.storage = storage
+        self.sqlite_store = SQLiteStore(self.db_file, logger=self.logger) if storage in ('sqlite', 'both') else None
+
+        # Current data layout: one 'single' file, per-sport 'sharded' files + manifest, or 'both'
+        self.current_layout = current_layout
+        self.shard_writer = None
+        if storage != 'sqlite' and current_layout in ('sharded', 'both'):
+            self.shard_writer = ShardedCurrentWriter(self.shard_dir, logger=self.logger)
+
+        # Optional mmap-able binary snapshot of the current data, published alongside it
+        self.binary_writer = None
+        if storage != 'sqlite' and binary_snapshot:
+            self.binary_writer = BinarySnapshotWriter(self.binary_snapshot_file, self.generate_match_key,
+                                                      logger=self.logger)
+
+        # Loaded once the writers exist - a missing history file is created on the spot
+        self.match_history = self.load_match_history()
         
         # Session tracking
         self.session_start_time = datetime.now().isoformat()
         self.extraction_count = 0
+        self.evaluate_counts: Dict[str, int] = {}
 
         # Sport mappings for navigation
         self.sport_mappings = {
@@ -150,11 +265,11 @@ class UltimateLiveScraper:
         """Load the detailed selector database"""
         try:
             if os.path.exists(self.selector_db_file):
-                with open(self.selector_db_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = load_file(self.selector_db_file)
             else:
                 data = {}
-            
+            self.selector_store.load(data)
+
             if data:
                 transformed_db = {
                     'last_updated': data.get('metadata', {}).get('completed_at', datetime.now().isoformat()),
@@ -218,10 +333,13 @@ class UltimateLiveScraper:
             }
         }
         self.save_selector_database(db)
+        self.selector_store.load(db)
         return db
 
     def save_selector_database(self, db):
         """Save the selector database"""
+        if not self.save_selectors:
+            return
         try:
             with open(self.selector_db_file, 'w', encoding='utf-8') as f:
                 json.dump(db, f, indent=2, ensure_ascii=False)
@@ -233,8 +351,7 @@ class UltimateLiveScraper:
         """Load match history data"""
         try:
             if os.path.exists(self.history_data_file):
-                with open(self.history_data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = load_file(self.history_data_file)
                 
                 self.logger.info("Loaded match history with %d completed matches", 
                                len(data.get('completed_matches', {})))
@@ -256,12 +373,30 @@ class UltimateLiveScraper:
         self.save_match_history(history)
         return history
 
+    def persist_document(self, name, path, document):
+        """Route a whole-document write to the JSON file and/or the SQLite documents table"""
+        if self.storage != 'sqlite':
+            if name != 'current' or self.current_layout != 'sharded':
+                self.write_behind.put(path, document)
+            if name == 'current' and self.shard_writer:
+                # Shards are checksummed and only the changed ones rewritten on the writer thread
+                self.write_behind.put(f"shards:{name}", document, sink=self.shard_writer.write)
+            if name == 'current' and self.binary_writer:
+                self.write_behind.put(f"binary:{name}", document, sink=self.binary_writer.write)
+        if self.sqlite_store and name in self.SQLITE_DOCUMENTS:
+            self.write_behind.put(f"sqlite:{name}", document,
+                                  sink=lambda doc, name=name: self.sqlite_store.put_document(name, doc))
+
+    def sync_sqlite_live_matches(self):
+        """Make the SQLite live_matches table mirror the recovered in-memory state"""
+        if self.sqlite_store:
+            self.persistence.submit_call(self.sqlite_store.replace_live_matches, dict(self.current_matches))
+
     def save_match_history(self, history):
         """Save match history data"""
         try:
-            with open(self.history_data_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2, ensure_ascii=False)
-            self.logger.debug("Match history saved")
+            self.persist_document('history', self.history_data_file, history)
+            self.logger.debug("Match history queued for writing")
         except Exception as e:
             self.logger.error("Failed to save match history: %s", e)
 
@@ -321,13 +456,40 @@ class UltimateLiveScraper:
                         'changes': updates
                     })
 
+        # Hysteresis: a match missing from one extraction is held for a grace window
+        # before it is finalized as removed, so transient misses don't churn history
+        now = datetime.now()
+        for match_key in current_keys:
+            if match_key in self.removal_candidates:
+                del self.removal_candidates[match_key]
+                self.churn_stats['suppressed_removals'] += 1
+
         for match_key, match in self.current_matches.items():
-            if match_key not in current_keys:
+            if match_key in current_keys:
+                continue
+
+            candidate = self.removal_candidates.setdefault(match_key, {'misses': 0, 'first_missed': now})
+            candidate['misses'] += 1
+            self.churn_stats['missed_observations'] += 1
+
+            grace = self.get_removal_grace(match.get('sport', 'Unknown'))
+            missing_seconds = (now - candidate['first_missed']).total_seconds()
+
+            if candidate['misses'] >= grace['cycles'] or missing_seconds >= grace['seconds']:
+                del self.removal_candidates[match_key]
                 changes['removed'].append(match)
+                self.churn_stats['finalized_removals'] += 1
+            else:
+                # Miss counts stay in removal_candidates; the held match is carried over unchanged
+                new_match_dict[match_key] = match
 
         self.current_matches = new_match_dict
         return changes
 
+    def get_removal_grace(self, sport):
+        """Get the removal grace window (cycles and seconds) for a sport"""
+        return self.removal_grace.get(sport, self.removal_grace['default'])
+
     def compare_match_data(self, old_match, new_match):
         """Compare two match data objects and return list of changes"""
         changes = []
@@ -381,6 +543,20 @@ class UltimateLiveScraper:
             self.match_history['completed_matches'][match_key] = match
             self.match_history['session_stats']['total_completed'] += 1
 
+        # Append changes to the journal, compacting into a snapshot periodically. Entries are
+        # numbered here; the appends and snapshot writes run on the writer thread, in order
+        entries = self.change_journal.prepare_entries(changes, self.generate_match_key)
+        if entries:
+            self.persistence.submit_call(self.change_journal.append_entries, entries)
+        if self.change_journal.should_snapshot():
+            self.persistence.submit_call(self.change_journal.write_snapshot, freeze_document(self.current_matches),
+                                         self.change_journal.begin_snapshot())
+
+        # Incremental SQLite sink: upserts/deletes run on the writer thread, in order
+        if self.sqlite_store:
+            self.persistence.submit_call(self.sqlite_store.apply_live_changes,
+                                         SQLiteStore.live_change_rows(changes, self.generate_match_key))
+
         self.save_current_data()
         self.save_match_history(self.match_history)
 
@@ -399,11 +575,11 @@ class UltimateLiveScraper:
                 'total_matches': len(self.current_matches),
                 'matches': list(self.current_matches.values()),
                 'data_changes_log': self.data_changes_log[-100:],
-                'sports_breakdown': sports_breakdown
+                'sports_breakdown': sports_breakdown,
+                'churn_stats': self.churn_stats
             }
 
-            with open(self.current_data_file, 'w', encoding='utf-8') as f:
-                json.dump(current_data, f, indent=2, ensure_ascii=False)
+            self.persist_document('current', self.current_data_file, current_data)
             
             if DASHBOARD_AVAILABLE and not self.disable_broadcasting:
                 try:
@@ -419,18 +595,50 @@ class UltimateLiveScraper:
             self.logger.error("Error saving current data: %s", e)
 
     def load_current_data(self):
-        """Load current live matches data"""
+        """
+        Load current live matches data from the newest source: the journal (snapshot +
+        replay), bet365_live_current.json or the shard manifest. A run that wrote the
+        current file but died before its journal append, or that used another layout or
+        storage backend, leaves the journal older than the files it wrote.
+        """
         try:
+            shard_reader = ShardedCurrentReader(self.shard_dir, logger=self.logger)
+            sources = []
             if os.path.exists(self.current_data_file):
-                with open(self.current_data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                sources.append((os.path.getmtime(self.current_data_file), 'file'))
+            if shard_reader.exists():
+                sources.append((shard_reader.manifest_mtime() or 0.0, 'shards'))
+            newest_file = max(sources) if sources else None
+
+            journal_mtime = self.change_journal.mtime()
+            if journal_mtime is not None and (newest_file is None or journal_mtime >= newest_file[0]):
+                recovered, replayed = self.change_journal.recover()
+                if recovered is not None:
+                    self.current_matches = recovered
+                    self.data_changes_log = []
+                    self.logger.info("Loaded current data with %d matches from journal (%d entries replayed)",
+                                   len(self.current_matches), replayed)
+                    self.sync_sqlite_live_matches()
+                    return True
+
+            if newest_file is not None:
+                if newest_file[1] == 'shards':
+                    data = shard_reader.load()
+                else:
+                    data = load_file(self.current_data_file)
                 self.current_matches = {self.generate_match_key(m): m for m in data.get('matches', [])}
                 self.data_changes_log = data.get('data_changes_log', [])
-                self.logger.info("Loaded current data with %d matches", len(self.current_matches))
+                self.logger.info("Loaded current data with %d matches from %s", len(self.current_matches),
+                                 'shards' if newest_file[1] == 'shards' else self.current_data_file)
+
+                # Seed the journal (replacing any older one) so the next startup can skip the full-file parse
+                self.change_journal.write_snapshot(self.current_matches)
+                self.sync_sqlite_live_matches()
                 return True
             else:
                 self.current_matches = {}
                 self.data_changes_log = []
+                self.sync_sqlite_live_matches()
                 return False
         except Exception as e:
             self.logger.error("Error loading current data: %s", e)
@@ -439,7 +647,7 @@ class UltimateLiveScraper:
             return False
 
     def get_sport_selectors(self, sport_code):
-        """Get sport-specific selectors from database"""
+        """Get sport-specific selectors from database, in learned order (fastest working first)"""
         sport_key = sport_code.lower()
         sport_data = self.selector_database.get('sports', {}).get(sport_key, {})
         sport_selectors = sport_data.get('successful_selectors', {})
@@ -450,13 +658,19 @@ class UltimateLiveScraper:
             sport_specific = sport_selectors.get(selector_type, [])
             global_list = global_selectors.get(selector_type, [])
             
-            if sport_specific:
-                combined_selectors[selector_type] = sport_specific
-            else:
-                combined_selectors[selector_type] = global_list
+            candidates = sport_specific if sport_specific else global_list
+            combined_selectors[selector_type] = self.selector_store.rank(sport_code, selector_type, candidates)
 
         return combined_selectors
 
+    def save_selector_performance(self, force=False):
+        """Queue the learned selector statistics for writing (at most once per flush interval)"""
+        if not self.save_selectors:
+            return
+        if (force and self.selector_store.dirty) or self.selector_store.should_flush():
+            # Configuration rather than match data: always a file, whatever the storage backend
+            self.write_behind.put(self.selector_db_file, self.selector_store.to_document())
+
     def check_server_availability(self):
         """Quick check if bet365 server is responding"""
         import urllib.request
@@ -599,26 +813,29 @@ class UltimateLiveScraper:
                 # Additional wait for dynamic content to load
                 await asyncio.sleep(5)
 
-                # Try multiple selectors that indicate live betting content
-                selectors_to_try = [
-                    '.ovm-Fixture',
-                    '.gl-Market',
-                    '.ovm-FixtureDetailsTwoWay_TeamName',
-                    '[class*="Fixture"]',
-                    '[class*="Market"]',
-                    '.ovm-InPlayTimer',
-                    '.ovm-StandardScores_TeamOne'
-                ]
+                # Try selectors that indicate live betting content, fastest working first -
+                # each miss costs the full wait timeout
+                selectors_to_try = self.selector_store.rank(sport_code, 'fixture_wait', self.FIXTURE_WAIT_SELECTORS)
 
                 fixture_found = False
                 for selector in selectors_to_try:
+                    started = time.perf_counter()
                     try:
-                        await page.wait_for_selector(selector, timeout=8000)
-                        self.logger.info(f"Found fixtures using selector: {selector}")
-                        fixture_found = True
-                        break
-                    except:
+                        await page.wait_for_selector(selector, timeout=self.FIXTURE_WAIT_TIMEOUT)
+                    except Exception:
+                        self.selector_store.record(sport_code, 'fixture_wait', selector,
+                                                   elapsed_ms=(time.perf_counter() - started) * 1000)
                         continue
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    try:
+                        elements = await page.locator(selector).count()
+                    except Exception:
+                        elements = 1
+                    self.selector_store.record(sport_code, 'fixture_wait', selector, hits=1,
+                                               elements=elements, elapsed_ms=elapsed_ms)
+                    self.logger.info(f"Found fixtures using selector: {selector} ({elements} elements, {elapsed_ms:.0f}ms)")
+                    fixture_found = True
+                    break
 
                 if not fixture_found:
                     # Check if page shows "no live matches" message
@@ -678,13 +895,21 @@ class UltimateLiveScraper:
             self.logger.error("Page not connected - cannot execute extraction script")
             return {'matches': [], 'total_matches': 0, 'sport': sport_code}
 
+        evaluate_started = time.perf_counter()
         result = await page.evaluate(extraction_script)
+        EVALUATE_SECONDS.labels(sport=sport_code).observe(time.perf_counter() - evaluate_started)
+        evaluations = self.evaluate_counts.get(sport_code, 0)
+        self.evaluate_counts[sport_code] = evaluations + 1
+        if evaluations % self.PAYLOAD_SAMPLE_EVERY == 0:
+            EVALUATE_PAYLOAD_BYTES.labels(sport=sport_code).observe(len(orjson.dumps(result, default=str)))
 
         self.logger.info(f"Extracted {len(result.get('matches', []))} live matches")
         
         debug_info = result.get('debug', {})
         if debug_info:
             self.logger.debug(f"Debug: {debug_info.get('page_elements_found', 0)} fixtures found")
+            self.selector_store.record_script_stats(sport_code, debug_info.get('selector_stats'))
+        self.save_selector_performance()
 
         return result
 
@@ -713,13 +938,11 @@ class UltimateLiveScraper:
             'summary': results.get('summary', {})
         }
 
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        statistics_filename = os.path.join(script_dir, "bet365_statistics.json")
+        statistics_filename = self.statistics_file
 
         try:
-            with open(statistics_filename, 'w', encoding='utf-8') as f:
-                json.dump(output, f, indent=2, ensure_ascii=False)
-            self.logger.info("Results saved successfully")
+            self.persist_document('statistics', statistics_filename, output)
+            self.logger.info("Results queued for writing")
         except Exception as e:
             self.logger.error(f"Failed to save results: {e}")
 
@@ -732,8 +955,7 @@ class UltimateLiveScraper:
         }
 
         try:
-            with open(self.current_data_file, 'w', encoding='utf-8') as f:
-                json.dump(dashboard_data, f, indent=2, ensure_ascii=False)
+            self.persist_document('current', self.current_data_file, dashboard_data)
         except Exception as e:
             self.logger.error(f"Failed to save dashboard data: {e}")
 
@@ -1092,7 +1314,11 @@ async def main():
     print(f"Sports: {', '.join(sport_codes) if sport_codes else 'All'}")
     print("=" * 60)
 
-    await scraper.run_live_extraction(sport_codes)
+    try:
+        await scraper.run_live_extraction(sport_codes)
+    finally:
+        scraper.save_selector_performance(force=True)
+        scraper.write_behind.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+RESIDENT LIVE STATISTICS AGGREGATOR
+In-memory replacement for the per-cycle reload/recompute/rewrite of
+bet365_live_statistics.json.
+
+- URL (sport) and match counters live in memory and are updated from
+  detect_data_changes output, so a cycle costs O(changed matches + sports)
+- Match entries are kept in last-updated order (OrderedDict), so the 24h
+  expiry only touches the entries that actually expire
+- Summary maxima are maintained incrementally
+- The JSON document (same layout as before) is only built when a flush is due
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+
+class LiveStatisticsAggregator:
+    """Incremental URL/match update counters with time-ordered expiry"""
+
+    def __init__(self, retention_hours: float = 24.0, flush_interval: float = 10.0):
+        """
+        Args:
+            retention_hours: drop match entries not updated for this long
+            flush_interval: minimum seconds between statistics document flushes
+        """
+        self.retention_seconds = retention_hours * 3600
+        self.flush_interval = flush_interval
+
+        self.url_tracking: Dict[str, Dict[str, Any]] = {}
+        # match_key -> public entry, ordered oldest update first
+        self.match_updates: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._updated_at: Dict[str, float] = {}
+
+        self.extraction_cycles = 0
+        self.last_updated: Optional[str] = None
+        self._top_match: Optional[str] = None
+        self._top_count = 0
+
+        self.loaded = False
+        self.dirty = False
+        self._last_flush = 0.0
+
+    # ----------------------------- Loading ----------------------------- #
+
+    def load(self, document: Optional[Dict[str, Any]], current_matches: Optional[List[Dict[str, Any]]] = None):
+        """
+        Seed counters from a previously written statistics document (parsed once at startup).
+        Per-sport current counts are rebuilt from the scraper's recovered current matches,
+        since only changes against that state are fed in afterwards.
+        """
+        self.loaded = True
+        if document:
+            self._load_document(document)
+
+        timestamp = datetime.now().isoformat()
+        for url_stats in self.url_tracking.values():
+            url_stats['current_matches'] = 0
+        for match in current_matches or []:
+            if isinstance(match, dict):
+                self._url(match, timestamp)['current_matches'] += 1
+
+    def _load_document(self, document: Dict[str, Any]):
+        self.extraction_cycles = document.get('extraction_cycles', 0)
+        self.last_updated = document.get('last_updated')
+        self.url_tracking = dict(document.get('url_tracking', {}))
+
+        entries = []
+        for match_key, entry in document.get('match_updates', {}).items():
+            try:
+                updated_at = datetime.fromisoformat(entry['last_updated']).timestamp()
+            except Exception:
+                continue
+            entries.append((updated_at, match_key, entry))
+
+        for updated_at, match_key, entry in sorted(entries, key=lambda e: e[0]):
+            self.match_updates[match_key] = entry
+            self._updated_at[match_key] = updated_at
+            if entry.get('update_count', 0) > self._top_count:
+                self._top_match, self._top_count = match_key, entry.get('update_count', 0)
+
+        self.expire()
+
+    # ----------------------------- Updating ----------------------------- #
+
+    @staticmethod
+    def url_key(match: Dict[str, Any]) -> str:
+        sport_code = match.get('sport_code', match.get('code', 'unknown'))
+        return f"{sport_code}_{match.get('sport', 'unknown')}"
+
+    @staticmethod
+    def match_key(match: Dict[str, Any]) -> Optional[str]:
+        teams = match.get('teams', {})
+        home_team = teams.get('home', '').strip()
+        away_team = teams.get('away', '').strip()
+        if not home_team or not away_team:
+            return None
+        sport_code = match.get('sport_code', match.get('code', 'unknown'))
+        return f"{sport_code}|{home_team} vs {away_team}"
+
+    def record_cycle(self, changes: Dict[str, List]):
+        """Apply one cycle of detect_data_changes output"""
+        now = time.time()
+        timestamp = datetime.now().isoformat()
+        self.extraction_cycles += 1
+        self.last_updated = timestamp
+
+        for match in changes.get('new', []):
+            if isinstance(match, dict):
+                self._url(match, timestamp)['current_matches'] += 1
+                self._touch(match, now, timestamp)
+
+        for update in changes.get('updated', []):
+            self._touch(update['new_data'], now, timestamp)
+
+        for match in changes.get('removed', []):
+            if not isinstance(match, dict):
+                continue
+            url_stats = self.url_tracking.get(self.url_key(match))
+            if url_stats:
+                url_stats['current_matches'] = max(0, url_stats['current_matches'] - 1)
+            entry = self.match_updates.get(self.match_key(match) or '')
+            if entry:
+                entry['is_live'] = False
+
+        # Per-sport cycle counters - proportional to the number of sports, not matches
+        for url_stats in self.url_tracking.values():
+            if url_stats['current_matches'] > 0:
+                url_stats['update_cycles'] += 1
+                url_stats['last_seen'] = timestamp
+                url_stats['total_matches_ever'] = max(url_stats['total_matches_ever'], url_stats['current_matches'])
+
+        self.expire(now)
+        self.dirty = True
+
+    def _url(self, match: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+        url_key = self.url_key(match)
+        url_stats = self.url_tracking.get(url_key)
+        if url_stats is None:
+            url_stats = {
+                'sport_code': match.get('sport_code', match.get('code', 'unknown')),
+                'sport_name': match.get('sport', 'unknown'),
+                'total_matches_ever': 0,
+                'current_matches': 0,
+                'update_cycles': 0,
+                'last_seen': None,
+                'first_seen': timestamp
+            }
+            self.url_tracking[url_key] = url_stats
+        return url_stats
+
+    def _touch(self, match: Dict[str, Any], now: float, timestamp: str):
+        """Count an update for one match and move it to the newest end of the expiry order"""
+        match_key = self.match_key(match)
+        if match_key is None:
+            return
+
+        entry = self.match_updates.get(match_key)
+        if entry is None:
+            teams = match.get('teams', {})
+            entry = {
+                'sport_code': match.get('sport_code', match.get('code', 'unknown')),
+                'home_team': teams.get('home', '').strip(),
+                'away_team': teams.get('away', '').strip(),
+                'update_count': 0,
+                'first_seen': timestamp,
+                'last_updated': timestamp,
+                'has_odds': False,
+                'is_live': False
+            }
+            self.match_updates[match_key] = entry
+        else:
+            self.match_updates.move_to_end(match_key)
+
+        entry['update_count'] += 1
+        entry['last_updated'] = timestamp
+        entry['has_odds'] = match.get('has_odds', False)
+        entry['is_live'] = match.get('live_fields', {}).get('is_live', False)
+        self._updated_at[match_key] = now
+
+        if entry['update_count'] > self._top_count:
+            self._top_match, self._top_count = match_key, entry['update_count']
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Drop match entries older than the retention window, oldest first"""
+        cutoff = (now or time.time()) - self.retention_seconds
+        expired = 0
+        while self.match_updates:
+            match_key = next(iter(self.match_updates))
+            if self._updated_at.get(match_key, 0) >= cutoff:
+                break
+            self.match_updates.popitem(last=False)
+            self._updated_at.pop(match_key, None)
+            expired += 1
+            if match_key == self._top_match:
+                self._top_match, self._top_count = None, 0
+
+        if expired and self._top_match is None and self.match_updates:
+            # Rare: the most-updated match expired - rescan once
+            self._top_match, entry = max(self.match_updates.items(), key=lambda x: x[1]['update_count'])
+            self._top_count = entry['update_count']
+        return expired
+
+    # ----------------------------- Flushing ----------------------------- #
+
+    def should_flush(self) -> bool:
+        return self.dirty and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def to_document(self) -> Dict[str, Any]:
+        """Build the bet365_live_statistics.json document and mark the aggregator clean"""
+        self.dirty = False
+        self._last_flush = time.monotonic()
+
+        most_active_url = max(self.url_tracking.items(),
+                              key=lambda x: x[1]['update_cycles'])[0] if self.url_tracking else None
+        return {
+            'url_tracking': self.url_tracking,
+            'match_updates': dict(self.match_updates),
+            'extraction_cycles': self.extraction_cycles,
+            'last_updated': self.last_updated,
+            'summary': {
+                'total_urls_tracked': len(self.url_tracking),
+                'total_matches_tracked': len(self.match_updates),
+                'extraction_cycles': self.extraction_cycles,
+                'most_active_url': most_active_url,
+                'most_updated_match': self._top_match,
+                'urls_with_matches': sum(1 for u in self.url_tracking.values() if u['current_matches'] > 0),
+                'total_current_matches': sum(u['current_matches'] for u in self.url_tracking.values())
+            }
+        }
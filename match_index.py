@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+IN-MEMORY SECONDARY INDEXES FOR DASHBOARD MATCH QUERIES
+Answers filtered /api/live-matches requests without scanning every match.
+
+- Postings (value -> set of match ids) for sport, sport_code, league,
+  is_live and has_odds; string values are matched case-insensitively
+- Maintained incrementally from each hub reload's diff: only inserted,
+  updated and removed matches touch the index
+- Match ids are kept sorted, so pagination is keyset-based: the cursor is
+  the last id returned (opaque, base64), stable while matches come and go
+"""
+
+import base64
+import binascii
+import bisect
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+INDEXED_FIELDS = ('sport', 'sport_code', 'league', 'is_live', 'has_odds')
+
+
+def normalize(value: Any) -> Any:
+    if isinstance(value, bool):
+        return value
+    return str(value if value is not None else '').strip().lower()
+
+
+def index_values(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Indexed field values of a transformed (frontend) match"""
+    return {
+        'sport': normalize(match.get('sport')),
+        'sport_code': normalize(match.get('sport_code')),
+        'league': normalize(match.get('league')),
+        'is_live': bool((match.get('live_fields') or {}).get('is_live')),
+        'has_odds': bool(match.get('odds') or match.get('markets'))
+    }
+
+
+def project(match: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Subset of a match's top-level fields (the id is always kept)"""
+    if not fields:
+        return match
+    return {key: match[key] for key in ['id', *fields] if key in match}
+
+
+def encode_cursor(match_id: str) -> str:
+    return base64.urlsafe_b64encode(match_id.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> str:
+    """Match id inside a cursor (ValueError if it is not one of ours)"""
+    try:
+        return base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+    except (binascii.Error, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class MatchIndex:
+    """Secondary indexes and sorted id list over the hub's current matches"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        self.values: Dict[str, Dict[str, Any]] = {}
+        self.ordered: List[str] = []
+        self.updates = 0
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    # ----------------------------- Maintenance ----------------------------- #
+
+    def apply(self, by_id: Dict[str, Dict[str, Any]], inserted: Iterable[str],
+              updated: Iterable[str], removed: Iterable[str]):
+        """Apply a snapshot diff (ids) - by_id holds the new snapshot's matches"""
+        for match_id in removed:
+            self._remove(match_id)
+        for match_id in updated:
+            self._remove(match_id)
+            self._add(match_id, by_id[match_id])
+        for match_id in inserted:
+            self._add(match_id, by_id[match_id])
+        self.updates += 1
+
+    def _add(self, match_id: str, match: Dict[str, Any]):
+        values = index_values(match)
+        self.values[match_id] = values
+        for field, value in values.items():
+            self.postings[field].setdefault(value, set()).add(match_id)
+        position = bisect.bisect_left(self.ordered, match_id)
+        if position == len(self.ordered) or self.ordered[position] != match_id:
+            self.ordered.insert(position, match_id)
+
+    def _remove(self, match_id: str):
+        values = self.values.pop(match_id, None)
+        if values is None:
+            return
+        for field, value in values.items():
+            ids = self.postings[field].get(value)
+            if ids is not None:
+                ids.discard(match_id)
+                if not ids:
+                    del self.postings[field][value]
+        position = bisect.bisect_left(self.ordered, match_id)
+        if position < len(self.ordered) and self.ordered[position] == match_id:
+            del self.ordered[position]
+
+    # ----------------------------- Queries ----------------------------- #
+
+    def matching(self, filters: Dict[str, List[Any]]) -> Optional[Set[str]]:
+        """Ids matching every field filter (any of its values); None means no filter"""
+        result: Optional[Set[str]] = None
+        # Smallest candidate sets first keeps the intersections cheap
+        candidates = []
+        for field, wanted in filters.items():
+            ids = set()
+            for value in wanted:
+                ids |= self.postings[field].get(normalize(value), set())
+            candidates.append(ids)
+        for ids in sorted(candidates, key=len):
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
+
+    def query(self, filters: Dict[str, List[Any]], cursor: Optional[str] = None,
+              limit: Optional[int] = None) -> Tuple[List[str], Optional[str], int]:
+        """
+        Ids of one page of matches, in id order.
+
+        Returns:
+            (ids, next_cursor or None, total number of matches for the filters)
+        """
+        selected = self.matching(filters)
+        ordered = self.ordered if selected is None else sorted(selected)
+        start = 0
+        if cursor:
+            start = bisect.bisect_right(ordered, decode_cursor(cursor))
+
+        end = len(ordered) if limit is None else min(len(ordered), start + limit)
+        page = ordered[start:end]
+        next_cursor = encode_cursor(page[-1]) if page and end < len(ordered) else None
+        return page, next_cursor, len(ordered)
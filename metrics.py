@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+PROCESS-WIDE METRICS REGISTRY (PROMETHEUS TEXT FORMAT)
+Counters, gauges and histograms shared by the live scraper, the pregame
+real-time monitor and the dashboard, exposed by the dashboard at /metrics.
+
+- Hot-path updates take no lock: every thread writes its own shard of each
+  metric (one list per thread, created once), and a scrape adds the shards
+  up. inc()/observe() are a bisect and a couple of list increments
+- Gauges can be callbacks (queue depths, connected clients), evaluated only
+  when /metrics is scraped
+- Another process's metrics (the scraper, over the event bus) are attached
+  with set_remote() and rendered with a process="<name>" label
+- render() produces the text exposition format (version 0.0.4)
+"""
+
+import bisect
+import math
+import statistics
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds - extraction, cycle and write timings
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes - evaluate() payloads and messages
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def summarize_latencies(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/max/mean of a list of durations in seconds, reported in milliseconds"""
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'max': 0.0, 'mean': 0.0}
+
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        'p50': round(statistics.median(ordered) * 1000, 3),
+        'p95': round(ordered[p95_index] * 1000, 3),
+        'max': round(ordered[-1] * 1000, 3),
+        'mean': round(statistics.fmean(ordered) * 1000, 3)
+    }
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class _Sharded:
+    """Per-thread list of float cells; only the owning thread writes its list"""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()  # only taken when a thread writes for the first time
+
+    def shard(self) -> List[float]:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = [0.0] * self._size
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def totals(self) -> List[float]:
+        totals = [0.0] * self._size
+        for shard in list(self._shards):
+            for index, value in enumerate(shard):
+                totals[index] += value
+        return totals
+
+
+class Counter:
+    """Monotonically increasing value"""
+
+    def __init__(self):
+        self._cells = _Sharded(1)
+
+    def inc(self, amount: float = 1.0):
+        self._cells.shard()[0] += amount
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        return [(f'{name}_total', labels, self._cells.totals()[0])]
+
+
+class Gauge:
+    """Value that can go up and down, or a callback evaluated at scrape time"""
+
+    def __init__(self, func: Optional[Callable[[], float]] = None):
+        self.func = func
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        if self.func is None:
+            return [(name, labels, self.value)]
+        try:
+            return [(name, labels, float(self.func()))]
+        except Exception:
+            return []
+
+
+class Histogram:
+    """Cumulative-bucket histogram (bucket counts, sum and count per thread shard)"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(buckets))
+        # one cell per bound, +Inf, then sum and count
+        self._cells = _Sharded(len(self.bounds) + 3)
+
+    def observe(self, value: float):
+        shard = self._cells.shard()
+        shard[bisect.bisect_left(self.bounds, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Sample]:
+        totals = self._cells.totals()
+        samples, cumulative = [], 0.0
+        for bound, count in zip(self.bounds + (math.inf,), totals):
+            cumulative += count
+            samples.append((f'{name}_bucket', dict(labels, le=_format_value(float(bound))), cumulative))
+        samples.append((f'{name}_sum', labels, totals[-2]))
+        samples.append((f'{name}_count', labels, totals[-1]))
+        return samples
+
+
+class MetricFamily:
+    """A named metric and its children, one per label value combination"""
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Sequence[str],
+                 factory: Callable[[], Any]):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = factory()
+
+    def labels(self, *values: Any, **kwargs: Any):
+        """Child for one label combination (created on first use)"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    # Unlabelled shortcuts
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def collect(self) -> Dict[str, Any]:
+        samples = []
+        for key, child in list(self._children.items()):
+            samples.extend(child.samples(self.name, dict(zip(self.labelnames, key))))
+        return {'name': self.name, 'help': self.help, 'type': self.kind, 'samples': samples}
+
+
+class MetricsRegistry:
+    """Named metric families of this process, plus families received from other processes"""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._remote: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, help_text: str, kind: str, labelnames: Sequence[str],
+                  factory: Callable[[], Any]) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help_text, kind, labelnames, factory)
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name} already registered as a {family.kind}")
+            return family
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(name, help_text, 'counter', labelnames, Counter)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+              func: Optional[Callable[[], float]] = None) -> MetricFamily:
+        """Gauge; with func (unlabelled only) its value is read at scrape time"""
+        family = self._register(name, help_text, 'gauge', labelnames, Gauge)
+        if func is not None:
+            family.labels().func = func
+        return family
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> MetricFamily:
+        return self._register(name, help_text, 'histogram', labelnames, lambda: Histogram(buckets))
+
+    def collect(self) -> List[Dict[str, Any]]:
+        """Families of this process as plain data (sent over the event bus)"""
+        return [family.collect() for family in list(self._families.values())]
+
+    def set_remote(self, process: str, families: Iterable[Dict[str, Any]]):
+        """Replace the latest families reported by another process"""
+        self._remote[process] = list(families)
+
+    def render(self) -> str:
+        """Text exposition format of local and remote families"""
+        merged: Dict[str, Dict[str, Any]] = {}
+        sources = [(None, self.collect())] + list(self._remote.items())
+        for process, families in sources:
+            for family in families:
+                entry = merged.setdefault(family['name'], {'help': family['help'], 'type': family['type'],
+                                                           'samples': []})
+                for sample_name, labels, value in family['samples']:
+                    if process is not None:
+                        labels = dict(labels, process=process)
+                    entry['samples'].append((sample_name, labels, value))
+
+        lines = []
+        for name, entry in merged.items():
+            lines.append(f"# HELP {name} {_escape(entry['help'])}")
+            lines.append(f"# TYPE {name} {entry['type']}")
+            for sample_name, labels, value in entry['samples']:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(float(value))}")
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by every module of a process
+REGISTRY = MetricsRegistry()
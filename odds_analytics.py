@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+VECTORIZED ODDS ANALYTICS STAGE
+Runs once per live extraction cycle over every current price at once.
+
+For all live matches the stage:
+- Flattens every market selection into NumPy arrays (one row per price)
+- Reads decimal odds from the typed 'parsed_odds' form (see odds_values.py)
+- Computes implied probabilities and bookmaker margin (overround) per market
+- Computes per-tick movement against the previous cycle's price for the same
+  match/market/selection
+
+Results are attached to each match under 'analytics' and a cycle summary is
+returned for logging and the dashboard broadcast.
+"""
+
+import logging
+from typing import Dict, List, Any, Tuple, Optional
+
+import numpy as np
+
+from odds_values import attach_parsed_odds
+
+logger = logging.getLogger(__name__)
+
+
+class OddsAnalytics:
+    """Per-cycle vectorized implied probability, margin and movement calculator"""
+
+    def __init__(self):
+        # Stable slot per (match_key, market, selection) so previous prices live in one array
+        self._slot_index: Dict[Tuple[str, str, str], int] = {}
+        self._previous_decimal = np.full(1024, np.nan, dtype=np.float64)
+        self._free_slots: List[int] = []
+        self._next_slot = 0
+        self.cycles_run = 0
+
+    def _slots_for(self, keys: List[Tuple[str, str, str]]) -> np.ndarray:
+        slots = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            slot = self._slot_index.get(key)
+            if slot is None:
+                if self._free_slots:
+                    slot = self._free_slots.pop()
+                else:
+                    slot = self._next_slot
+                    self._next_slot += 1
+                self._slot_index[key] = slot
+            slots[i] = slot
+
+        needed = self._next_slot
+        if needed > len(self._previous_decimal):
+            grown = np.full(max(needed, 2 * len(self._previous_decimal)), np.nan, dtype=np.float64)
+            grown[:len(self._previous_decimal)] = self._previous_decimal
+            self._previous_decimal = grown
+        return slots
+
+    def forget(self, match_keys):
+        """Drop stored prices for matches that have been finalized as removed"""
+        match_keys = set(match_keys)
+        if not match_keys:
+            return
+        for key in [k for k in self._slot_index if k[0] in match_keys]:
+            slot = self._slot_index.pop(key)
+            self._previous_decimal[slot] = np.nan
+            self._free_slots.append(slot)
+
+    def run_cycle(self, matches: List[Dict[str, Any]], key_func) -> Dict[str, Any]:
+        """
+        Compute analytics for every match in one pass and attach them under 'analytics'.
+
+        Args:
+            matches: deduplicated live matches for this cycle
+            key_func: match key function (generate_match_key) used to track movement
+
+        Returns:
+            Cycle summary for logging and the dashboard
+        """
+        match_index: List[int] = []
+        market_names: List[str] = []
+        selections: List[str] = []
+        slot_keys: List[Tuple[str, str, str]] = []
+        raw_decimal: List[float] = []
+
+        for i, match in enumerate(matches):
+            if not isinstance(match, dict):
+                continue
+            match_key = key_func(match)
+            # Prices are parsed once at ingestion; only parse here for matches that skipped it
+            parsed_odds = match.get('parsed_odds')
+            if parsed_odds is None:
+                parsed_odds = attach_parsed_odds(match)
+            for market_name, market in parsed_odds.items():
+                for selection, value in market.items():
+                    decimal_odds = value.get('decimal')
+                    match_index.append(i)
+                    market_names.append(market_name)
+                    selections.append(selection)
+                    slot_keys.append((match_key, market_name, selection))
+                    raw_decimal.append(np.nan if decimal_odds is None else decimal_odds)
+
+        self.cycles_run += 1
+        if not raw_decimal:
+            return {'prices': 0, 'markets': 0, 'moved': 0, 'matches_moved': 0, 'avg_margin_pct': None}
+
+        decimal = np.asarray(raw_decimal, dtype=np.float64)
+        match_idx = np.asarray(match_index, dtype=np.int64)
+
+        valid = ~np.isnan(decimal)
+        implied = np.where(valid, 1.0 / np.where(valid, decimal, 1.0), np.nan)
+
+        # Group rows into (match, market) buckets and sum implied probabilities per bucket
+        bucket_labels = [f"{m}\x00{name}" for m, name in zip(match_index, market_names)]
+        bucket_keys, bucket_ids = np.unique(np.asarray(bucket_labels), return_inverse=True)
+        bucket_sum = np.bincount(bucket_ids, weights=np.where(valid, implied, 0.0), minlength=len(bucket_keys))
+        bucket_count = np.bincount(bucket_ids, weights=valid.astype(np.float64), minlength=len(bucket_keys))
+        has_book = bucket_count >= 2
+        overround = np.where(has_book, bucket_sum, np.nan)
+
+        # Movement against the previous cycle's price for the same selection
+        slots = self._slots_for(slot_keys)
+        previous = self._previous_decimal[slots]
+        with np.errstate(invalid='ignore'):
+            price_change = decimal - previous
+            prob_change = implied - np.where(np.isnan(previous), np.nan, 1.0 / previous)
+        moved = valid & ~np.isnan(previous) & (np.abs(price_change) > 1e-9)
+        self._previous_decimal[slots] = np.where(valid, decimal, self._previous_decimal[slots])
+
+        # Attach per-match results - round in NumPy, then hand plain Python floats to the dicts
+        decimal_out = _to_list(decimal, 4)
+        implied_out = _to_list(implied, 4)
+        price_change_out = _to_list(price_change, 4)
+        prob_change_out = _to_list(prob_change, 4)
+        overround_out = _to_list(overround, 4)
+        margin_out = _to_list((overround - 1.0) * 100.0, 2)
+
+        attached: Dict[int, Dict[str, Any]] = {}
+        bucket_list = bucket_ids.tolist()
+        for row, i in enumerate(match_index):
+            market_name = market_names[row]
+            analytics = attached.setdefault(i, {'markets': {}})
+            market = analytics['markets'].get(market_name)
+            if market is None:
+                bucket = bucket_list[row]
+                market = {
+                    'overround': overround_out[bucket],
+                    'margin_pct': margin_out[bucket],
+                    'selections': {}
+                }
+                analytics['markets'][market_name] = market
+            market['selections'][selections[row]] = {
+                'decimal': decimal_out[row],
+                'implied_prob': implied_out[row],
+                'price_change': price_change_out[row],
+                'prob_change': prob_change_out[row]
+            }
+
+        moved_per_match = np.bincount(match_idx, weights=moved.astype(np.float64), minlength=len(matches))
+        for i, analytics in attached.items():
+            analytics['moved'] = bool(moved_per_match[i] > 0)
+            matches[i]['analytics'] = analytics
+
+        margins = (overround[has_book] - 1.0) * 100.0
+        return {
+            'prices': int(valid.sum()),
+            'markets': int(has_book.sum()),
+            'moved': int(moved.sum()),
+            'matches_moved': int((moved_per_match > 0).sum()),
+            'avg_margin_pct': _as_float(margins.mean(), 2) if margins.size else None
+        }
+
+
+def _to_list(values: np.ndarray, digits: int) -> List[Optional[float]]:
+    """Round an array and convert it to a list of Python floats, mapping NaN to None"""
+    return [v if v == v else None for v in np.round(values, digits).tolist()]
+
+
+def _as_float(value, digits: int) -> Optional[float]:
+    """Round a NumPy scalar to a Python float, mapping NaN to None"""
+    value = float(value)
+    if value != value:
+        return None
+    return round(value, digits)
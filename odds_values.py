@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+TYPED ODDS VALUES - PARSED ONCE AT INGESTION
+Odds arrive from the page as strings in several shapes:
+- "+150", "-110", "1.85", "5/4", "EVS"        (price only)
+- "O 210.5 -110", "U 210.5 -110"               (total with line)
+- "-1.5 (+120)", "-1.5 +120"                   (spread with line)
+- {'line': '210.5', 'odds': '-110'}            (live markets selection)
+
+parse_odds() turns any of these into an OddsValue exactly once; repeated
+strings are served from an LRU cache. attach_parsed_odds() stores the
+parsed form on a match under 'parsed_odds' so the dashboard and the
+analytics stage never re-parse price strings:
+
+    {'moneyline': {'home': {'price': 150.0, 'line': None, 'format': 'american',
+                            'decimal': 2.5, 'display': '+150'}, ...}, ...}
+"""
+
+from functools import lru_cache
+from typing import Dict, Any, NamedTuple, Optional
+
+FORMAT_INVALID = 'invalid'
+FORMAT_AMERICAN = 'american'
+FORMAT_DECIMAL = 'decimal'
+FORMAT_FRACTIONAL = 'fractional'
+
+EVEN_MONEY_TOKENS = {'EVS', 'EVEN', 'EVENS', 'EV'}
+TOTAL_PREFIXES = {'O': 'O', 'OVER': 'O', 'U': 'U', 'UNDER': 'U'}
+
+# Selection names for list-shaped odds (pregame GameOdds, legacy live 'odds')
+LIST_SELECTIONS = {'total': ('over', 'under')}
+DEFAULT_LIST_SELECTIONS = ('home', 'away')
+FLAT_SELECTIONS = ('home', 'away', 'tie', 'draw')
+
+
+class OddsValue(NamedTuple):
+    """A single parsed price with its optional handicap/total line"""
+    price: Optional[float]      # numeric price as quoted (+150 -> 150.0, "1.85" -> 1.85)
+    line: Optional[float]       # handicap or total line, if any
+    format: str                 # american / decimal / fractional / invalid
+    decimal: Optional[float]    # decimal odds (None when the price is not usable)
+    display: str                # normalized text for UI display
+
+    @property
+    def is_valid(self) -> bool:
+        return self.decimal is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'price': self.price,
+            'line': self.line,
+            'format': self.format,
+            'decimal': self.decimal,
+            'display': self.display
+        }
+
+
+INVALID_ODDS = OddsValue(None, None, FORMAT_INVALID, None, '')
+
+
+def _to_float(text: str) -> Optional[float]:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_price(token: str):
+    """Parse a single price token into (price, format, decimal)"""
+    if token.upper() in EVEN_MONEY_TOKENS:
+        return 2.0, FORMAT_DECIMAL, 2.0
+
+    try:
+        if '/' in token:
+            numerator, denominator = token.split('/', 1)
+            decimal = 1.0 + float(numerator) / float(denominator)
+            return decimal, FORMAT_FRACTIONAL, (decimal if decimal > 1.0 else None)
+
+        value = float(token)
+    except (ValueError, ZeroDivisionError):
+        return None, FORMAT_INVALID, None
+
+    # Signed or 3+ digit prices are American; American prices are never inside (-100, 100)
+    if token[0] in '+-' or abs(value) >= 100:
+        if value >= 100:
+            return value, FORMAT_AMERICAN, round(1.0 + value / 100.0, 6)
+        if value <= -100:
+            return value, FORMAT_AMERICAN, round(1.0 + 100.0 / abs(value), 6)
+        return value, FORMAT_INVALID, None
+
+    return value, FORMAT_DECIMAL, (value if value > 1.0 else None)
+
+
+@lru_cache(maxsize=16384)
+def parse_odds_text(text: str) -> OddsValue:
+    """Parse a raw odds string (cached - the same strings repeat every cycle)"""
+    display = text.strip()
+    tokens = display.replace('(', ' ').replace(')', ' ').split()
+    if not tokens:
+        return INVALID_ODDS
+
+    prefix = TOTAL_PREFIXES.get(tokens[0].upper())
+    if prefix:
+        tokens = tokens[1:]
+    elif tokens[0][0] in 'OoUu' and _to_float(tokens[0][1:]) is not None:
+        # "O210.5 -110" - prefix glued to the line
+        tokens = [tokens[0][1:]] + tokens[1:]
+
+    if not tokens:
+        return OddsValue(None, None, FORMAT_INVALID, None, display)
+
+    line = None
+    if len(tokens) >= 2:
+        line = _to_float(tokens[-2])
+    elif prefix:
+        # "O 210.5" - a total line without a price
+        return OddsValue(None, _to_float(tokens[0]), FORMAT_INVALID, None, display)
+
+    price, fmt, decimal = _parse_price(tokens[-1])
+    return OddsValue(price, line, fmt, decimal, display)
+
+
+def _split_total_prefix(line_text: str):
+    """Split an O/U marker off a scraped line ("O 210.5", "O210.5", "Over 210.5") -> (prefix, line)"""
+    tokens = line_text.split(None, 1)
+    if tokens:
+        prefix = TOTAL_PREFIXES.get(tokens[0].upper())
+        if prefix:
+            return prefix, tokens[1].strip() if len(tokens) > 1 else ''
+        if tokens[0][0] in 'OoUu' and _to_float(tokens[0][1:]) is not None:
+            return tokens[0][0].upper(), line_text[1:].strip()
+    return '', line_text
+
+
+@lru_cache(maxsize=16384)
+def _parse_selection(odds_text: str, line_text: str, prefix: str) -> OddsValue:
+    """Parse a live {'line', 'odds'} selection (cached on its string parts)"""
+    parsed = parse_odds_text(odds_text)
+    # A line that already carries its O/U marker keeps it instead of gaining a second one
+    own_prefix, line_value = _split_total_prefix(line_text)
+    line = _to_float(line_value) if line_value else None
+    if line is None:
+        line = parsed.line
+    display = ' '.join(part for part in ((own_prefix or prefix) if line_text else '', line_value,
+                                         odds_text.strip()) if part)
+    return parsed._replace(line=line, display=display)
+
+
+def parse_odds(raw: Any, selection: str = '') -> OddsValue:
+    """
+    Parse any supported odds shape into an OddsValue.
+
+    Args:
+        raw: price string, number, or {'line', 'odds'} dict
+        selection: selection name ('over'/'under' add the O/U prefix to display)
+    """
+    if raw is None:
+        return INVALID_ODDS
+
+    if isinstance(raw, dict):
+        odds_text = raw.get('odds')
+        line_text = raw.get('line')
+        prefix = TOTAL_PREFIXES.get(selection.upper(), '')
+        return _parse_selection('' if odds_text is None else str(odds_text),
+                                '' if line_text is None else str(line_text).strip(), prefix)
+
+    if isinstance(raw, bool):
+        return INVALID_ODDS
+    if isinstance(raw, (int, float)):
+        value = float(raw)
+        if 1.0 < value < 100.0:
+            return OddsValue(value, None, FORMAT_DECIMAL, value, str(raw))
+        return parse_odds_text(f"{value:+g}")._replace(display=str(raw))
+
+    return parse_odds_text(str(raw))
+
+
+def parse_market(market_name: str, market: Any) -> Dict[str, Dict[str, Any]]:
+    """Parse one market (dict of selections or list of prices) into {selection: parsed}"""
+    if isinstance(market, dict):
+        return {str(selection): parse_odds(value, str(selection)).to_dict()
+                for selection, value in market.items()}
+
+    if isinstance(market, list):
+        names = LIST_SELECTIONS.get(market_name, DEFAULT_LIST_SELECTIONS)
+        return {(names[i] if i < len(names) else str(i)): parse_odds(value).to_dict()
+                for i, value in enumerate(market)}
+
+    return {}
+
+
+def parse_match_odds(match: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """
+    Build the parsed odds for a live or pregame match.
+
+    Live 'markets' ({market: {selection: {line, odds}}}) take precedence; otherwise
+    the legacy/pregame 'odds' field is used ({market: [..]}, {market: {..}} or the
+    flat {'home': '+150', 'away': '-170'} moneyline layout).
+    """
+    parsed: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+    markets = match.get('markets')
+    if isinstance(markets, dict) and markets:
+        for market_name, market in markets.items():
+            selections = parse_market(market_name, market)
+            if selections:
+                parsed[market_name] = selections
+        return parsed
+
+    odds = match.get('odds')
+    if not isinstance(odds, dict):
+        return parsed
+
+    for market_name, market in odds.items():
+        if isinstance(market, (dict, list)):
+            selections = parse_market(market_name, market)
+            if selections:
+                parsed[market_name] = selections
+        elif market_name in FLAT_SELECTIONS and market not in (None, ''):
+            parsed.setdefault('moneyline', {})[market_name] = parse_odds(market).to_dict()
+
+    return parsed
+
+
+def attach_parsed_odds(match: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Parse a match's odds and store them under 'parsed_odds'"""
+    parsed = parse_match_odds(match)
+    match['parsed_odds'] = parsed
+    return parsed
+
+
+def parse_cache_info() -> Dict[str, int]:
+    """Hit/miss counters for the string parse caches"""
+    text_info = parse_odds_text.cache_info()
+    selection_info = _parse_selection.cache_info()
+    return {
+        'hits': text_info.hits + selection_info.hits,
+        'misses': text_info.misses + selection_info.misses,
+        'size': text_info.currsize + selection_info.currsize
+    }
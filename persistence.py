@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+OFF-LOOP PERSISTENCE SERVICE FOR LIVE DATA FILES
+Moves JSON serialization and file I/O for the live writers
+(bet365_live_current.json, bet365_live_history.json, bet365_statistics.json,
+bet365_live_statistics.json) off the asyncio event loop.
+
+- submit() takes a frozen snapshot of the document on the caller's thread
+  and hands it to a single writer thread (writes to a file stay in order)
+- The writer serializes with orjson and publishes atomically through
+  SnapshotPublisher (temp file + os.replace, generation sidecar <file>.gen)
+- metrics() reports queue depth, queue wait and write latency percentiles
+
+WriteBehindScheduler sits in front of the service: writers mark a document
+dirty with its latest contents and each document is written at most once per
+flush window, so the several rewrites of bet365_live_current.json in one
+monitoring cycle collapse into one and the dashboard never reads a
+half-processed cycle.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple, Callable
+
+from metrics import REGISTRY, SIZE_BUCKETS, summarize_latencies
+from snapshot_publisher import SnapshotPublisher
+
+LATENCY_WINDOW = 1000
+
+WRITE_QUEUE_SECONDS = REGISTRY.histogram('bet365_write_queue_seconds',
+                                         'Time a data file write waited for the writer thread')
+WRITE_SECONDS = REGISTRY.histogram('bet365_write_seconds', 'Data file serialize + atomic write time')
+WRITE_BYTES = REGISTRY.histogram('bet365_write_bytes', 'Serialized data file size', buckets=SIZE_BUCKETS)
+
+# Every live writer in the process; the queue-depth gauge sums them at scrape time
+_SERVICES = weakref.WeakSet()
+REGISTRY.gauge('bet365_write_queue_depth', 'Writes queued for the writer thread',
+               func=lambda: sum(len(service._pending) for service in list(_SERVICES)))
+
+
+def freeze_document(document: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Snapshot a document for the writer thread.
+
+    The live pipeline replaces nested values (markets, analytics, parsed_odds,
+    scores) instead of mutating them in place, so copying the top level and one
+    level of list/dict containers is enough to make the snapshot immutable from
+    the writer's point of view - without paying for a deepcopy on the loop.
+    """
+    frozen = {}
+    for key, value in document.items():
+        if isinstance(value, list):
+            frozen[key] = [dict(item) if isinstance(item, dict) else item for item in value]
+        elif isinstance(value, dict):
+            frozen[key] = {k: (dict(v) if isinstance(v, dict) else v) for k, v in value.items()}
+        else:
+            frozen[key] = value
+    return frozen
+
+
+class PersistenceService:
+    """Single writer thread that serializes snapshots (orjson/msgpack) and writes them atomically"""
+
+    def __init__(self, indent: bool = True, fsync: bool = False, logger: Optional[logging.Logger] = None,
+                 codec: Optional[str] = None):
+        """
+        Args:
+            indent: keep the 2-space indented layout of the existing files (when no codec is given)
+            fsync: fsync each temp file before the rename (durability over throughput)
+            logger: logger for write errors
+            codec: serialization codec name (serialization.CODEC_CHOICES)
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.publisher = SnapshotPublisher(codec=codec, indent=indent, fsync=fsync, logger=self.logger)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='live-writer')
+        self._lock = threading.Lock()
+        self._pending: Dict[Future, str] = {}
+        self._closed = False
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes_written = 0
+        self.max_queue_depth = 0
+        self.queue_wait = deque(maxlen=LATENCY_WINDOW)
+        self.serialize_time = deque(maxlen=LATENCY_WINDOW)
+        self.write_time = deque(maxlen=LATENCY_WINDOW)
+
+        _SERVICES.add(self)
+
+    # ----------------------------- Writing ----------------------------- #
+
+    def submit(self, path: str, document: Dict[str, Any], frozen: bool = False) -> Optional[Future]:
+        """
+        Queue a document to be written to path. Returns immediately.
+
+        Args:
+            path: destination file
+            document: JSON-serializable dict
+            frozen: set when the caller already built a private copy
+        """
+        if self._closed:
+            self.logger.warning(f"Persistence service closed - dropping write to {path}")
+            return None
+
+        snapshot = document if frozen else freeze_document(document)
+        enqueued = time.perf_counter()
+        future = self._executor.submit(self._write, path, snapshot, enqueued)
+
+        with self._lock:
+            self.submitted += 1
+            self._pending[future] = path
+            self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        future.add_done_callback(self._done)
+        return future
+
+    async def write(self, path: str, document: Dict[str, Any]) -> bool:
+        """Queue a write and wait for it without blocking the event loop"""
+        future = self.submit(path, document)
+        if future is None:
+            return False
+        return await asyncio.wrap_future(future)
+
+    def submit_call(self, func: Callable, *args) -> Optional[Future]:
+        """Run a storage call (e.g. a SQLite transaction) on the writer thread, in order with file writes"""
+        if self._closed:
+            self.logger.warning(f"Persistence service closed - dropping {getattr(func, '__name__', func)}")
+            return None
+
+        future = self._executor.submit(self._call, func, args, time.perf_counter())
+        with self._lock:
+            self.submitted += 1
+            self._pending[future] = getattr(func, '__name__', 'call')
+            self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        future.add_done_callback(self._done)
+        return future
+
+    def _call(self, func: Callable, args: tuple, enqueued: float) -> bool:
+        started = time.perf_counter()
+        self.queue_wait.append(started - enqueued)
+        try:
+            func(*args)
+            self.write_time.append(time.perf_counter() - started)
+            return True
+        except Exception as e:
+            self.logger.error(f"Storage call {getattr(func, '__name__', func)} failed: {e}")
+            return False
+
+    def _write(self, path: str, snapshot: Dict[str, Any], enqueued: float) -> bool:
+        started = time.perf_counter()
+        self.queue_wait.append(started - enqueued)
+
+        try:
+            payload = self.publisher.serialize(snapshot)
+            serialized = time.perf_counter()
+
+            self.publisher.publish_bytes(path, payload)
+
+            finished = time.perf_counter()
+            self.serialize_time.append(serialized - started)
+            self.write_time.append(finished - serialized)
+            self.bytes_written += len(payload)
+            WRITE_QUEUE_SECONDS.observe(started - enqueued)
+            WRITE_SECONDS.observe(finished - started)
+            WRITE_BYTES.observe(len(payload))
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to write {path}: {e}")
+            return False
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.pop(future, None)
+            if future.cancelled() or future.exception() is not None or not future.result():
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    # ----------------------------- Lifecycle ----------------------------- #
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued write has finished (shutdown / tests / replay)"""
+        with self._lock:
+            pending = list(self._pending)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                future.result(timeout=remaining)
+            except Exception:
+                return False
+        return True
+
+    async def drain(self):
+        """Wait for every queued write from async code"""
+        await asyncio.get_event_loop().run_in_executor(None, self.flush)
+
+    def close(self):
+        """Flush outstanding writes and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+
+    # ----------------------------- Metrics ----------------------------- #
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue and latency metrics (milliseconds) for logging and the dashboard"""
+        with self._lock:
+            queue_depth = len(self._pending)
+        return {
+            'queue_depth': queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'bytes_written': self.bytes_written,
+            'queue_wait_ms': summarize_latencies(list(self.queue_wait)),
+            'serialize_ms': summarize_latencies(list(self.serialize_time)),
+            'write_ms': summarize_latencies(list(self.write_time))
+        }
+
+
+class WriteBehindScheduler:
+    """Coalesces repeated writes of the same document into one write per flush window"""
+
+    def __init__(self, persistence: PersistenceService, max_latency: float = 0.25,
+                 max_staleness: float = 2.0, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            persistence: service that performs the actual (off-loop) writes
+            max_latency: quiet period after the last update before a dirty document is written
+            max_staleness: upper bound on how long a change may wait on disk while
+                           updates keep arriving (resets the quiet period)
+        """
+        self.persistence = persistence
+        self.max_latency = max(0.0, max_latency)
+        self.max_staleness = max(self.max_latency, max_staleness)
+        self.logger = logger or logging.getLogger(__name__)
+
+        # key -> (latest document, first dirty time, last update time, sink or None for a file write)
+        self._dirty: Dict[str, Tuple[Dict[str, Any], float, float, Optional[Callable]]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.puts = 0
+        self.writes = 0
+        self.flushes = 0
+        self.per_document: Dict[str, Dict[str, int]] = {}
+
+    def put(self, path: str, document: Dict[str, Any], sink: Optional[Callable] = None):
+        """
+        Mark a document dirty with its latest contents; earlier pending versions are dropped.
+
+        Args:
+            path: file to write, or any unique key when sink is given
+            document: latest contents
+            sink: optional callable(document) run on the writer thread instead of a file write
+        """
+        self.puts += 1
+        counts = self.per_document.setdefault(os.path.basename(path), {'puts': 0, 'writes': 0})
+        counts['puts'] += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (synchronous callers) - nothing to coalesce against, write through
+            self._dirty[path] = (document, time.monotonic(), time.monotonic(), sink)
+            self.flush()
+            return
+
+        now = loop.time()
+        previous = self._dirty.get(path)
+        first_dirty = previous[1] if previous else now
+        self._dirty[path] = (document, first_dirty, now, sink)
+        self._loop = loop
+        self._schedule(loop)
+
+    def _schedule(self, loop: asyncio.AbstractEventLoop):
+        """(Re)arm the flush timer for the earliest document that is due"""
+        due = min(min(last + self.max_latency, first + self.max_staleness)
+                  for _, first, last, _ in self._dirty.values())
+        if self._timer is not None:
+            if self._timer.when() <= due:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(due, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        now = self._loop.time() if self._loop else time.monotonic()
+        due = [path for path, (_, first, last, _) in self._dirty.items()
+               if now >= last + self.max_latency or now >= first + self.max_staleness]
+        self.flush(due)
+        if self._dirty and self._loop:
+            self._schedule(self._loop)
+
+    def flush(self, paths=None):
+        """Hand dirty documents to the writer now (all of them by default)"""
+        paths = list(self._dirty) if paths is None else paths
+        if not paths:
+            return
+        self.flushes += 1
+        for path in paths:
+            entry = self._dirty.pop(path, None)
+            if entry is None:
+                continue
+            document, _, _, sink = entry
+            if sink is not None:
+                self.persistence.submit_call(sink, freeze_document(document))
+            else:
+                self.persistence.submit(path, document)
+            self.writes += 1
+            self.per_document[os.path.basename(path)]['writes'] += 1
+
+        if not self._dirty and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def drain(self):
+        """Flush every dirty document and wait until it is on disk"""
+        self.flush()
+        await self.persistence.drain()
+
+    def close(self):
+        """Flush outstanding documents and stop the writer"""
+        self.flush()
+        self.persistence.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Coalescing counters plus the underlying writer metrics"""
+        return {
+            'puts': self.puts,
+            'writes': self.writes,
+            'coalesced': self.puts - self.writes - len(self._dirty),
+            'dirty': len(self._dirty),
+            'flushes': self.flushes,
+            'documents': {name: dict(counts) for name, counts in self.per_document.items()},
+            'writer': self.persistence.metrics()
+        }
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+RECORD-AND-REPLAY ENGINE FOR THE LIVE PIPELINE
+Captures raw per-tab extraction results (extract_from_tab outputs) into
+gzip-compressed NDJSON and replays them through everything downstream of the
+browser: deduplicate_matches, detect_data_changes, persistence and broadcast.
+
+Recording (from the live scraper):
+    python concurrency_live_bet365.py --mode monitor --record recordings/session.ndjson.gz
+
+Replay (no browser, safe for CI-like Linux hosts):
+    python pipeline_replay.py recordings/session.ndjson.gz --speed max --report replay_report.json
+
+Each recorded line is {"cycle": N, "ts": unix_seconds, "result": {...}}.
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from current_shards import CURRENT_LAYOUTS
+from metrics import summarize_latencies
+from serialization import CODEC_CHOICES
+from sqlite_store import STORAGE_CHOICES
+
+logger = logging.getLogger(__name__)
+
+SPEED_CHOICES = {'1x': 1.0, '10x': 10.0, 'max': 0.0}
+
+
+class ExtractionRecorder:
+    """Appends per-tab extraction results to a compressed NDJSON recording"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Append mode produces a multi-member gzip stream, which gzip.open reads transparently
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self.cycle = 0
+        self.records_written = 0
+
+    def begin_cycle(self):
+        """Start a new extraction cycle; subsequent results are tagged with it"""
+        self.cycle += 1
+
+    def record_result(self, result: Dict[str, Any]):
+        """Write one extract_from_tab result with its capture timestamp"""
+        try:
+            line = json.dumps({'cycle': self.cycle, 'ts': time.time(), 'result': result},
+                              ensure_ascii=False, default=str)
+            self._file.write(line + '\n')
+            self.records_written += 1
+        except Exception as e:
+            logger.error(f"Failed to record extraction result: {e}")
+
+    def end_cycle(self):
+        """Flush the cycle to disk so a crash loses at most the current cycle"""
+        try:
+            self._file.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush recording: {e}")
+
+    def close(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
+
+
+def iter_recorded_cycles(path: str) -> Iterator[Tuple[int, float, List[Dict[str, Any]]]]:
+    """
+    Read a recording and yield (cycle, timestamp, results) per extraction cycle.
+    The cycle timestamp is the capture time of its last result, matching when
+    the live scraper would have started persisting it.
+    """
+    current_cycle = None
+    cycle_ts = 0.0
+    results: List[Dict[str, Any]] = []
+
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping unreadable recording line")
+                continue
+
+            cycle = record.get('cycle', 0)
+            if current_cycle is not None and cycle != current_cycle:
+                yield current_cycle, cycle_ts, results
+                results = []
+
+            current_cycle = cycle
+            cycle_ts = record.get('ts', cycle_ts)
+            results.append(record.get('result', {}))
+
+    if current_cycle is not None and results:
+        yield current_cycle, cycle_ts, results
+
+
+class ReplayDriver:
+    """Feeds recorded cycles through a ConcurrentLiveScraper without a browser"""
+
+    def __init__(self, scraper, recording_path: str, speed: float = 0.0):
+        """
+        Args:
+            scraper: ConcurrentLiveScraper instance (never launched)
+            recording_path: path to a .ndjson.gz recording
+            speed: playback multiplier (1.0 = real time, 10.0 = 10x, 0 = as fast as possible)
+        """
+        self.scraper = scraper
+        self.recording_path = recording_path
+        self.speed = speed
+
+        self.cycle_latencies: List[float] = []
+        self.persist_latencies: List[float] = []
+        self.process_latencies: List[float] = []
+        self.broadcast_count = 0
+        self.broadcast_bytes = 0
+        self.total_results = 0
+        self.total_matches = 0
+        self.change_counts = {'new': 0, 'updated': 0, 'removed': 0}
+
+    async def _count_broadcast(self, payload: Dict[str, Any]):
+        """Stand-in dashboard callback that pays the serialization cost"""
+        self.broadcast_count += 1
+        self.broadcast_bytes += len(json.dumps(payload, default=str))
+
+    async def run(self) -> Dict[str, Any]:
+        """Replay every recorded cycle and return a throughput/latency report"""
+        if self.scraper.broadcast_callback is None:
+            self.scraper.broadcast_callback = self._count_broadcast
+
+        loop = asyncio.get_event_loop()
+        wall_start = time.perf_counter()
+        previous_ts: Optional[float] = None
+        cycles = 0
+
+        for cycle, ts, results in iter_recorded_cycles(self.recording_path):
+            if self.speed > 0 and previous_ts is not None:
+                delay = (ts - previous_ts) / self.speed
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            previous_ts = ts
+
+            cycles += 1
+            self.total_results += len(results)
+            self.total_matches += sum(len(r.get('matches', [])) for r in results)
+
+            cycle_start = time.perf_counter()
+            for result in results:
+                self.scraper.ingest_result(result)
+            await self.scraper.persist_cycle_results(results)
+            persisted = time.perf_counter()
+
+            changes = await self.scraper.process_cycle_results(results, cycle, loop.time())
+            finished = time.perf_counter()
+
+            for change_type in self.change_counts:
+                self.change_counts[change_type] += len(changes.get(change_type, []))
+
+            self.persist_latencies.append(persisted - cycle_start)
+            self.process_latencies.append(finished - persisted)
+            self.cycle_latencies.append(finished - cycle_start)
+
+        # Queued file writes are part of the replay's cost - wait for them before timing stops
+        self.scraper.flush_live_statistics()
+        await self.scraper.write_behind.drain()
+        wall_time = time.perf_counter() - wall_start
+
+        return {
+            'recording': self.recording_path,
+            'replayed_at': datetime.now().isoformat(),
+            'speed': 'max' if self.speed <= 0 else f"{self.speed:g}x",
+            'cycles': cycles,
+            'tab_results': self.total_results,
+            'matches_processed': self.total_matches,
+            'changes': self.change_counts,
+            'broadcasts': self.broadcast_count,
+            'broadcast_bytes': self.broadcast_bytes,
+            'wall_time_seconds': round(wall_time, 4),
+            'cycles_per_second': round(cycles / wall_time, 2) if wall_time > 0 else 0,
+            'matches_per_second': round(self.total_matches / wall_time, 2) if wall_time > 0 else 0,
+            'persistence': self.scraper.write_behind.metrics(),
+            'current_shards': self.scraper.shard_writer.metrics() if self.scraper.shard_writer else None,
+            'binary_snapshot': self.scraper.binary_writer.metrics() if self.scraper.binary_writer else None,
+            'latency_ms': {
+                'cycle': summarize_latencies(self.cycle_latencies),
+                'persist': summarize_latencies(self.persist_latencies),
+                'process_and_broadcast': summarize_latencies(self.process_latencies)
+            }
+        }
+
+
+async def main():
+    """Replay a recording through the live pipeline"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay recorded live extraction results without a browser')
+    parser.add_argument('recording', help='Path to a .ndjson.gz recording made with --record')
+    parser.add_argument('--speed', choices=list(SPEED_CHOICES.keys()), default='max',
+                       help='Playback speed relative to the recording (default: max)')
+    parser.add_argument('--output-dir', default=None,
+                       help='Directory for persisted files (default: a fresh temporary directory)')
+    parser.add_argument('--storage', choices=list(STORAGE_CHOICES), default='json',
+                       help='Storage sink to exercise during replay (default: json)')
+    parser.add_argument('--current-layout', choices=list(CURRENT_LAYOUTS), default='single',
+                       help='Current data file layout to exercise during replay (default: single)')
+    parser.add_argument('--binary-snapshot', action='store_true',
+                       help='Also publish the binary current-data snapshot during replay')
+    parser.add_argument('--codec', choices=list(CODEC_CHOICES), default='json-indent',
+                       help='Data file encoding to exercise during replay (default: json-indent)')
+    parser.add_argument('--report', default=None,
+                       help='Write the JSON report to this file as well as stdout')
+
+    args = parser.parse_args()
+
+    # Lazy import: the live scraper imports this module for ExtractionRecorder
+    from concurrency_live_bet365 import ConcurrentLiveScraper
+
+    output_dir = args.output_dir or tempfile.mkdtemp(prefix='bet365_replay_')
+    # The log and selector database stay in output_dir too; learned selector rankings are not saved
+    scraper = ConcurrentLiveScraper(disable_broadcasting=True, output_dir=output_dir, storage=args.storage,
+                                    current_layout=args.current_layout, binary_snapshot=args.binary_snapshot,
+                                    codec=args.codec, config_dir=output_dir, save_selectors=False)
+    # Replay drives the pipeline directly - keep per-cycle logging out of the measurement
+    scraper.logger.setLevel(logging.WARNING)
+
+    print("LIVE PIPELINE REPLAY")
+    print("=" * 60)
+    print(f"Recording: {args.recording}")
+    print(f"Speed: {args.speed}")
+    print(f"Output dir: {output_dir}")
+    print(f"Storage: {args.storage}")
+    print(f"Current data layout: {args.current_layout}")
+    print(f"Codec: {args.codec}")
+    print("=" * 60)
+
+    driver = ReplayDriver(scraper, args.recording, speed=SPEED_CHOICES[args.speed])
+    report = await driver.run()
+
+    print(json.dumps(report, indent=2))
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -25,6 +25,12 @@ from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple, Set
 from patchright.async_api import async_playwright
 
+from odds_values import parse_match_odds
+from sqlite_store import SQLiteStore, DEFAULT_DB_FILE, STORAGE_CHOICES
+from debug_capture import DebugCapture, CAPTURE_MODES
+from snapshot_publisher import SnapshotPublisher
+from serialization import CODEC_CHOICES, load_file
+
 
 # ----------------------------- Data Structures ----------------------------- #
 
@@ -63,13 +69,15 @@ class Game:
     game_id: str = ""
 
     def to_dict(self) -> Dict[str, Any]:
+        odds = self.odds.to_dict()
         return {
             "sport": self.sport,
             "team1": self.team1,
             "team2": self.team2,
             "date": self.date,
             "time": self.time,
-            "odds": self.odds.to_dict(),
+            "odds": odds,
+            "parsed_odds": parse_match_odds({"odds": odds}),
             "fixture_id": self.fixture_id,
             "confidence_score": self.confidence_score,
             "game_id": self.game_id,
@@ -79,7 +87,9 @@ class Game:
 # ----------------------------- Enhanced Scraper Class ----------------------------- #
 
 class EnhancedIntelligentScraper:
-    def __init__(self, headless: bool = True, load_wait: int = 2000, max_scrolls: int = 15, scroll_pause: int = 300):
+    def __init__(self, headless: bool = True, load_wait: int = 2000, max_scrolls: int = 15, scroll_pause: int = 300,
+                 storage: str = 'json', debug_html: str = 'anomaly', debug_html_every: int = 10,
+                 debug_html_ring: int = 5, codec: Optional[str] = None):
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.headless = headless
         self.load_wait = load_wait
@@ -248,6 +258,19 @@ class EnhancedIntelligentScraper:
         for dir_path in [self.outputs_dir, self.html_dir, self.debug_dir]:
             dir_path.mkdir(exist_ok=True)
 
+        # Grid HTML debug captures: sampled, compressed, bounded per sport (outputs/html/{sport}/)
+        self.debug_capture = DebugCapture(self.html_dir, mode=debug_html, every=debug_html_every,
+                                          ring_size=debug_html_ring, logger=self.logger)
+        # sport -> grid element captured as a sample by find_sport_grid (not captured again as an anomaly)
+        self.sampled_grids: Dict[str, Any] = {}
+
+        # Storage sinks: 'json' files (default), shared 'sqlite' database, or 'both'
+        self.storage = storage
+        self.sqlite_store = SQLiteStore(DEFAULT_DB_FILE, logger=self.logger) if storage in ('sqlite', 'both') else None
+
+        # Atomic, generation-stamped writes for the output JSON files (readers poll <file>.gen)
+        self.publisher = SnapshotPublisher(codec=codec, logger=self.logger)
+
     # ----------------------------- Logging & Utilities ----------------------------- #
 
     def setup_logging(self):
@@ -625,10 +648,10 @@ class EnhancedIntelligentScraper:
             if best_grid:
                 self.logger.info(f"{sport}: Selected grid with {best_score} relevant fixtures")
                 
-                # Save HTML snippet for debugging
-                grid_html = await best_grid.inner_html()
-                debug_file = self.html_dir / f"{sport}_{self.session_id}.html"
-                debug_file.write_text(grid_html, encoding="utf-8")
+                # Sampled HTML snippet for debugging (anomalies are captured after extraction)
+                if self.debug_capture.should_sample(sport):
+                    await self.debug_capture.capture_element(sport, best_grid, "sample")
+                    self.sampled_grids[sport] = best_grid
                 
             return best_grid
             
@@ -650,8 +673,17 @@ class EnhancedIntelligentScraper:
         if not grid:
             self.logger.warning(f"{sport}: No suitable grid found")
             return []
-            
-        # Extract games using sport-specific approach
+
+        games = await self.extract_games_from_grid(page, grid, sport)
+        sampled = self.sampled_grids.pop(sport, None) is grid
+
+        # A grid that yields nothing is the case worth debugging - keep its HTML (unless just sampled)
+        if not games and not sampled and self.debug_capture.on_anomaly:
+            await self.debug_capture.capture_element(sport, grid, "zero_games")
+        return games
+
+    async def extract_games_from_grid(self, page, grid, sport: str) -> List[Game]:
+        """Dispatch to the sport-specific extraction approach"""
         if sport == "MLB":
             return await self.extract_mlb_games(grid, sport)
         elif sport == "NBA":
@@ -3460,13 +3492,12 @@ class EnhancedIntelligentScraper:
             previous_games = {}
             if current_file.exists():
                 try:
-                    with open(current_file, 'r', encoding='utf-8') as f:
-                        previous_data = json.load(f)
-                        if 'sports_data' in previous_data:
-                            for sport, sport_data in previous_data['sports_data'].items():
-                                for game_dict in sport_data.get('games', []):
-                                    if 'game_id' in game_dict and game_dict['game_id']:
-                                        previous_games[game_dict['game_id']] = game_dict
+                    previous_data = load_file(current_file)
+                    if 'sports_data' in previous_data:
+                        for sport, sport_data in previous_data['sports_data'].items():
+                            for game_dict in sport_data.get('games', []):
+                                if 'game_id' in game_dict and game_dict['game_id']:
+                                    previous_games[game_dict['game_id']] = game_dict
                 except Exception as e:
                     self.logger.warning(f"Could not load previous pregame data: {e}")
             
@@ -3494,9 +3525,8 @@ class EnhancedIntelligentScraper:
                 existing_history = []
                 if history_file.exists():
                     try:
-                        with open(history_file, 'r', encoding='utf-8') as f:
-                            history_data = json.load(f)
-                            existing_history = history_data.get('games', [])
+                        history_data = load_file(history_file)
+                        existing_history = history_data.get('games', [])
                     except Exception as e:
                         self.logger.warning(f"Could not load existing history: {e}")
                 
@@ -3514,8 +3544,7 @@ class EnhancedIntelligentScraper:
                     "games": existing_history
                 }
                 
-                with open(history_file, 'w', encoding='utf-8') as f:
-                    json.dump(history_data, f, indent=2, ensure_ascii=False)
+                self.publisher.publish(history_file, history_data)
                 
                 self.logger.info(f"💾 Saved {len(removed_games)} newly removed games to pregame_history.json")
                 
@@ -3649,12 +3678,20 @@ class EnhancedIntelligentScraper:
             finally:
                 await browser.close()
 
-        # Handle pregame history tracking
-        await self.handle_pregame_history(result)
-
-        # Save results to single file (not timestamped)
         output_file = self.outputs_dir / "current_pregame_data.json"
-        output_file.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        if self.storage != 'sqlite':
+            # Handle pregame history tracking
+            await self.handle_pregame_history(result)
+
+            # Save results to single file (not timestamped)
+            self.publisher.publish(output_file, result)
+
+        if self.sqlite_store:
+            # Upserts current games; games no longer listed move to match_history
+            games = [game for sport_data in result.get("sports_data", {}).values()
+                     for game in sport_data.get("games", [])]
+            removed = self.sqlite_store.sync_pregame_games(games)
+            self.logger.info(f"Synced {len(games)} pregame games to {self.sqlite_store.db_path} ({removed} removed)")
         
         # Log final summary
         self.logger.info(f"\n{'='*80}")
@@ -4181,6 +4218,7 @@ class EnhancedIntelligentScraper:
 
     async def close(self):
         """Close the browser and cleanup"""
+        await asyncio.to_thread(self.debug_capture.close)
         try:
             if hasattr(self, 'browser') and self.browser:
                 await self.browser.close()
@@ -4205,6 +4243,16 @@ async def main():
     parser.add_argument("--wait", type=int, default=4000, help="Wait time after tab clicks (ms)")
     parser.add_argument("--scrolls", type=int, default=15, help="Maximum scroll iterations")
     parser.add_argument("--scroll-pause", type=int, default=500, help="Pause between scrolls (ms)")
+    parser.add_argument("--storage", choices=list(STORAGE_CHOICES), default="json",
+                        help="Where to persist games: json files, the sqlite database (bet365_data.db), or both")
+    parser.add_argument("--debug-html", choices=list(CAPTURE_MODES), default="anomaly",
+                        help="Grid HTML debug capture: off, anomaly (zero games), sample (every Nth), always")
+    parser.add_argument("--debug-html-every", type=int, default=10,
+                        help="Capture every Nth grid per sport in sample mode")
+    parser.add_argument("--debug-html-ring", type=int, default=5,
+                        help="Compressed captures kept per sport")
+    parser.add_argument("--codec", choices=list(CODEC_CHOICES), default="json-indent",
+                        help="Output file encoding: indented JSON (default), compact JSON, or msgpack")
     
     args = parser.parse_args()
 
@@ -4213,9 +4261,17 @@ async def main():
         load_wait=args.wait,
         max_scrolls=args.scrolls,
         scroll_pause=args.scroll_pause,
+        storage=args.storage,
+        debug_html=args.debug_html,
+        debug_html_every=args.debug_html_every,
+        debug_html_ring=args.debug_html_ring,
+        codec=args.codec,
     )
     
-    await scraper.scrape_all_sports()
+    try:
+        await scraper.scrape_all_sports()
+    finally:
+        await asyncio.to_thread(scraper.debug_capture.close)
 
 
 if __name__ == "__main__":
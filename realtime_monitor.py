@@ -7,6 +7,7 @@ import asyncio
 import json
 import logging
 import time
+import weakref
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Set, Optional, Any
@@ -15,6 +16,22 @@ import aiofiles
 from concurrent.futures import ThreadPoolExecutor
 
 from pregame_new import EnhancedIntelligentScraper, Game, GameOdds
+from odds_values import parse_match_odds
+from sqlite_store import SQLiteStore, DEFAULT_DB_FILE
+from snapshot_publisher import SnapshotPublisher
+from serialization import decode
+from metrics import REGISTRY
+
+# Pregame monitor metrics (the monitor runs inside the dashboard process, see /metrics)
+SPORT_SECONDS = REGISTRY.histogram('bet365_pregame_sport_seconds', 'Per-sport pregame extraction time', ['sport'])
+CYCLE_SECONDS = REGISTRY.histogram('bet365_pregame_cycle_seconds', 'Pregame monitoring cycle duration')
+GAME_UPDATES = REGISTRY.counter('bet365_pregame_game_updates', 'Pregame game changes applied', ['change'])
+# Every monitor in the process; the gauges sum them at scrape time
+_MONITORS = weakref.WeakSet()
+REGISTRY.gauge('bet365_pregame_update_queue_depth', 'Pregame game updates waiting to be applied',
+               func=lambda: sum(m.update_queue.qsize() for m in list(_MONITORS) if m.update_queue))
+REGISTRY.gauge('bet365_pregame_active_games', 'Pregame games currently tracked',
+               func=lambda: sum(len(m.current_games) for m in list(_MONITORS)))
 from typing import Optional
 
 @dataclass
@@ -38,7 +55,7 @@ class MonitoringStats:
 class RealTimeMonitor:
     """Real-time monitoring system with parallel processing"""
     
-    def __init__(self, update_interval: float = 0.3):
+    def __init__(self, update_interval: float = 0.3, storage: str = 'json', codec: Optional[str] = None):
         self.update_interval = max(0.1, min(update_interval, 1.0))  # Faster: 0.1-1.0s range
         self.scraper: Optional[EnhancedIntelligentScraper] = None
         self.is_running = False
@@ -77,6 +94,15 @@ class RealTimeMonitor:
         
         # Setup logging
         self.setup_logging()
+
+        # Storage sinks: 'json' files (default), shared 'sqlite' database, or 'both'
+        self.storage = storage
+        self.sqlite_store = SQLiteStore(DEFAULT_DB_FILE, logger=self.logger) if storage in ('sqlite', 'both') else None
+
+        # Atomic, generation-stamped writes for every data file (readers poll <file>.gen)
+        self.publisher = SnapshotPublisher(codec=codec, logger=self.logger)
+
+        _MONITORS.add(self)
         
     def setup_logging(self):
         """Setup dedicated logging for real-time monitoring"""
@@ -136,23 +162,23 @@ class RealTimeMonitor:
         try:
             # Load current games
             if self.current_file.exists():
-                async with aiofiles.open(self.current_file, 'r') as f:
-                    data = json.loads(await f.read())
+                async with aiofiles.open(self.current_file, 'rb') as f:
+                    data = decode(await f.read())
                     for game_data in data.get('games', []):
                         game = self.dict_to_game(game_data)
                         self.current_games[game.game_id] = game
                         
             # Load history
             if self.history_file.exists():
-                async with aiofiles.open(self.history_file, 'r') as f:
-                    data = json.loads(await f.read())
+                async with aiofiles.open(self.history_file, 'rb') as f:
+                    data = decode(await f.read())
                     self.game_history = [self.dict_to_game(g) for g in data.get('games', [])]
             
             # Load current pregame data for comparison
             pregame_file = self.output_dir / "current_pregame_data.json"
             if pregame_file.exists():
-                async with aiofiles.open(pregame_file, 'r') as f:
-                    data = json.loads(await f.read())
+                async with aiofiles.open(pregame_file, 'rb') as f:
+                    data = decode(await f.read())
                     if 'sports_data' in data:
                         for sport, sport_data in data['sports_data'].items():
                             for game_dict in sport_data.get('games', []):
@@ -274,8 +300,8 @@ class RealTimeMonitor:
                 existing_history = []
                 if self.pregame_history_file.exists():
                     try:
-                        async with aiofiles.open(self.pregame_history_file, 'r') as f:
-                            history_data = json.loads(await f.read())
+                        async with aiofiles.open(self.pregame_history_file, 'rb') as f:
+                            history_data = decode(await f.read())
                             existing_history = history_data.get('games', [])
                     except Exception as e:
                         self.logger.warning(f"Could not load existing pregame history: {e}")
@@ -294,8 +320,7 @@ class RealTimeMonitor:
                     "games": existing_history
                 }
                 
-                async with aiofiles.open(self.pregame_history_file, 'w') as f:
-                    await f.write(json.dumps(history_data, indent=2, ensure_ascii=False))
+                await self.publisher.publish_async(self.pregame_history_file, history_data)
                 
                 self.logger.info(f"💾 Saved {len(removed_games)} removed pregame games to history")
                 
@@ -451,12 +476,14 @@ class RealTimeMonitor:
                             self.sport_update_counts[sport] += 1
                         
                         sport_duration = time.time() - sport_start_time
+                        SPORT_SECONDS.labels(sport=sport).observe(sport_duration)
                         self.logger.info(f"✅ {sport}: Found {len(current_sport_games)} games ({sport_duration:.2f}s)")
                         
                         # Log monitoring activity
                         await self.log_sport_activity(sport, len(current_sport_games), sport_duration, changes_detected)
                     else:
                         self.logger.debug(f"⚪ {sport}: No games found")
+                        SPORT_SECONDS.labels(sport=sport).observe(time.time() - sport_start_time)
                         await self.log_sport_activity(sport, 0, time.time() - sport_start_time, False)
                 
                 # Move to next sport  
@@ -465,6 +492,7 @@ class RealTimeMonitor:
                 # Complete cycle tracking
                 if current_sport_index == 0 and self.current_cycle_start:  # End of cycle
                     cycle_duration = time.time() - self.current_cycle_start
+                    CYCLE_SECONDS.observe(cycle_duration)
                     self.cycle_history.append({
                         "cycle": self.cycle_count,
                         "duration": cycle_duration,
@@ -547,6 +575,7 @@ class RealTimeMonitor:
                     # End of cycle
                     if self.current_cycle_start:
                         cycle_duration = time.time() - self.current_cycle_start
+                        CYCLE_SECONDS.observe(cycle_duration)
                         self.cycle_history.append({
                             "cycle": self.cycle_count,
                             "duration": cycle_duration,
@@ -571,7 +600,9 @@ class RealTimeMonitor:
         """Fast processing of a single sport"""
         try:
             # Use the enhanced scraper's single sport method (is async)
+            sport_start_time = time.time()
             result = await self.scraper.extract_single_sport_realtime(sport)
+            SPORT_SECONDS.labels(sport=sport).observe(time.time() - sport_start_time)
             
             games_data = []
             if result and 'games' in result and not result.get('error'):
@@ -697,8 +728,8 @@ class RealTimeMonitor:
             # Load existing activity log
             activity_log = []
             if self.monitoring_log_file.exists():
-                async with aiofiles.open(self.monitoring_log_file, 'r') as f:
-                    data = json.loads(await f.read())
+                async with aiofiles.open(self.monitoring_log_file, 'rb') as f:
+                    data = decode(await f.read())
                     activity_log = data.get('activities', [])
             
             # Add new entry
@@ -718,8 +749,7 @@ class RealTimeMonitor:
                 "activities": activity_log
             }
             
-            async with aiofiles.open(self.monitoring_log_file, 'w') as f:
-                await f.write(json.dumps(log_data, indent=2))
+            await self.publisher.publish_async(self.monitoring_log_file, log_data)
                 
         except Exception as e:
             self.logger.warning(f"⚠️ Failed to log sport activity: {e}")
@@ -790,6 +820,7 @@ class RealTimeMonitor:
                     self.stats.completed_games += 1
                     self.logger.info(f"🏁 {update.game.sport}: Completed {update.game.team1} vs {update.game.team2}")
                 
+                GAME_UPDATES.labels(change=update.change_type).inc()
                 self.stats.total_games = len(self.current_games) + len(self.game_history)
                 self.stats.last_update = update.timestamp
                 
@@ -812,12 +843,19 @@ class RealTimeMonitor:
     async def write_data_files(self):
         """Update existing pregame JSON with realtime odds data"""
         try:
+            if self.sqlite_store:
+                # Indexed upserts instead of a whole-file rewrite; runs off the event loop
+                games = [self.game_to_dict(game) for game in self.current_games.values()]
+                await asyncio.get_event_loop().run_in_executor(None, self.sqlite_store.sync_pregame_games, games)
+            if self.storage == 'sqlite':
+                return
+
             # Read existing pregame data structure
             existing_data = {}
             if self.current_file.exists():
                 try:
-                    async with aiofiles.open(self.current_file, 'r') as f:
-                        existing_data = json.loads(await f.read())
+                    async with aiofiles.open(self.current_file, 'rb') as f:
+                        existing_data = decode(await f.read())
                 except Exception as e:
                     self.logger.warning(f"Could not read existing pregame data: {e}")
             
@@ -842,10 +880,10 @@ class RealTimeMonitor:
                                     "moneyline": realtime_game.odds.moneyline if realtime_game.odds else [],
                                     "runline": realtime_game.odds.runline if realtime_game.odds else []
                                 }
+                                game_dict["parsed_odds"] = parse_match_odds(game_dict)
                 
                 # Write updated data back to file
-                async with aiofiles.open(self.current_file, 'w') as f:
-                    await f.write(json.dumps(existing_data, indent=2))
+                await self.publisher.publish_async(self.current_file, existing_data)
             else:
                 # Fallback: create simple format if no existing structure
                 current_data = {
@@ -853,8 +891,7 @@ class RealTimeMonitor:
                     "total_games": len(self.current_games),
                     "games": [self.game_to_dict(game) for game in self.current_games.values()]
                 }
-                async with aiofiles.open(self.current_file, 'w') as f:
-                    await f.write(json.dumps(current_data, indent=2))
+                await self.publisher.publish_async(self.current_file, current_data)
             
             # Write history (only if we have history items)
             if self.game_history:
@@ -864,8 +901,7 @@ class RealTimeMonitor:
                     "games": [self.game_to_dict(game) for game in self.game_history]
                 }
                 
-                async with aiofiles.open(self.history_file, 'w') as f:
-                    await f.write(json.dumps(history_data, indent=2))
+                await self.publisher.publish_async(self.history_file, history_data)
             
             # Write monitoring cycle stats
             cycle_data = {
@@ -877,8 +913,7 @@ class RealTimeMonitor:
                 "recent_cycles": self.cycle_history[-10:] if self.cycle_history else []
             }
             
-            async with aiofiles.open(self.cycle_stats_file, 'w') as f:
-                await f.write(json.dumps(cycle_data, indent=2))
+            await self.publisher.publish_async(self.cycle_stats_file, cycle_data)
                 
         except Exception as e:
             self.logger.error(f"❌ Failed to write data files: {e}")
@@ -924,6 +959,12 @@ class RealTimeMonitor:
 
     def game_to_dict(self, game: Game) -> Dict:
         """Convert Game object to dictionary"""
+        odds = {
+            "moneyline": game.odds.moneyline if game.odds else [],
+            "spread": game.odds.spread if game.odds else [],
+            "total": game.odds.total if game.odds else [],
+            "runline": game.odds.runline if game.odds else []
+        }
         return {
             "sport": game.sport,
             "team1": game.team1,
@@ -933,12 +974,8 @@ class RealTimeMonitor:
             "fixture_id": game.fixture_id,
             "confidence_score": game.confidence_score,
             "game_id": game.game_id,
-            "odds": {
-                "moneyline": game.odds.moneyline if game.odds else [],
-                "spread": game.odds.spread if game.odds else [],
-                "total": game.odds.total if game.odds else [],
-                "runline": game.odds.runline if game.odds else []
-            }
+            "odds": odds,
+            "parsed_odds": parse_match_odds({"odds": odds})
         }
 
     def dict_to_game(self, data: Dict) -> Game:
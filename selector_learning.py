@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+SELECTOR PERFORMANCE LEARNING STORE
+Learns, per sport code and selector type, which DOM selectors actually work
+for the live extractor and hands them back fastest-first.
+
+- Observations come from the fixture wait in extract_live_betting_data
+  (one wait_for_selector per attempt) and from the extraction script, which
+  reports attempts/hits/elements/time per selector in debug.selector_stats
+- Each selector keeps totals plus moving averages of hit rate, elements
+  matched and time per attempt (a miss in the fixture wait costs its timeout)
+- rank() orders candidates: proven selectors by hit rate then speed, untried
+  ones in their original order, then selectors that have only missed.
+  Selectors that missed DEAD_AFTER observations in a row are dropped, and
+  re-probed at the tail once REPROBE_AFTER has passed
+- The learned state and rankings are saved in bet365_selectors_detailed.json
+  under 'selector_performance'; the rest of the file is left as it was
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+SECTION = 'selector_performance'
+
+
+class SelectorPerformanceStore:
+    """Per-sport selector hit/latency statistics and learned candidate order"""
+
+    DEAD_AFTER = 5            # consecutive missed observations before a selector is dropped
+    REPROBE_AFTER = 1800.0    # seconds before a dropped selector is tried again
+    SMOOTHING = 0.2           # weight of the newest observation in the moving averages
+
+    def __init__(self, flush_interval: float = 30.0):
+        """
+        Args:
+            flush_interval: minimum seconds between saves of the selector file
+        """
+        self.flush_interval = flush_interval
+        # sport_code -> selector_type -> selector -> entry
+        self.sports: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        self.base: Dict[str, Any] = {}
+
+        self.dirty = False
+        self._last_flush = 0.0
+
+    # ----------------------------- Loading ----------------------------- #
+
+    def load(self, document: Optional[Dict[str, Any]]):
+        """Seed from the selector database file (its other sections are kept for saving)"""
+        document = dict(document or {})
+        section = document.pop(SECTION, None) or {}
+        document.pop('schema_version', None)
+        self.base = document
+
+        for sport_code, types in (section.get('sports') or {}).items():
+            for selector_type, info in types.items():
+                selectors = info.get('selectors') if isinstance(info, dict) else None
+                if isinstance(selectors, dict):
+                    self.sports.setdefault(sport_code, {})[selector_type] = dict(selectors)
+
+    # ----------------------------- Recording ----------------------------- #
+
+    def record(self, sport_code: str, selector_type: str, selector: str, attempts: int = 1,
+               hits: int = 0, elements: int = 0, elapsed_ms: float = 0.0):
+        """
+        Record one observation of a selector.
+
+        Args:
+            sport_code: bet365 sport code ('B1')
+            selector_type: 'fixture_wait', 'match_containers', 'team_names', 'status', ...
+            selector: CSS selector
+            attempts: lookups made in this observation (the script tries a selector per fixture)
+            hits: lookups that matched
+            elements: elements matched in total
+            elapsed_ms: time spent on all attempts
+        """
+        if attempts <= 0:
+            return
+        now = time.time()
+        entry = self.sports.setdefault(sport_code, {}).setdefault(selector_type, {}).get(selector)
+        if entry is None:
+            entry = self.sports[sport_code][selector_type][selector] = {
+                'attempts': 0, 'hits': 0, 'elements': 0,
+                'hit_rate': hits / attempts,
+                'avg_elements': elements / attempts,
+                'avg_ms': elapsed_ms / attempts,
+                'consecutive_misses': 0,
+                'last_hit': None,
+                'last_attempt': None
+            }
+        else:
+            alpha = self.SMOOTHING
+            entry['hit_rate'] = (1 - alpha) * entry['hit_rate'] + alpha * hits / attempts
+            entry['avg_elements'] = (1 - alpha) * entry['avg_elements'] + alpha * elements / attempts
+            entry['avg_ms'] = (1 - alpha) * entry['avg_ms'] + alpha * elapsed_ms / attempts
+
+        entry['attempts'] += attempts
+        entry['hits'] += hits
+        entry['elements'] += elements
+        entry['last_attempt'] = now
+        if hits:
+            entry['consecutive_misses'] = 0
+            entry['last_hit'] = now
+        else:
+            entry['consecutive_misses'] += 1
+        self.dirty = True
+
+    def record_script_stats(self, sport_code: str, selector_stats: Optional[Dict[str, Any]]):
+        """Record the extraction script's debug.selector_stats ({type: {selector: counters}})"""
+        for selector_type, selectors in (selector_stats or {}).items():
+            if not isinstance(selectors, dict):
+                continue
+            for selector, stats in selectors.items():
+                try:
+                    self.record(sport_code, selector_type, selector,
+                                attempts=int(stats.get('attempts', 0)), hits=int(stats.get('hits', 0)),
+                                elements=int(stats.get('elements', 0)), elapsed_ms=float(stats.get('ms', 0.0)))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+
+    # ----------------------------- Ranking ----------------------------- #
+
+    def is_dead(self, entry: Dict[str, Any]) -> bool:
+        return entry['consecutive_misses'] >= self.DEAD_AFTER
+
+    def rank(self, sport_code: str, selector_type: str, candidates: List[str]) -> List[str]:
+        """Candidates in learned order, with consistently dead selectors dropped"""
+        learned = self.sports.get(sport_code, {}).get(selector_type, {})
+        if not learned:
+            return list(candidates)
+
+        now = time.time()
+        proven, untried, missing, reprobe = [], [], [], []
+        for index, selector in enumerate(dict.fromkeys(candidates)):
+            entry = learned.get(selector)
+            if entry is None:
+                untried.append(selector)
+            elif self.is_dead(entry):
+                if now - (entry['last_attempt'] or 0) >= self.REPROBE_AFTER:
+                    reprobe.append(selector)
+            elif entry['hits']:
+                proven.append((-round(entry['hit_rate'], 1), entry['avg_ms'], index, selector))
+            else:
+                missing.append((entry['avg_ms'], index, selector))
+
+        ranked = ([item[-1] for item in sorted(proven)] + untried +
+                  [item[-1] for item in sorted(missing)] + reprobe)
+        # Never leave the extractor without candidates
+        return ranked or list(candidates)
+
+    def ranking(self, sport_code: str, selector_type: str) -> List[str]:
+        """Learned order of every known, live selector of a type"""
+        return self.rank(sport_code, selector_type, list(self.sports.get(sport_code, {}).get(selector_type, {})))
+
+    # ----------------------------- Saving ----------------------------- #
+
+    def should_flush(self) -> bool:
+        """True when there are unsaved observations and the flush interval has elapsed"""
+        if not self.dirty or time.monotonic() - self._last_flush < self.flush_interval:
+            return False
+        self._last_flush = time.monotonic()
+        return True
+
+    def to_document(self) -> Dict[str, Any]:
+        """Selector database file contents with the learned section (marks the store clean)"""
+        self.dirty = False
+        sports = {}
+        for sport_code, types in self.sports.items():
+            sports[sport_code] = {}
+            for selector_type, selectors in types.items():
+                sports[sport_code][selector_type] = {
+                    'ranking': self.ranking(sport_code, selector_type),
+                    'dead': [s for s, entry in selectors.items() if self.is_dead(entry)],
+                    'selectors': selectors
+                }
+
+        document = dict(self.base)
+        document[SECTION] = {
+            'updated': datetime.now().isoformat(),
+            'dead_after': self.DEAD_AFTER,
+            'sports': sports
+        }
+        return document
+
+    def metrics(self) -> Dict[str, Any]:
+        entries = [entry for types in self.sports.values() for selectors in types.values()
+                   for entry in selectors.values()]
+        return {
+            'selectors': len(entries),
+            'dead': sum(1 for entry in entries if self.is_dead(entry))
+        }
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+PLUGGABLE SERIALIZATION CODECS FOR DATA FILES
+Selectable encodings for the files the scrapers publish:
+
+- 'json-indent'   orjson, 2-space indented (default - human readable, same layout as before)
+- 'json'          orjson, compact
+- 'msgpack'       MessagePack (optional dependency: pip install msgpack)
+
+Every published dict document carries a top-level 'schema_version', and the
+publisher's generation sidecar records the codec. Readers never need to be
+told the codec: decode() sniffs the payload (JSON documents start with
+'{' or '['; MessagePack maps and arrays never do), so a file keeps its name
+whichever codec wrote it.
+"""
+
+import logging
+from typing import Any, Dict
+
+import orjson
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    msgpack = None
+    MSGPACK_AVAILABLE = False
+
+SCHEMA_VERSION = 1
+CODEC_CHOICES = ('json-indent', 'json', 'msgpack')
+DEFAULT_CODEC = 'json-indent'
+
+logger = logging.getLogger(__name__)
+
+
+class JsonCodec:
+    """orjson encoder, indented or compact"""
+
+    def __init__(self, indent: bool = True):
+        self.name = 'json-indent' if indent else 'json'
+        self.options = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+
+    def encode(self, document: Any) -> bytes:
+        return orjson.dumps(document, default=str, option=self.options)
+
+    @staticmethod
+    def decode(payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec:
+    """MessagePack encoder (non-native values are stored as strings, like the JSON codecs)"""
+
+    name = 'msgpack'
+
+    @staticmethod
+    def encode(document: Any) -> bytes:
+        return msgpack.packb(document, default=str, use_bin_type=True)
+
+    @staticmethod
+    def decode(payload: bytes) -> Any:
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+def get_codec(name: str = DEFAULT_CODEC):
+    """Codec instance for a CODEC_CHOICES name"""
+    if name == 'json-indent':
+        return JsonCodec(indent=True)
+    if name == 'json':
+        return JsonCodec(indent=False)
+    if name == 'msgpack':
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("The msgpack codec needs the msgpack package (pip install msgpack)")
+        return MsgpackCodec()
+    raise ValueError(f"Unknown codec: {name}")
+
+
+def detect_codec_name(payload: bytes) -> str:
+    """'json' or 'msgpack', from the first significant byte of a payload"""
+    for byte in payload[:64]:
+        if byte in b' \t\r\n':
+            continue
+        return 'json' if byte in b'{["-0123456789tfn' else 'msgpack'
+    return 'json'
+
+
+def decode(payload: bytes) -> Any:
+    """Decode a data file written with any codec"""
+    if detect_codec_name(payload) == 'msgpack':
+        if not MSGPACK_AVAILABLE:
+            raise ValueError("File is MessagePack-encoded but the msgpack package is not installed")
+        document = MsgpackCodec.decode(payload)
+    else:
+        document = orjson.loads(payload)
+
+    if isinstance(document, dict) and document.get('schema_version', SCHEMA_VERSION) > SCHEMA_VERSION:
+        logger.warning(f"Data file schema version {document['schema_version']} is newer than "
+                       f"supported version {SCHEMA_VERSION} - reading it anyway")
+    return document
+
+
+def stamp_schema(document: Any) -> Any:
+    """Document with the current schema_version at the top level (shallow copy; non-dicts unchanged)"""
+    if isinstance(document, dict) and document.get('schema_version') != SCHEMA_VERSION:
+        stamped: Dict[str, Any] = dict(document)
+        stamped['schema_version'] = SCHEMA_VERSION
+        return stamped
+    return document
+
+
+def load_file(path) -> Any:
+    """Read and decode a data file (any codec)"""
+    with open(path, 'rb') as f:
+        return decode(f.read())
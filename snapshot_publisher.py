@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+GENERATION-NUMBERED ATOMIC SNAPSHOT PUBLISHER
+One write path for every JSON data file the scrapers produce and the
+dashboard reads.
+
+- publish() serializes with the selected codec (see serialization.py) and
+  replaces the file atomically (temp file + os.replace), so readers never
+  see a half-written document
+- Each publish bumps a monotonically increasing generation stored in a
+  small sidecar next to the file: <file>.gen
+  {"generation": 42, "published_at": 1760000000.0, "size": 123456,
+   "codec": "json-indent", "schema_version": 1}
+  The data file is replaced before its sidecar, so a generation never
+  points at older contents than it names
+- SnapshotReader polls the sidecar (a few dozen bytes) and only re-reads and
+  decodes the data file (any codec) when the generation moved; files written
+  by older writers without a sidecar fall back to mtime + size
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+import orjson
+
+from serialization import SCHEMA_VERSION, get_codec, decode, stamp_schema
+
+GENERATION_SUFFIX = '.gen'
+
+PathLike = Union[str, Path]
+
+
+def generation_file(path: PathLike) -> str:
+    return str(path) + GENERATION_SUFFIX
+
+
+def read_generation(path: PathLike) -> Optional[int]:
+    """Published generation of a data file, or None if it has no sidecar"""
+    try:
+        with open(generation_file(path), 'rb') as f:
+            return int(orjson.loads(f.read())['generation'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+class SnapshotPublisher:
+    """Atomic replace + generation sidecar for data file writers"""
+
+    REPLACE_RETRIES = 5
+
+    def __init__(self, codec: Optional[str] = None, indent: bool = True, fsync: bool = False,
+                 logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            codec: serialization codec name (serialization.CODEC_CHOICES)
+            indent: without a codec, choose indented ('json-indent') or compact ('json') JSON
+            fsync: fsync each temp file before the rename (durability over throughput)
+            logger: logger for write errors
+        """
+        self.codec = get_codec(codec or ('json-indent' if indent else 'json'))
+        self.fsync = fsync
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+    def serialize(self, document: Any) -> bytes:
+        """Encode a document with the publisher's codec, stamped with the schema version"""
+        return self.codec.encode(stamp_schema(document))
+
+    def publish(self, path: PathLike, document: Any) -> int:
+        """Serialize and publish a document. Returns the new generation."""
+        return self.publish_bytes(path, self.serialize(document))
+
+    async def publish_async(self, path: PathLike, document: Any) -> int:
+        """publish() from async code, serialized and written off the event loop"""
+        return await asyncio.get_event_loop().run_in_executor(None, self.publish, path, document)
+
+    def publish_bytes(self, path: PathLike, payload: bytes, stamp: bool = True) -> Optional[int]:
+        """
+        Atomically replace path with payload and bump its generation.
+
+        Args:
+            path: data file
+            payload: serialized contents
+            stamp: write the generation sidecar (formats that carry their own
+                   version, like the binary snapshot or shard files, skip it)
+        """
+        path = str(path)
+        with self._lock:
+            self._replace(path, payload)
+            if not stamp:
+                return None
+            generation = (read_generation(path) or 0) + 1
+            self._replace(generation_file(path), orjson.dumps({
+                'generation': generation,
+                'published_at': time.time(),
+                'size': len(payload),
+                'codec': self.codec.name,
+                'schema_version': SCHEMA_VERSION
+            }))
+            return generation
+
+    def _replace(self, path: str, payload: bytes):
+        temp_file = path + '.tmp'
+        try:
+            with open(temp_file, 'wb') as f:
+                f.write(payload)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            for attempt in range(self.REPLACE_RETRIES):
+                try:
+                    os.replace(temp_file, path)
+                    return
+                except PermissionError:
+                    # Windows: a reader has the file open for a moment - retry briefly
+                    if attempt == self.REPLACE_RETRIES - 1:
+                        raise
+                    time.sleep(0.05)
+        except Exception:
+            try:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            except OSError:
+                pass
+            raise
+
+
+class SnapshotReader:
+    """Cached reader that only re-parses a published file when its generation changed"""
+
+    def __init__(self, path: PathLike, logger: Optional[logging.Logger] = None):
+        self.path = Path(path)
+        self.logger = logger or logging.getLogger(__name__)
+        self.token = None
+        self.document: Optional[Any] = None
+        self.loads = 0
+
+    def current_token(self):
+        """Generation from the sidecar, or (mtime, size) for unpublished files; None if missing"""
+        generation = read_generation(self.path)
+        if generation is not None:
+            return ('generation', generation)
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        return ('mtime', stat.st_mtime_ns, stat.st_size)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def changed(self) -> bool:
+        """Cheap poll: has a different generation been published since the last load?"""
+        token = self.current_token()
+        return token is not None and token != self.token
+
+    def load(self) -> Optional[Any]:
+        """Parsed document, re-read only when the generation moved (None if the file is missing)"""
+        token = self.current_token()
+        if token is None:
+            return None
+        if token == self.token:
+            return self.document
+
+        try:
+            with open(self.path, 'rb') as f:
+                document = decode(f.read())
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            # Only possible for files from writers that bypass the publisher
+            self.logger.warning(f"Torn or invalid JSON in {self.path}, keeping previous contents: {e}")
+            return self.document
+
+        self.token = token
+        self.document = document
+        self.loads += 1
+        return document
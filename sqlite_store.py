@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+EMBEDDED SQLITE STORAGE BACKEND
+One local database (bet365_data.db, WAL mode) holding:
+- live_matches   - current live matches, upserted/deleted per detected change
+- change_log     - sequence-numbered insert/update/remove entries
+- match_history  - completed live matches and removed pregame games
+- pregame_games  - current pregame games
+- documents      - small whole documents (live statistics, extraction statistics)
+
+Writers apply incremental changes instead of rewriting whole files, and
+readers (dashboard_api.load_current_data) run indexed queries instead of
+parsing whole files. WAL mode lets the dashboard read while a scraper writes.
+
+Each thread gets its own connection; write methods are safe to call from the
+PersistenceService writer thread.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+import orjson
+
+DEFAULT_DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bet365_data.db")
+
+STORAGE_CHOICES = ('json', 'sqlite', 'both')
+
+# Keep the change log bounded - older entries are pruned after this many rows
+CHANGE_LOG_RETENTION = 200000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS live_matches (
+    match_key   TEXT PRIMARY KEY,
+    sport       TEXT,
+    sport_code  TEXT,
+    updated_at  TEXT,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_live_sport ON live_matches(sport);
+CREATE INDEX IF NOT EXISTS idx_live_updated ON live_matches(updated_at);
+
+CREATE TABLE IF NOT EXISTS change_log (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts          TEXT NOT NULL,
+    op          TEXT NOT NULL,
+    match_key   TEXT NOT NULL,
+    sport       TEXT,
+    fields      TEXT,
+    data        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_change_key ON change_log(match_key);
+CREATE INDEX IF NOT EXISTS idx_change_ts ON change_log(ts);
+CREATE INDEX IF NOT EXISTS idx_change_sport ON change_log(sport);
+
+CREATE TABLE IF NOT EXISTS match_history (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    match_key    TEXT NOT NULL,
+    source       TEXT NOT NULL,
+    sport        TEXT,
+    completed_at TEXT NOT NULL,
+    data         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_key ON match_history(match_key);
+CREATE INDEX IF NOT EXISTS idx_history_sport ON match_history(sport);
+CREATE INDEX IF NOT EXISTS idx_history_completed ON match_history(completed_at);
+
+CREATE TABLE IF NOT EXISTS pregame_games (
+    game_id     TEXT PRIMARY KEY,
+    sport       TEXT,
+    date        TEXT,
+    time        TEXT,
+    updated_at  TEXT,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_pregame_sport ON pregame_games(sport);
+CREATE INDEX IF NOT EXISTS idx_pregame_updated ON pregame_games(updated_at);
+
+CREATE TABLE IF NOT EXISTS documents (
+    name        TEXT PRIMARY KEY,
+    updated_at  TEXT,
+    data        TEXT NOT NULL
+);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+def _loads(text: Optional[str]) -> Any:
+    return orjson.loads(text) if text else None
+
+
+class SQLiteStore:
+    """WAL-mode SQLite sink and query layer for live, pregame and history data"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_FILE, logger: Optional[logging.Logger] = None):
+        self.db_path = db_path
+        self.logger = logger or logging.getLogger(__name__)
+        self._local = threading.local()
+        self._changes_since_prune = 0
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread connection (sqlite3 connections must not be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.db_path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _transaction(self, statements: Iterable[Tuple[str, Iterable]]):
+        """Run (sql, rows) batches in one IMMEDIATE transaction"""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, rows in statements:
+                conn.executemany(sql, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ----------------------------- Live matches ----------------------------- #
+
+    @staticmethod
+    def live_change_rows(changes: Dict[str, List], key_func) -> List[Tuple[str, str, Optional[Dict], List]]:
+        """
+        Turn detect_data_changes output into (op, key, match copy, fields) rows.
+        Cheap enough to run on the event loop; the JSON encoding happens in apply_live_changes.
+        """
+        rows = []
+        for match in changes.get('new', []):
+            if isinstance(match, dict):
+                rows.append(('insert', key_func(match), dict(match), []))
+        for update in changes.get('updated', []):
+            rows.append(('update', update['match_key'], dict(update['new_data']), update.get('changes', [])))
+        for match in changes.get('removed', []):
+            if isinstance(match, dict):
+                rows.append(('remove', key_func(match), dict(match), []))
+        return rows
+
+    def apply_live_changes(self, rows: List[Tuple[str, str, Optional[Dict], List]]):
+        """Upsert/delete live matches, append to the change log and archive removed matches"""
+        if not rows:
+            return
+        timestamp = datetime.now().isoformat()
+        upserts, deletes, history, log = [], [], [], []
+
+        for op, key, match, fields in rows:
+            sport = match.get('sport') if match else None
+            data = _dumps(match) if match is not None else None
+            if op == 'remove':
+                deletes.append((key,))
+                history.append((key, 'live', sport, match.get('completed_at', timestamp), data))
+                log.append((timestamp, op, key, sport, None, None))
+            else:
+                upserts.append((key, sport, match.get('sport_code', match.get('code', '')),
+                                match.get('last_updated', timestamp), data))
+                log.append((timestamp, op, key, sport, _dumps(fields) if fields else None, data))
+
+        self._transaction([
+            ("INSERT INTO live_matches (match_key, sport, sport_code, updated_at, data) VALUES (?, ?, ?, ?, ?) "
+             "ON CONFLICT(match_key) DO UPDATE SET sport=excluded.sport, sport_code=excluded.sport_code, "
+             "updated_at=excluded.updated_at, data=excluded.data", upserts),
+            ("DELETE FROM live_matches WHERE match_key = ?", deletes),
+            ("INSERT INTO match_history (match_key, source, sport, completed_at, data) VALUES (?, ?, ?, ?, ?)", history),
+            ("INSERT INTO change_log (ts, op, match_key, sport, fields, data) VALUES (?, ?, ?, ?, ?, ?)", log),
+        ])
+
+        self._changes_since_prune += len(log)
+        if self._changes_since_prune >= 1000:
+            self._changes_since_prune = 0
+            self._conn().execute(
+                "DELETE FROM change_log WHERE seq <= (SELECT MAX(seq) FROM change_log) - ?",
+                (CHANGE_LOG_RETENTION,))
+
+    def replace_live_matches(self, matches: Dict[str, Dict]):
+        """Make live_matches mirror the given state exactly (startup sync after journal recovery)"""
+        timestamp = datetime.now().isoformat()
+        rows = [(key, m.get('sport'), m.get('sport_code', m.get('code', '')),
+                 m.get('last_updated', timestamp), _dumps(m)) for key, m in matches.items() if isinstance(m, dict)]
+        self._transaction([
+            ("DELETE FROM live_matches", [()]),
+            ("INSERT INTO live_matches (match_key, sport, sport_code, updated_at, data) VALUES (?, ?, ?, ?, ?)", rows),
+        ])
+
+    def get_live_matches(self, sport: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Current live matches, optionally for one sport (uses idx_live_sport)"""
+        if sport:
+            cursor = self._conn().execute("SELECT data FROM live_matches WHERE sport = ?", (sport,))
+        else:
+            cursor = self._conn().execute("SELECT data FROM live_matches")
+        return [_loads(row[0]) for row in cursor]
+
+    def get_changes_since(self, seq: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Change log entries after seq, oldest first"""
+        cursor = self._conn().execute(
+            "SELECT seq, ts, op, match_key, sport, fields, data FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?",
+            (seq, limit))
+        return [{'seq': r[0], 'ts': r[1], 'op': r[2], 'key': r[3], 'sport': r[4],
+                 'fields': _loads(r[5]) or [], 'data': _loads(r[6])} for r in cursor]
+
+    # ----------------------------- Pregame games ----------------------------- #
+
+    def sync_pregame_games(self, games: List[Dict[str, Any]], archive_removed: bool = True) -> int:
+        """
+        Make pregame_games match the current extraction: upsert every game and move
+        games that disappeared into match_history. Returns the number of removed games.
+        """
+        timestamp = datetime.now().isoformat()
+        current = {}
+        for game in games:
+            game_id = game.get('game_id') or game.get('fixture_id')
+            if game_id:
+                current[game_id] = game
+
+        conn = self._conn()
+        existing = {row[0]: row for row in conn.execute("SELECT game_id, sport, data FROM pregame_games")}
+        removed = [row for game_id, row in existing.items() if game_id not in current]
+
+        history = []
+        if archive_removed:
+            for game_id, sport, data in removed:
+                game = _loads(data) or {}
+                game['removed_timestamp'] = timestamp
+                history.append((game_id, 'pregame', sport, timestamp, _dumps(game)))
+
+        self._transaction([
+            ("INSERT INTO pregame_games (game_id, sport, date, time, updated_at, data) VALUES (?, ?, ?, ?, ?, ?) "
+             "ON CONFLICT(game_id) DO UPDATE SET sport=excluded.sport, date=excluded.date, time=excluded.time, "
+             "updated_at=excluded.updated_at, data=excluded.data",
+             [(game_id, g.get('sport'), g.get('date'), g.get('time'), timestamp, _dumps(g))
+              for game_id, g in current.items()]),
+            ("DELETE FROM pregame_games WHERE game_id = ?", [(row[0],) for row in removed]),
+            ("INSERT INTO match_history (match_key, source, sport, completed_at, data) VALUES (?, ?, ?, ?, ?)", history),
+        ])
+        return len(removed)
+
+    def get_pregame_games(self, sport: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Current pregame games, optionally for one sport (uses idx_pregame_sport)"""
+        if sport:
+            cursor = self._conn().execute("SELECT data FROM pregame_games WHERE sport = ?", (sport,))
+        else:
+            cursor = self._conn().execute("SELECT data FROM pregame_games")
+        return [_loads(row[0]) for row in cursor]
+
+    # ----------------------------- History ----------------------------- #
+
+    def get_history(self, source: Optional[str] = None, sport: Optional[str] = None,
+                    limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently completed/removed matches first"""
+        clauses, params = [], []
+        if source:
+            clauses.append("source = ?")
+            params.append(source)
+        if sport:
+            clauses.append("sport = ?")
+            params.append(sport)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+        cursor = self._conn().execute(
+            f"SELECT data FROM match_history {where} ORDER BY completed_at DESC LIMIT ?", params)
+        return [_loads(row[0]) for row in cursor]
+
+    # ----------------------------- Documents ----------------------------- #
+
+    def put_document(self, name: str, document: Dict[str, Any]):
+        """Store a whole document (e.g. live statistics) under a name"""
+        self._conn().execute(
+            "INSERT INTO documents (name, updated_at, data) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET updated_at=excluded.updated_at, data=excluded.data",
+            (name, datetime.now().isoformat(), _dumps(document)))
+
+    def get_document(self, name: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT data FROM documents WHERE name = ?", (name,)).fetchone()
+        return _loads(row[0]) if row else None
+
+    # ----------------------------- Change detection ----------------------------- #
+
+    def data_version(self) -> int:
+        """Changes whenever another connection commits - cheap poll for readers"""
+        return self._conn().execute("PRAGMA data_version").fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        conn = self._conn()
+        return {
+            'live_matches': conn.execute("SELECT COUNT(*) FROM live_matches").fetchone()[0],
+            'pregame_games': conn.execute("SELECT COUNT(*) FROM pregame_games").fetchone()[0],
+            'history': conn.execute("SELECT COUNT(*) FROM match_history").fetchone()[0],
+            'changes': conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+        }
@@ -0,0 +1,98 @@
+import os
+
+from change_journal import ChangeJournal
+
+
+def match_key(match):
+    return match['id']
+
+
+def make_journal(tmp_path, snapshot_every=500):
+    return ChangeJournal(str(tmp_path / 'journal.ndjson'), str(tmp_path / 'snapshot.json'),
+                         snapshot_every=snapshot_every)
+
+
+def record_three(journal):
+    journal.record_changes({'new': [{'id': 'a', 'score': 0}, {'id': 'b', 'score': 0}]}, match_key)
+    journal.record_changes({'updated': [{'match_key': 'a', 'new_data': {'id': 'a', 'score': 1},
+                                         'changes': ['score']}]}, match_key)
+
+
+def test_recover_replays_snapshot_and_journal(tmp_path):
+    journal = make_journal(tmp_path)
+    journal.record_changes({'new': [{'id': 'a', 'score': 0}]}, match_key)
+    journal.write_snapshot({'a': {'id': 'a', 'score': 0}})
+    journal.record_changes({'new': [{'id': 'b', 'score': 5}], 'removed': [{'id': 'a'}]}, match_key)
+
+    recovered = make_journal(tmp_path)
+    matches, replayed = recovered.recover()
+
+    assert matches == {'b': {'id': 'b', 'score': 5}}
+    assert replayed == 2
+    assert recovered.snapshot_seq == 1
+    assert recovered.last_seq == 3
+
+
+def test_torn_tail_is_cut_before_new_appends(tmp_path):
+    journal = make_journal(tmp_path)
+    record_three(journal)
+    intact_size = os.path.getsize(journal.journal_file)
+    with open(journal.journal_file, 'a', encoding='utf-8') as f:
+        f.write('{"seq": 4, "op": "insert", "key": "c", "da')
+
+    recovered = make_journal(tmp_path)
+    matches, replayed = recovered.recover()
+
+    assert replayed == 3
+    assert matches == {'a': {'id': 'a', 'score': 1}, 'b': {'id': 'b', 'score': 0}}
+    assert os.path.getsize(journal.journal_file) == intact_size
+
+    # The next append starts on a clean line and survives another restart
+    recovered.record_changes({'new': [{'id': 'c', 'score': 2}]}, match_key)
+    matches, replayed = make_journal(tmp_path).recover()
+    assert replayed == 4
+    assert matches['c'] == {'id': 'c', 'score': 2}
+
+
+def test_last_entry_without_newline_is_kept(tmp_path):
+    journal = make_journal(tmp_path)
+    record_three(journal)
+    with open(journal.journal_file, 'rb+') as f:
+        f.seek(-1, os.SEEK_END)
+        f.truncate()
+
+    recovered = make_journal(tmp_path)
+    assert recovered.recover()[1] == 3
+    recovered.record_changes({'new': [{'id': 'c'}]}, match_key)
+
+    matches, replayed = make_journal(tmp_path).recover()
+    assert replayed == 4
+    assert set(matches) == {'a', 'b', 'c'}
+
+
+def test_snapshot_cadence_and_entries_after_begin(tmp_path):
+    journal = make_journal(tmp_path, snapshot_every=3)
+    record_three(journal)
+    assert journal.should_snapshot()
+
+    # The snapshot is taken at begin_snapshot(); entries prepared afterwards are appended after it
+    state = {'a': {'id': 'a', 'score': 1}, 'b': {'id': 'b', 'score': 0}}
+    seq = journal.begin_snapshot()
+    later = journal.prepare_entries({'removed': [{'id': 'b'}]}, match_key)
+    journal.write_snapshot(state, seq)
+    journal.append_entries(later)
+
+    assert not journal.should_snapshot()
+    matches, replayed = make_journal(tmp_path).recover()
+    assert replayed == 1
+    assert matches == {'a': {'id': 'a', 'score': 1}}
+
+
+def test_no_state_and_read_since(tmp_path):
+    journal = make_journal(tmp_path)
+    assert journal.recover() == (None, 0)
+    assert journal.mtime() is None
+
+    record_three(journal)
+    assert [entry['seq'] for entry in journal.read_since(1)] == [2, 3]
+    assert journal.mtime() is not None
@@ -0,0 +1,122 @@
+import asyncio
+import json
+
+import pytest
+
+from fanout import FanoutBroadcaster, PreEncoded, encode_message
+
+
+class FakeSocket:
+    """WebSocket stand-in whose sends can be held to simulate a slow reader"""
+
+    def __init__(self, blocked=False):
+        self.sent = []
+        self.closed = False
+        self.gate = asyncio.Event()
+        if not blocked:
+            self.gate.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        await self.gate.wait()
+        self.sent.append(json.loads(payload))
+
+    async def close(self):
+        self.closed = True
+
+
+def seqs(socket):
+    return [message.get('seq') for message in socket.sent]
+
+
+async def settle():
+    # Let the writer tasks pick up (or finish sending) what is queued
+    await asyncio.sleep(0.02)
+
+
+async def broadcast_with_slow_client(policy):
+    state = {'seq': 0}
+    broadcaster = FanoutBroadcaster(queue_size=2, policy=policy,
+                                    snapshot_func=lambda: {'type': 'snapshot', 'seq': state['seq']})
+    fast, slow = FakeSocket(), FakeSocket(blocked=True)
+    await broadcaster.connect(fast)
+    await broadcaster.connect(slow)
+
+    for seq in range(1, 7):
+        state['seq'] = seq
+        await broadcaster.broadcast({'type': 'patch', 'seq': seq})
+        await settle()
+
+    slow.gate.set()
+    await settle()
+    for socket in (fast, slow):
+        broadcaster.disconnect(socket)
+    return broadcaster, fast, slow
+
+
+def test_coalesce_replaces_backlog_with_current_snapshot():
+    broadcaster, fast, slow = asyncio.run(broadcast_with_slow_client('coalesce'))
+
+    assert seqs(fast) == [1, 2, 3, 4, 5, 6]
+    # seq 1 was already being sent and 2, 3 filled the queue; 4 replaced the backlog
+    # with a snapshot, 5 fit behind it, and 6 replaced both with a newer snapshot
+    assert slow.sent == [{'type': 'patch', 'seq': 1}, {'type': 'snapshot', 'seq': 6}]
+    assert broadcaster.coalesced == 2
+    assert broadcaster.dropped == 0
+
+
+def test_drop_keeps_queued_patches_and_leaves_a_gap():
+    broadcaster, fast, slow = asyncio.run(broadcast_with_slow_client('drop'))
+
+    assert seqs(fast) == [1, 2, 3, 4, 5, 6]
+    assert seqs(slow) == [1, 2, 3]
+    assert broadcaster.dropped == 3
+    assert broadcaster.coalesced == 0
+
+
+def test_initial_message_precedes_broadcasts_and_send_supersedes_backlog():
+    async def run():
+        broadcaster = FanoutBroadcaster(queue_size=1, policy='drop')
+        socket = FakeSocket(blocked=True)
+        await broadcaster.connect(socket, initial_message=lambda: {'type': 'snapshot', 'seq': 0})
+        await settle()
+        await broadcaster.broadcast({'type': 'patch', 'seq': 1})
+        await settle()
+        # A resync reply replaces whatever is still queued
+        broadcaster.send(socket, {'type': 'snapshot', 'seq': 1})
+        socket.gate.set()
+        await settle()
+        broadcaster.disconnect(socket)
+        return broadcaster, socket
+
+    broadcaster, socket = asyncio.run(run())
+    assert [(m['type'], m['seq']) for m in socket.sent] == [('snapshot', 0), ('snapshot', 1)]
+    assert broadcaster.coalesced == 1
+
+
+def test_send_timeout_disconnects_the_client():
+    async def run():
+        broadcaster = FanoutBroadcaster(send_timeout=0.05)
+        socket = FakeSocket(blocked=True)
+        await broadcaster.connect(socket)
+        await broadcaster.broadcast({'type': 'patch', 'seq': 1})
+        await asyncio.sleep(0.2)
+        return broadcaster, socket
+
+    broadcaster, socket = asyncio.run(run())
+    assert broadcaster.active_connections == []
+    assert broadcaster.disconnects == 1
+    assert socket.closed
+
+
+def test_pre_encoded_matches_are_spliced_verbatim():
+    items = [b'{"id":"a"}', b'{"id":"b"}']
+    payload = encode_message({'type': 'snapshot', 'data': {'matches': PreEncoded(items), 'count': 2}})
+    assert json.loads(payload) == {'type': 'snapshot', 'data': {'matches': [{'id': 'a'}, {'id': 'b'}], 'count': 2}}
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        FanoutBroadcaster(policy='block')
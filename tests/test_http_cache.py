@@ -0,0 +1,108 @@
+import gzip
+
+import pytest
+from fastapi import Request
+
+from http_cache import HTTPResponseCache, negotiate_encoding
+
+BODY = b'{"matches": [' + b','.join(b'{"id": %d}' % i for i in range(200)) + b']}'
+
+
+def make_request(headers=None, path='/api/live-matches', query=''):
+    return Request({
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': query.encode('ascii'),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in (headers or {}).items()]
+    })
+
+
+def fetch(cache, generation=1, **headers):
+    builds = []
+
+    def build():
+        builds.append(generation)
+        return BODY
+
+    response = cache.respond(make_request({k.replace('_', '-'): v for k, v in headers.items()}),
+                             generation, build)
+    return response, builds
+
+
+def test_etag_per_encoding_and_304_for_the_same_encoding():
+    cache = HTTPResponseCache(min_compress_size=64)
+    gzipped, builds = fetch(cache, accept_encoding='gzip')
+    identity, _ = fetch(cache)
+
+    assert builds == [1]
+    assert gzipped.headers['content-encoding'] == 'gzip'
+    assert gzip.decompress(gzipped.body) == BODY
+    assert identity.body == BODY
+    assert gzipped.headers['etag'] != identity.headers['etag']
+    assert gzipped.headers['vary'] == 'Accept-Encoding'
+
+    revalidated, builds = fetch(cache, accept_encoding='gzip', if_none_match=gzipped.headers['etag'])
+    assert revalidated.status_code == 304
+    assert revalidated.body == b''
+    assert revalidated.headers['etag'] == gzipped.headers['etag']
+    assert builds == []
+    assert fetch(cache, if_none_match=identity.headers['etag'])[0].status_code == 304
+
+
+def test_tag_of_another_encoding_does_not_revalidate():
+    cache = HTTPResponseCache(min_compress_size=64)
+    gzipped, _ = fetch(cache, accept_encoding='gzip')
+    identity, _ = fetch(cache)
+
+    # The client holds gzip bytes but now asks for identity (and vice versa)
+    response, _ = fetch(cache, if_none_match=gzipped.headers['etag'])
+    assert response.status_code == 200
+    assert response.body == BODY
+    response, _ = fetch(cache, accept_encoding='gzip', if_none_match=identity.headers['etag'])
+    assert response.status_code == 200
+    assert gzip.decompress(response.body) == BODY
+
+
+def test_weak_list_and_wildcard_validators():
+    cache = HTTPResponseCache(min_compress_size=64)
+    first, _ = fetch(cache, accept_encoding='gzip')
+    etag = first.headers['etag']
+
+    assert fetch(cache, accept_encoding='gzip', if_none_match=f'"other", W/{etag}')[0].status_code == 304
+    assert fetch(cache, accept_encoding='gzip', if_none_match='*')[0].status_code == 304
+    assert fetch(cache, accept_encoding='gzip', if_none_match='"other"')[0].status_code == 200
+
+
+def test_new_generation_rebuilds_and_changes_the_etag():
+    cache = HTTPResponseCache(min_compress_size=64)
+    first, _ = fetch(cache, generation=1, accept_encoding='gzip')
+    second, builds = fetch(cache, generation=2, accept_encoding='gzip', if_none_match=first.headers['etag'])
+
+    assert second.status_code == 200
+    assert builds == [2]
+    assert second.headers['etag'] != first.headers['etag']
+    assert cache.metrics()['builds'] == 2
+
+
+def test_small_bodies_stay_identity_and_compression_is_reused():
+    small = HTTPResponseCache(min_compress_size=len(BODY) + 1)
+    response, _ = fetch(small, accept_encoding='gzip')
+    assert 'content-encoding' not in response.headers
+
+    cache = HTTPResponseCache(min_compress_size=64)
+    for _ in range(3):
+        fetch(cache, accept_encoding='gzip')
+    assert cache.metrics()['compressions'] == 1
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('identity', None),
+    ('gzip;q=0', None),
+    ('gzip, deflate', 'gzip'),
+    ('*;q=0.5', negotiate_encoding('*')),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header) == expected
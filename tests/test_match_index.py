@@ -0,0 +1,71 @@
+import pytest
+
+from match_index import MatchIndex, decode_cursor, encode_cursor, project
+
+
+def make_match(match_id, sport='Tennis', live=True, odds=True):
+    return {'id': match_id, 'sport': sport, 'sport_code': sport[:3].upper(), 'league': 'ATP',
+            'live_fields': {'is_live': live}, 'odds': {'home': '+100'} if odds else {}}
+
+
+def build(ids, **kwargs):
+    by_id = {match_id: make_match(match_id, **kwargs) for match_id in ids}
+    index = MatchIndex()
+    index.apply(by_id, list(by_id), [], [])
+    return index, by_id
+
+
+def test_pages_cover_every_match_once():
+    index, _ = build([f"m{i:02d}" for i in range(25)])
+    seen, cursor = [], None
+    while True:
+        page, cursor, total = index.query({}, cursor=cursor, limit=10)
+        seen.extend(page)
+        if cursor is None:
+            break
+    assert total == 25
+    assert seen == sorted(seen) == [f"m{i:02d}" for i in range(25)]
+
+
+def test_cursor_is_stable_under_inserts_and_removes():
+    index, by_id = build(['b', 'd', 'f', 'h'])
+    page, cursor, _ = index.query({}, limit=2)
+    assert page == ['b', 'd']
+
+    # Inserts before and after the cursor, and a removal of an already-served id
+    for match_id in ('a', 'c', 'e', 'g'):
+        by_id[match_id] = make_match(match_id)
+    index.apply(by_id, ['a', 'c', 'e', 'g'], [], ['b'])
+
+    page, cursor, total = index.query({}, cursor=cursor, limit=3)
+    # Continues after 'd': nothing served twice, nothing after the cursor skipped
+    assert page == ['e', 'f', 'g']
+    assert total == 7
+    page, cursor, _ = index.query({}, cursor=cursor, limit=3)
+    assert page == ['h'] and cursor is None
+
+
+def test_cursor_survives_removal_of_its_own_id():
+    index, by_id = build(['a', 'b', 'c', 'd'])
+    _, cursor, _ = index.query({}, limit=2)
+    index.apply(by_id, [], [], ['b'])
+    assert index.query({}, cursor=cursor, limit=10)[0] == ['c', 'd']
+
+
+def test_filters_follow_updates():
+    index, by_id = build(['a', 'b', 'c'])
+    by_id['b'] = make_match('b', sport='Soccer', odds=False)
+    index.apply(by_id, [], ['b'], [])
+
+    assert index.query({'sport': ['tennis']})[0] == ['a', 'c']
+    assert index.query({'sport': ['SOCCER'], 'has_odds': [False]})[0] == ['b']
+    assert index.query({'sport': ['Tennis', 'Soccer'], 'is_live': [True]})[2] == 3
+    assert index.query({'sport': ['Hockey']})[0] == []
+    assert index.postings['sport'] == {'tennis': {'a', 'c'}, 'soccer': {'b'}}
+
+
+def test_cursor_round_trip_and_projection():
+    assert decode_cursor(encode_cursor('Tennis|ä 1')) == 'Tennis|ä 1'
+    with pytest.raises(ValueError):
+        decode_cursor('abc')
+    assert project({'id': 1, 'sport': 'x', 'odds': {}}, ['sport']) == {'id': 1, 'sport': 'x'}
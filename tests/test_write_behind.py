@@ -0,0 +1,97 @@
+import asyncio
+
+from persistence import WriteBehindScheduler
+
+
+class RecordingWriter:
+    """Stands in for PersistenceService: records what reached the writer and when"""
+
+    def __init__(self):
+        self.writes = []
+        self.calls = []
+
+    def submit(self, path, document, frozen=False):
+        self.writes.append((asyncio.get_running_loop().time(), path, document))
+
+    def submit_call(self, func, *args):
+        self.calls.append((func, args))
+        func(*args)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+    def metrics(self):
+        return {}
+
+
+def test_burst_coalesces_to_latest_document():
+    async def run():
+        writer = RecordingWriter()
+        scheduler = WriteBehindScheduler(writer, max_latency=0.05, max_staleness=1.0)
+        for version in range(10):
+            scheduler.put('current.json', {'version': version})
+        scheduler.put('history.json', {'version': 'h'})
+        assert writer.writes == []
+
+        await asyncio.sleep(0.15)
+        return writer, scheduler
+
+    writer, scheduler = asyncio.run(run())
+    assert sorted((path, doc['version']) for _, path, doc in writer.writes) == [('current.json', 9),
+                                                                                 ('history.json', 'h')]
+    metrics = scheduler.metrics()
+    assert metrics['puts'] == 11
+    assert metrics['writes'] == 2
+    assert metrics['coalesced'] == 9
+    assert metrics['documents']['current.json'] == {'puts': 10, 'writes': 1}
+
+
+def test_steady_updates_are_written_within_max_staleness():
+    async def run():
+        writer = RecordingWriter()
+        scheduler = WriteBehindScheduler(writer, max_latency=0.05, max_staleness=0.2)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        # Updates every 20ms never leave a 50ms quiet period
+        for version in range(30):
+            scheduler.put('current.json', {'version': version})
+            await asyncio.sleep(0.02)
+        await scheduler.drain()
+        return writer, started
+
+    writer, started = asyncio.run(run())
+    times = [started] + [at for at, _, _ in writer.writes]
+    assert len(writer.writes) >= 2
+    # Slack for timer scheduling on a busy machine
+    assert max(later - earlier for earlier, later in zip(times, times[1:])) < 0.2 + 0.1
+    assert writer.writes[-1][2] == {'version': 29}
+
+
+def test_sink_runs_with_frozen_copy_and_no_loop_writes_through():
+    received = []
+    writer = RecordingWriter()
+    scheduler = WriteBehindScheduler(writer, max_latency=0.05)
+    document = {'matches': [1, 2]}
+
+    # No running event loop: nothing to coalesce against, the sink runs immediately
+    scheduler.put('sqlite:live', document, sink=received.append)
+    document['matches'].append(3)
+
+    assert received == [{'matches': [1, 2]}]
+    assert scheduler.metrics()['dirty'] == 0
+
+
+def test_drain_flushes_before_the_quiet_period():
+    async def run():
+        writer = RecordingWriter()
+        scheduler = WriteBehindScheduler(writer, max_latency=10.0, max_staleness=10.0)
+        scheduler.put('current.json', {'version': 1})
+        await scheduler.drain()
+        return writer, scheduler
+
+    writer, scheduler = asyncio.run(run())
+    assert [doc for _, _, doc in writer.writes] == [{'version': 1}]
+    assert scheduler._timer is None
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+CONTENT-ADDRESSED CACHE FOR DASHBOARD MATCH TRANSFORMS
+Between two dashboard updates most source matches are identical, so the
+frontend representation of each one is built once per distinct content.
+
+- Key: blake2b of the source match's orjson bytes (key order as loaded - sorting
+  costs more than the occasional miss when a writer reorders keys)
+- Value: the transformed match, its pre-serialized JSON bytes (spliced into
+  WebSocket messages as-is) and a display fingerprint (hash without the
+  per-transform timestamp) used to diff snapshots
+- Matches the transform rejects are cached as well, so their warnings are
+  logged once per content instead of on every reload
+- Least recently used entries are evicted beyond max_entries
+"""
+
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import orjson
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def content_key(match: Dict[str, Any]) -> bytes:
+    """Cheap content fingerprint of a source match"""
+    payload = orjson.dumps(match, default=str, option=ORJSON_OPTIONS)
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def display_fingerprint(match: Dict[str, Any]) -> bytes:
+    """Content hash of a transformed match, ignoring its (per-transform) timestamp"""
+    content = {key: value for key, value in match.items() if key != 'timestamp'}
+    payload = orjson.dumps(content, default=str, option=ORJSON_OPTIONS | orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+@dataclass(frozen=True)
+class TransformedMatch:
+    """Frontend representation of one source match, shared by every snapshot that contains it"""
+    match: Dict[str, Any]
+    encoded: bytes
+    fingerprint: bytes
+
+    @property
+    def match_id(self) -> str:
+        return str(self.match['id'])
+
+
+class TransformCache:
+    """LRU of source content -> TransformedMatch (None for matches the transform rejects)"""
+
+    def __init__(self, transform_one: Callable[[Dict[str, Any], int], Optional[Dict[str, Any]]],
+                 max_entries: int = 20000, logger: Optional[logging.Logger] = None):
+        """
+        Args:
+            transform_one: builds the frontend dict of one source match (None if invalid)
+            max_entries: cached distinct match contents before LRU eviction
+            logger: logger for summary lines
+        """
+        self.transform_one = transform_one
+        self.max_entries = max_entries
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._entries: "OrderedDict[bytes, Optional[TransformedMatch]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def transform(self, matches: List[Dict[str, Any]]) -> List[TransformedMatch]:
+        """Transformed matches in source order; only contents not seen recently are transformed"""
+        results = []
+        misses = 0
+        for index, match in enumerate(matches):
+            if not match or not isinstance(match, dict):
+                self.logger.warning(f"Skipping invalid match at index {index}: {type(match)}")
+                continue
+
+            key = content_key(match)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                entry = self._entries[key]
+                self.hits += 1
+            else:
+                entry = self._build(match, index)
+                self._entries[key] = entry
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+                self.misses += 1
+                misses += 1
+
+            if entry is not None:
+                results.append(entry)
+
+        self.logger.info(f"Transformed {misses} changed of {len(matches)} matches "
+                         f"({len(results)} valid, {len(self._entries)} cached)")
+        return results
+
+    def _build(self, match: Dict[str, Any], index: int) -> Optional[TransformedMatch]:
+        transformed = self.transform_one(match, index)
+        if transformed is None:
+            return None
+        return TransformedMatch(
+            match=transformed,
+            encoded=orjson.dumps(transformed, default=str, option=ORJSON_OPTIONS),
+            fingerprint=display_fingerprint(transformed)
+        )
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+DASHBOARD WEBSOCKET LOAD TEST
+Opens hundreds to thousands of /ws connections against dashboard_api on
+localhost, drives synthetic live data changes and measures what every
+client sees. Use it to size dashboard hosts and to check broadcast-path
+changes before they ship.
+
+- Starts its own dashboard (uvicorn subprocess, BET365_DASHBOARD_PRODUCERS=0)
+  in a scratch data directory, or targets a running one with --url
+- Producers: 'file' republishes bet365_live_current.json (the polled file
+  path), 'bus' pushes cycles over the event bus (event_bus.py)
+- Each tick changes --changes matches and stamps one of them with a marker
+  (league 'loadtest-<tick>'); a client's latency for a tick is the time from
+  the producer publishing it to the client receiving a message containing it
+- Clients follow the protocol: apply patches in sequence, send a resync on a
+  gap, accept coalesced 'initial' snapshots
+- Reports per-client latency (p50/p95/p99/max), delivery ratio, gaps,
+  dropped connections, server CPU and RSS (psutil), load generator CPU, and
+  the server's own broadcaster metrics from /health; --report writes JSON,
+  --compare prints the key numbers next to an earlier report
+
+Usage:
+    python ws_load_test.py --clients 500 --duration 30
+    python ws_load_test.py --clients 2000 --producer bus --interval 0.5 --report run.json
+    python ws_load_test.py --clients 500 --compare run.json
+    python ws_load_test.py --url http://127.0.0.1:8000 --clients 200   # running dashboard, no producer
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import orjson
+import psutil
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+
+from event_bus import EventBusPublisher, DEFAULT_TCP_ADDRESS
+from metrics import summarize_latencies
+from snapshot_publisher import SnapshotPublisher
+
+REPO_DIR = Path(__file__).resolve().parent
+MARKER = 'loadtest-'
+SPORTS = (('Soccer', 'B1'), ('Basketball', 'B18'), ('Tennis', 'B13'), ('Ice Hockey', 'B17'))
+LIVE_FILE = 'bet365_live_current.json'
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Percentile of durations in seconds, in milliseconds"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))] * 1000, 3)
+
+
+def synthetic_matches(count: int) -> List[Dict[str, Any]]:
+    """Live matches in the scraper's format"""
+    matches = []
+    for index in range(count):
+        sport, sport_code = SPORTS[index % len(SPORTS)]
+        matches.append({
+            'id': f"load_{index}",
+            'sport': sport,
+            'sport_code': sport_code,
+            'league': f"{sport} League {index % 7}",
+            'teams': {'home': f"Home {index}", 'away': f"Away {index}"},
+            'scores': {'home': '0', 'away': '0'},
+            'live_fields': {'is_live': True, 'status': 'Live', 'time': "45'"},
+            'odds': {'moneyline': ['+120', '-140'], 'spread': ['+1.5 -110', '-1.5 -110']},
+            'status': 'live'
+        })
+    return matches
+
+
+def raise_open_file_limit():
+    """Lift the soft fd limit to the hard limit (inherited by the spawned server)"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def fetch_json(url: str, timeout: float = 5.0) -> Dict[str, Any]:
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ----------------------------- Producers ----------------------------- #
+
+class FileProducer:
+    """Republishes the live current-data file the dashboard polls"""
+
+    def __init__(self, data_dir: Path):
+        self.path = data_dir / LIVE_FILE
+        self.publisher = SnapshotPublisher()
+
+    async def publish(self, matches: List[Dict[str, Any]]):
+        await self.publisher.publish_async(self.path, {
+            'last_updated': datetime.now().isoformat(),
+            'total_matches': len(matches),
+            'matches': matches
+        })
+
+    def close(self):
+        pass
+
+
+class BusProducer:
+    """Pushes cycles over the dashboard's event bus, like the live scraper with --event-bus"""
+
+    def __init__(self, address: str):
+        self.publisher = EventBusPublisher(address, key_func=lambda match: match['id'], reconnect_interval=0.5)
+
+    async def publish(self, matches: List[Dict[str, Any]]):
+        await self.publisher.publish({'matches': matches, 'timestamp': datetime.now().isoformat()})
+
+    def close(self):
+        self.publisher.close()
+
+
+# ----------------------------- Clients ----------------------------- #
+
+class LoadClient:
+    """One dashboard WebSocket client following the snapshot/patch protocol"""
+
+    def __init__(self, index: int, url: str, sent_at: Dict[int, float]):
+        self.index = index
+        self.url = url
+        self.sent_at = sent_at
+        self.ws = None
+        self.closing = False
+
+        self.connected = False
+        self.connect_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.dropped = False
+        self.seq: Optional[int] = None
+        self.seen = set()
+        self.latencies: List[float] = []
+        self.messages = 0
+        self.bytes = 0
+        self.initials = 0
+        self.patches = 0
+        self.gaps = 0
+
+    async def run(self, open_timeout: float):
+        started = time.perf_counter()
+        try:
+            async with connect(self.url, max_size=None, open_timeout=open_timeout,
+                               ping_interval=None, compression=None) as ws:
+                self.ws = ws
+                self.connected = True
+                self.connect_seconds = time.perf_counter() - started
+                async for raw in ws:
+                    self.handle(raw, time.perf_counter())
+        except ConnectionClosed as e:
+            if not self.closing:
+                self.dropped = True
+                self.error = f"closed: {e}"
+        except (OSError, asyncio.TimeoutError) as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            if self.connected and not self.closing and self.error is None:
+                # The server ended the stream on its own
+                self.dropped = True
+                self.error = 'closed by server'
+
+    def handle(self, raw, received: float):
+        self.messages += 1
+        self.bytes += len(raw)
+        message = orjson.loads(raw)
+        kind, seq, data = message.get('type'), message.get('seq'), message.get('data') or {}
+
+        if kind == 'initial':
+            self.initials += 1
+            self.seq = seq
+            self.record(data.get('matches') or [], received)
+        elif kind == 'patch':
+            if self.seq is None:
+                return  # waiting for the resync snapshot
+            if seq != self.seq + 1:
+                self.gaps += 1
+                self.seq = None
+                asyncio.ensure_future(self.ws.send('{"type": "resync"}'))
+                return
+            self.patches += 1
+            self.seq = seq
+            self.record((data.get('inserted') or []) + (data.get('updated') or []), received)
+
+    def record(self, matches: List[Dict[str, Any]], received: float):
+        for match in matches:
+            league = match.get('league') or ''
+            if not league.startswith(MARKER):
+                continue
+            tick = int(league[len(MARKER):])
+            if tick in self.seen:
+                continue
+            self.seen.add(tick)
+            sent = self.sent_at.get(tick)
+            if sent is not None:
+                self.latencies.append(received - sent)
+
+    async def close(self):
+        self.closing = True
+        if self.ws is not None:
+            await self.ws.close()
+
+
+# ----------------------------- Sampling ----------------------------- #
+
+class ProcessSampler:
+    """CPU percent and RSS of a process, sampled periodically"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self.cpu: List[float] = []
+        self.rss: List[int] = []
+        self.process.cpu_percent(None)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.cpu.append(self.process.cpu_percent(None))
+                self.rss.append(self.process.memory_info().rss)
+            except psutil.Error:
+                return
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.cpu:
+            return {'cpu_percent_mean': 0.0, 'cpu_percent_max': 0.0, 'rss_mb_start': 0.0, 'rss_mb_max': 0.0}
+        return {
+            'cpu_percent_mean': round(sum(self.cpu) / len(self.cpu), 1),
+            'cpu_percent_max': round(max(self.cpu), 1),
+            'rss_mb_start': round(self.rss[0] / 1048576, 1),
+            'rss_mb_max': round(max(self.rss) / 1048576, 1)
+        }
+
+
+# ----------------------------- Run ----------------------------- #
+
+class DashboardServer:
+    """uvicorn running dashboard_api in a scratch data directory"""
+
+    def __init__(self, data_dir: Path, port: int, event_bus: str):
+        self.data_dir = data_dir
+        self.port = port
+        self.event_bus = event_bus
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, timeout: float = 30.0):
+        env = dict(os.environ, BET365_DASHBOARD_PRODUCERS='0', BET365_EVENT_BUS=self.event_bus,
+                   PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_DIR), os.environ.get('PYTHONPATH')])))
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'dashboard_api:app', '--host', '127.0.0.1',
+             '--port', str(self.port), '--log-level', 'warning'],
+            cwd=self.data_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Dashboard exited with code {self.process.returncode}")
+            try:
+                await asyncio.to_thread(fetch_json, f"{self.base_url}/health", 1.0)
+                return
+            except OSError:
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"Dashboard did not answer /health within {timeout}s")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+async def connect_clients(clients: List[LoadClient], ramp: float, concurrency: int,
+                          open_timeout: float) -> List[asyncio.Task]:
+    """Start every client, spreading the connects over ramp seconds"""
+    gate = asyncio.Semaphore(concurrency)
+    tasks = []
+
+    async def start(client: LoadClient, delay: float):
+        await asyncio.sleep(delay)
+        async with gate:
+            task = asyncio.create_task(client.run(open_timeout))
+            tasks.append(task)
+            # Hold the slot until the handshake finished (or failed)
+            while not client.connected and not task.done():
+                await asyncio.sleep(0.01)
+
+    step = ramp / len(clients) if clients else 0
+    await asyncio.gather(*(start(client, index * step) for index, client in enumerate(clients)))
+    return tasks
+
+
+async def run_load_test(args) -> Dict[str, Any]:
+    raise_open_file_limit()
+    server = None
+    producer = None
+    sampler_task = None
+    data_dir = None
+
+    try:
+        if args.url:
+            base_url = args.url.rstrip('/')
+        else:
+            data_dir = Path(args.data_dir or tempfile.mkdtemp(prefix='ws_load_'))
+            data_dir.mkdir(parents=True, exist_ok=True)
+            event_bus = (str(data_dir / 'events.sock') if hasattr(socket, 'AF_UNIX') and os.name != 'nt'
+                         else DEFAULT_TCP_ADDRESS)
+            matches = synthetic_matches(args.matches)
+            await FileProducer(data_dir).publish(matches)
+
+            server = DashboardServer(data_dir, args.port or free_port(), event_bus)
+            await server.start()
+            base_url = server.base_url
+            producer = BusProducer(event_bus) if args.producer == 'bus' else FileProducer(data_dir)
+            await producer.publish(matches)  # bus: connect and send the first snapshot
+
+        health = await asyncio.to_thread(fetch_json, f"{base_url}/health")
+        server_pid = args.server_pid or (server.process.pid if server else None)
+        sampler = ProcessSampler(server_pid) if server_pid else None
+        local_sampler = ProcessSampler(os.getpid())
+        sampler_tasks = [asyncio.create_task(s.run()) for s in (sampler, local_sampler) if s]
+
+        # Connect
+        ws_url = base_url.replace('http', 'ws', 1) + '/ws'
+        sent_at: Dict[int, float] = {}
+        clients = [LoadClient(index, ws_url, sent_at) for index in range(args.clients)]
+        print(f"Connecting {len(clients)} clients to {ws_url} ...")
+        connect_started = time.perf_counter()
+        tasks = await connect_clients(clients, args.ramp, args.connect_concurrency, args.open_timeout)
+        await asyncio.sleep(0.5)
+        connect_elapsed = time.perf_counter() - connect_started
+        connected = sum(1 for client in clients if client.connected)
+        print(f"  {connected} connected in {connect_elapsed:.1f}s")
+
+        # Drive changes
+        ticks = 0
+        if producer is not None:
+            print(f"Producing {args.changes} changes every {args.interval}s for {args.duration}s "
+                  f"through the {args.producer} ...")
+            run_until = time.perf_counter() + args.duration
+            while time.perf_counter() < run_until:
+                ticks += 1
+                for offset in range(args.changes):
+                    match = matches[(ticks * args.changes + offset) % len(matches)]
+                    match['scores'] = {'home': str(ticks), 'away': str(offset)}
+                match = matches[ticks % len(matches)]
+                match['league'] = f"{MARKER}{ticks}"
+                sent_at[ticks] = time.perf_counter()
+                await producer.publish(matches)
+                await asyncio.sleep(max(0.0, sent_at[ticks] + args.interval - time.perf_counter()))
+        else:
+            print(f"Observing for {args.duration}s (no producer with --url) ...")
+            await asyncio.sleep(args.duration)
+
+        await asyncio.sleep(args.drain)
+        final_health = await asyncio.to_thread(fetch_json, f"{base_url}/health")
+
+        for client in clients:
+            await client.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for task in sampler_tasks:
+            task.cancel()
+
+        return build_report(args, clients, ticks, connect_elapsed, sampler, local_sampler, health, final_health)
+
+    finally:
+        if producer is not None:
+            producer.close()
+        if server is not None:
+            server.stop()
+        if data_dir is not None and not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def build_report(args, clients: List[LoadClient], ticks: int, connect_elapsed: float,
+                 sampler: Optional[ProcessSampler], local_sampler: ProcessSampler,
+                 health: Dict[str, Any], final_health: Dict[str, Any]) -> Dict[str, Any]:
+    latencies = [latency for client in clients for latency in client.latencies]
+    connected = [client for client in clients if client.connected]
+    expected = ticks * len(connected)
+    errors: Dict[str, int] = {}
+    for client in clients:
+        if client.error:
+            kind = client.error.split(':')[0]
+            errors[kind] = errors.get(kind, 0) + 1
+
+    return {
+        'run': {
+            'timestamp': datetime.now().isoformat(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'config': {
+            'clients': args.clients,
+            'producer': None if args.url else args.producer,
+            'matches': args.matches,
+            'changes': args.changes,
+            'interval': args.interval,
+            'duration': args.duration,
+            'ramp': args.ramp,
+            'url': args.url
+        },
+        'connections': {
+            'connected': len(connected),
+            'failed': len(clients) - len(connected),
+            'dropped': sum(1 for client in clients if client.dropped),
+            'errors': errors,
+            'connect_seconds': round(connect_elapsed, 3),
+            'handshake_ms': summarize_latencies([c.connect_seconds for c in connected if c.connect_seconds])
+        },
+        'updates': {
+            'ticks': ticks,
+            'delivered': len(latencies),
+            'delivery_ratio': round(len(latencies) / expected, 4) if expected else 0.0,
+            'latency_ms': dict(summarize_latencies(latencies), p99=percentile(latencies, 0.99)),
+            'messages': sum(client.messages for client in clients),
+            'bytes': sum(client.bytes for client in clients),
+            'initials': sum(client.initials for client in clients),
+            'patches': sum(client.patches for client in clients),
+            'gaps': sum(client.gaps for client in clients)
+        },
+        'server': dict(sampler.summary() if sampler else {},
+                       broadcaster=final_health.get('broadcaster'),
+                       data_hub=final_health.get('data_hub'),
+                       matches=health.get('cached_matches')),
+        'load_generator': local_sampler.summary()
+    }
+
+
+KEY_NUMBERS = (
+    ('connections', 'connected'), ('connections', 'dropped'), ('updates', 'delivery_ratio'),
+    ('updates', 'latency_ms', 'p50'), ('updates', 'latency_ms', 'p95'), ('updates', 'latency_ms', 'p99'),
+    ('updates', 'latency_ms', 'max'), ('updates', 'gaps'), ('server', 'cpu_percent_mean'),
+    ('server', 'cpu_percent_max'), ('server', 'rss_mb_max'), ('load_generator', 'cpu_percent_mean')
+)
+
+
+def key_number(report: Dict[str, Any], path) -> Any:
+    value = report
+    for part in path:
+        value = (value or {}).get(part)
+    return value
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    print("\nDASHBOARD WEBSOCKET LOAD TEST")
+    print("=" * 78)
+    config = report['config']
+    print(f"Clients: {config['clients']} | producer: {config['producer']} | matches: {config['matches']} | "
+          f"{config['changes']} changes / {config['interval']}s for {config['duration']}s")
+    print(f"Commit: {report['run']['commit']} | {report['run']['platform']} | {report['run']['cpus']} CPUs")
+    if report['connections']['errors']:
+        print(f"Connection errors: {report['connections']['errors']}")
+    if report['load_generator']['cpu_percent_max'] >= 90:
+        print("Warning: the load generator was CPU bound - latencies include its own queueing")
+
+    header = f"  {'metric':<34}{'this run':>14}"
+    if baseline:
+        header += f"{'baseline':>14}{'change':>12}"
+    print(header)
+    for path in KEY_NUMBERS:
+        value = key_number(report, path)
+        line = f"  {'.'.join(path):<34}{str(value):>14}"
+        if baseline:
+            previous = key_number(baseline, path)
+            change = ''
+            if isinstance(value, (int, float)) and isinstance(previous, (int, float)) and previous:
+                change = f"{(value - previous) / previous * 100:+.1f}%"
+            line += f"{str(previous):>14}{change:>12}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the dashboard WebSocket broadcast path on localhost')
+    parser.add_argument('--clients', type=int, default=200, help='WebSocket clients to open (default: 200)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Seconds to produce changes (default: 20)')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between data changes (default: 1)')
+    parser.add_argument('--changes', type=int, default=5, help='Matches changed per tick (default: 5)')
+    parser.add_argument('--matches', type=int, default=500, help='Synthetic live matches (default: 500)')
+    parser.add_argument('--producer', choices=['file', 'bus'], default='file',
+                        help='Deliver changes through the live data file or the event bus (default: file)')
+    parser.add_argument('--ramp', type=float, default=5.0, help='Seconds over which clients connect (default: 5)')
+    parser.add_argument('--connect-concurrency', type=int, default=100,
+                        help='Handshakes in flight at once (default: 100)')
+    parser.add_argument('--open-timeout', type=float, default=30.0, help='WebSocket handshake timeout (default: 30)')
+    parser.add_argument('--drain', type=float, default=3.0,
+                        help='Seconds to keep listening after the last change (default: 3)')
+    parser.add_argument('--url', default=None,
+                        help='Use a running dashboard (http://host:port) instead of starting one; no producer')
+    parser.add_argument('--server-pid', type=int, default=None, help='PID to sample CPU/memory of with --url')
+    parser.add_argument('--port', type=int, default=None, help='Port for the started dashboard (default: free port)')
+    parser.add_argument('--data-dir', default=None, help='Scratch data directory (default: a new temp directory)')
+    parser.add_argument('--report', default=None, help='Write the JSON report to this file as well')
+    parser.add_argument('--compare', default=None, help='Earlier JSON report to compare the key numbers with')
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.report}")
+
+
+if __name__ == "__main__":
+    main()